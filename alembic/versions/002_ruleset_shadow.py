@@ -0,0 +1,26 @@
+"""Shadow candidate bundle per ruleset.
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("rulesets", sa.Column("shadow_bundle_hash", sa.Text(), nullable=True))
+    op.add_column("rulesets", sa.Column("shadow_bundle_json", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("rulesets", "shadow_bundle_json")
+    op.drop_column("rulesets", "shadow_bundle_hash")
@@ -10,8 +10,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from crms.auth.middleware import TenantDep
 from crms.database import get_db
+from crms.engine.compiler import get_compiled_bundle
+from crms.engine.shadow import shadow_runner
+from crms.engine.specialize import get_routed_bundle
+from crms.engine.tables import compile_tables, validate_lookups
 from crms.models import Rule, Ruleset, RulesetVersion
-from crms.schemas.admin import CreateRulesetRequest, CreateRuleRequest, PublishRequest
+from crms.schemas.admin import CreateRulesetRequest, CreateRuleRequest, PublishRequest, ShadowRequest
+from crms.storage.invalidation import notify_ruleset_change
+from crms.storage.repositories import load_draft_bundle
+from crms.storage.ruleset_cache import ruleset_cache
 from crms.utils.canonical import bundle_hash
 
 router = APIRouter()
@@ -86,8 +93,11 @@ async def create_ruleset(
         created_at=_now_iso(),
     )
     db.add(ruleset)
+    await notify_ruleset_change(db, tenant.tenant_id, ruleset)
     await db.commit()
     await db.refresh(ruleset)
+    # Drop a cached "no such ruleset" entry
+    ruleset_cache.invalidate(str(tenant.tenant_id), ruleset.jurisdiction, ruleset.tax_type)
     return {
         "ruleset_id": str(ruleset.ruleset_id),
         "jurisdiction": ruleset.jurisdiction,
@@ -209,13 +219,28 @@ async def publish_ruleset(
     # Build bundle: sorted by priority DESC
     rules = [r.rule_json for r in sorted(draft_rules, key=lambda x: x.priority, reverse=True)]
     bundle = {"rules": rules}
-    bh = bundle_hash(rules)
 
     # Determine version number
     result = await db.execute(
         select(RulesetVersion).where(RulesetVersion.ruleset_id == ruleset_id)
     )
     versions = result.scalars().all()
+
+    # Rate tables are versioned with the rules: carried over from the latest version unless replaced
+    tables = body.tables
+    if tables is None and versions:
+        latest = max(versions, key=lambda v: v.published_at or datetime.min)
+        tables = latest.bundle_json.get("tables")
+    try:
+        validate_lookups(rules, compile_tables(tables))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
+    if tables:
+        bundle["tables"] = tables
+    bh = bundle_hash(rules, tables)
     if versions:
         # Parse semver and increment patch
         last_ver = versions[0].version
@@ -251,8 +276,14 @@ async def publish_ruleset(
         change_summary=body.change_summary,
     )
     db.add(version)
+    await notify_ruleset_change(db, tenant.tenant_id, ruleset, version.version_id)
     await db.commit()
     await db.refresh(version)
+    ruleset_cache.invalidate(str(tenant.tenant_id), ruleset.jurisdiction, ruleset.tax_type)
+    # Compile + build the discrimination index (full and routed forms) now rather than
+    # on the first evaluation
+    get_compiled_bundle(version.bundle_hash, version.bundle_json)
+    get_routed_bundle(version.bundle_hash, version.bundle_json, ruleset.jurisdiction, ruleset.tax_type)
 
     return {
         "version_id": str(version.version_id),
@@ -262,3 +293,101 @@ async def publish_ruleset(
         "published_at": version.published_at.isoformat() if version.published_at else None,
         "change_summary": version.change_summary,
     }
+
+
+async def _tenant_ruleset(db: AsyncSession, tenant_id: str, ruleset_id: str) -> Ruleset:
+    """The tenant's ruleset by id; 404 if it does not exist."""
+    result = await db.execute(
+        select(Ruleset).where(
+            Ruleset.ruleset_id == ruleset_id,
+            Ruleset.tenant_id == tenant_id,
+        )
+    )
+    ruleset = result.scalar_one_or_none()
+    if not ruleset:
+        raise HTTPException(status_code=404, detail="Ruleset not found")
+    return ruleset
+
+
+@router.put("/rulesets/{ruleset_id}/shadow")
+async def set_shadow(
+    ruleset_id: str,
+    body: ShadowRequest,
+    tenant: TenantDep,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """
+    Shadow-evaluate a candidate bundle on this ruleset's live POST /v1/evaluations traffic.
+
+    The candidate ("draft" or a published version) is snapshotted now; later draft edits
+    need another PUT. Responses always come from the published version; disagreements are
+    summarized per worker (GET .../shadow, /metrics).
+    """
+    ruleset = await _tenant_ruleset(db, tenant.tenant_id, ruleset_id)
+    if body.candidate == "draft":
+        bundle = await load_draft_bundle(db, ruleset_id)
+        if not bundle["rules"]:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="No draft rules to shadow",
+            )
+    else:
+        result = await db.execute(
+            select(RulesetVersion).where(
+                RulesetVersion.ruleset_id == ruleset_id,
+                RulesetVersion.version == body.candidate,
+            )
+        )
+        version = result.scalar_one_or_none()
+        if not version:
+            raise HTTPException(status_code=404, detail="Version not found")
+        bundle = version.bundle_json
+    try:
+        validate_lookups(bundle["rules"], compile_tables(bundle.get("tables")))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
+
+    ruleset.shadow_bundle_hash = bundle_hash(bundle["rules"], bundle.get("tables"))
+    ruleset.shadow_bundle_json = bundle
+    await notify_ruleset_change(db, tenant.tenant_id, ruleset)
+    await db.commit()
+    ruleset_cache.invalidate(str(tenant.tenant_id), ruleset.jurisdiction, ruleset.tax_type)
+    shadow_runner.reset(ruleset_id)
+    # Compile the candidate now rather than on the first shadowed evaluation
+    get_routed_bundle(ruleset.shadow_bundle_hash, bundle, ruleset.jurisdiction, ruleset.tax_type)
+    return {"ruleset_id": ruleset_id, "candidate": body.candidate, "bundle_hash": ruleset.shadow_bundle_hash}
+
+
+@router.get("/rulesets/{ruleset_id}/shadow")
+async def get_shadow(
+    ruleset_id: str,
+    tenant: TenantDep,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Shadow candidate of a ruleset and this worker's disagreement summary for it."""
+    ruleset = await _tenant_ruleset(db, tenant.tenant_id, ruleset_id)
+    return {
+        "ruleset_id": ruleset_id,
+        "bundle_hash": ruleset.shadow_bundle_hash,
+        "summary": shadow_runner.summary(ruleset_id) if ruleset.shadow_bundle_hash else None,
+    }
+
+
+@router.delete("/rulesets/{ruleset_id}/shadow")
+async def clear_shadow(
+    ruleset_id: str,
+    tenant: TenantDep,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Stop shadow evaluation for a ruleset."""
+    ruleset = await _tenant_ruleset(db, tenant.tenant_id, ruleset_id)
+    ruleset.shadow_bundle_hash = None
+    ruleset.shadow_bundle_json = None
+    await notify_ruleset_change(db, tenant.tenant_id, ruleset)
+    await db.commit()
+    ruleset_cache.invalidate(str(tenant.tenant_id), ruleset.jurisdiction, ruleset.tax_type)
+    shadow_runner.reset(ruleset_id)
+    return {"ruleset_id": ruleset_id, "bundle_hash": None}
@@ -1,42 +1,353 @@
 """Evaluation endpoints."""
 
-from typing import Annotated
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from crms.auth.middleware import TenantDep
-from crms.database import get_db
+from crms.api.responses import ORJSONResponse, dumps
+from crms.auth.middleware import ApiKeyHashDep, TenantDep, invalid_api_key, remember_tenant
+from crms.auth.tenant_cache import AuthenticatedTenant, tenant_cache
+from crms.config import settings
+from crms.database import async_session_maker, get_db
+from crms.engine.compiler import CompiledBundle, get_compiled_bundle
 from crms.engine.evaluator import evaluate_rules
+from crms.engine.invoice import evaluate_lines, invoice_totals, line_transactions
+from crms.engine.result_cache import result_cache
+from crms.engine.shadow import shadow_runner
+from crms.engine.specialize import get_routed_bundle
+from crms.engine.trace_pool import trace_pool
+from crms.models import Evaluation
 from crms.schemas.evaluation import (
+    BatchEvaluationRequest,
+    BatchEvaluationResponse,
     EvaluationRequest,
     EvaluationResponse,
     EvaluationResult,
     EvaluationExplanation,
     EvaluationTrace,
+    ExplainOptions,
+    FanoutEvaluationRequest,
+    FanoutEvaluationResponse,
     FiredRule,
-    Obligation,
+    InvoiceEvaluationRequest,
+    InvoiceEvaluationResponse,
     RateComponent,
     RiskFlag,
     RulesetInfo,
+    TimelineEvaluationRequest,
+    TimelineEvaluationResponse,
     VersionInfo,
 )
 from crms.storage.repositories import (
-    get_ruleset_by_jurisdiction_tax,
-    get_version_for_effective_at,
-    get_evaluation_by_idempotency,
-    create_evaluation,
+    get_evaluations_by_idempotency_keys,
+    create_evaluations,
     get_evaluation_by_id,
+    load_request_context,
+    new_evaluation_row,
 )
+from crms.storage.audit_writer import audit_writer
+from crms.storage.ruleset_cache import CachedRuleset, CachedVersion, ruleset_cache, snapshot
 from crms.utils.canonical import request_hash
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+RULESET_NOT_FOUND = "Ruleset not found for jurisdiction and tax type"
+VERSION_NOT_FOUND = "No published version effective at the given effective_at"
+INVOICE_LINE_ROUTING = "Invoice lines cannot override jurisdiction or tax_type"
+FANOUT_TRANSACTION_ROUTING = "Fan-out transactions take jurisdiction and tax_type from targets"
+IDEMPOTENCY_KEY_CONFLICT = "Idempotency key used for a different request type"
+STREAM_CHUNK_FAILED = "Chunk could not be evaluated or audited; nothing in it was stored"
+STREAM_LINE_TOO_LONG = "Line exceeds STREAM_MAX_LINE_BYTES"
+
+
+def _record_kind(existing: Evaluation) -> str:
+    """
+    Which request type wrote an audit row: "single" (POST /v1/evaluations, batch and
+    stream items), "fanout_target" (one target of a per_target fan-out), "invoice",
+    "fanout" (a combined fan-out) or "unknown". Idempotency keys share one namespace per
+    tenant, so a replay must check it got its own kind.
+    """
+    inp, out = existing.input_json or {}, existing.output_json or {}
+    if isinstance(out.get("result"), dict):
+        return "fanout_target" if "fanout_idempotency_key" in inp else "single"
+    if isinstance(out.get("lines"), list) and isinstance(out.get("totals"), dict):
+        return "invoice"
+    if isinstance(out.get("results"), dict):
+        return "fanout"
+    return "unknown"
+
+
+def _idempotency_conflict() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=IDEMPOTENCY_KEY_CONFLICT)
+
+
+def _response_from_audit(existing: Evaluation) -> EvaluationResponse:
+    """Rebuild the response stored in an audit row (idempotent replay)."""
+    out = existing.output_json
+    expl = out.get("explanation") or {}
+    fired_rules = [FiredRule(**r) for r in expl.get("fired_rules", [])]
+    trace_data = expl.get("trace")
+    explanation = EvaluationExplanation(
+        fired_rules=fired_rules,
+        trace=EvaluationTrace.model_validate(trace_data) if isinstance(trace_data, dict) else None,
+    )
+    return EvaluationResponse(
+        evaluation_id=str(existing.evaluation_id),
+        ruleset=RulesetInfo(
+            jurisdiction=out["ruleset"]["jurisdiction"],
+            tax_type=out["ruleset"]["tax_type"],
+        ),
+        version=VersionInfo(
+            version=out["version"]["version"],
+            bundle_hash=out["version"]["bundle_hash"],
+        ),
+        result=EvaluationResult(**out["result"]),
+        explanation=explanation,
+    )
+
+
+def _trace_kwargs(options: ExplainOptions | None) -> dict | None:
+    """evaluate_rules trace options for an explain=full request; None for other levels."""
+    if not options or options.explain != "full":
+        return None
+    return {
+        "top_k_near_miss": options.near_miss,
+        "max_counterfactuals": options.counterfactuals,
+        "trace_budget": options.trace_budget,
+    }
+
+
+def _routed_bundle(trans: dict, ruleset: CachedRuleset, version: CachedVersion) -> CompiledBundle:
+    """
+    Compiled bundle for non-trace evaluation: specialized for the ruleset's routing fields,
+    or the full bundle if the transaction's jurisdiction/tax_type differ from them.
+    """
+    if trans.get("jurisdiction") == ruleset.jurisdiction and trans.get("tax_type") == ruleset.tax_type:
+        return get_routed_bundle(version.bundle_hash, version.bundle_json, ruleset.jurisdiction, ruleset.tax_type)
+    return get_compiled_bundle(version.bundle_hash, version.bundle_json)
+
+
+def _evaluate_context(
+    context: dict, amount: float, options: ExplainOptions | None, ruleset: CachedRuleset, version: CachedVersion
+) -> tuple[dict, dict]:
+    """(result, explanation) response sections for one transaction context against a resolved version."""
+    trace_kwargs = _trace_kwargs(options)
+    if trace_kwargs is not None:
+        # Traces report every rule, so they run on the full bundle
+        outcome = evaluate_rules(
+            context,
+            version.bundle_json.get("rules", []),
+            amount,
+            trace=True,
+            bundle=get_compiled_bundle(version.bundle_hash, version.bundle_json),
+            **trace_kwargs,
+        )
+    else:
+        compiled = _routed_bundle(context["transaction"], ruleset, version)
+        outcome = result_cache.evaluate(context, compiled, amount)
+    return _engine_bodies(*outcome)
+
+
+async def _evaluate_context_offloaded(
+    context: dict,
+    amount: float,
+    options: ExplainOptions | None,
+    ruleset: CachedRuleset,
+    version: CachedVersion,
+    tenant_id: str,
+    traces: int = 1,
+) -> tuple[dict, dict]:
+    """
+    _evaluate_context with costly explain=full traces evaluated on the trace pool. A trace
+    that times out is replaced by a winner-only explanation. `traces` is how many traces
+    the request makes in all (its invoice lines): their total cost decides the offload.
+    """
+    compiled = get_compiled_bundle(version.bundle_hash, version.bundle_json)
+    trace_kwargs = _trace_kwargs(options)
+    if trace_kwargs is None or not trace_pool.offloads(compiled, trace_kwargs["max_counterfactuals"], traces):
+        return _evaluate_context(context, amount, options, ruleset, version)
+
+    output = await trace_pool.evaluate(
+        tenant_id, version.bundle_hash, version.bundle_json, compiled, context, amount, trace_kwargs
+    )
+    if output is None:
+        routed = _routed_bundle(context["transaction"], ruleset, version)
+        result_body, explanation = _engine_bodies(*result_cache.evaluate(context, routed, amount))
+        explanation["trace_timed_out"] = True
+        return result_body, explanation
+    return _engine_bodies(*output)
+
+
+def _run_engine(
+    body: EvaluationRequest, ruleset: CachedRuleset, version: CachedVersion
+) -> tuple[dict, dict, dict]:
+    """
+    Evaluate body.transaction against a resolved version.
+    Returns (trans_dict, result, explanation) as plain dicts in response-body form.
+    """
+    trans_dict = body.transaction.model_dump()
+    result, explanation = _evaluate_context(
+        {"transaction": trans_dict}, body.transaction.amount, body.options, ruleset, version
+    )
+    return trans_dict, result, explanation
+
+
+async def _run_engine_offloaded(
+    body: EvaluationRequest, ruleset: CachedRuleset, version: CachedVersion, tenant_id: str
+) -> tuple[dict, dict, dict]:
+    """_run_engine for a single request, with costly explain=full traces evaluated on the trace pool."""
+    trans_dict = body.transaction.model_dump()
+    result, explanation = await _evaluate_context_offloaded(
+        {"transaction": trans_dict}, body.transaction.amount, body.options, ruleset, version, tenant_id
+    )
+    return trans_dict, result, explanation
+
+
+def _engine_bodies(
+    result: dict, fired: list[FiredRule], trace_out: EvaluationTrace | None
+) -> tuple[dict, dict]:
+    """
+    (result, explanation) response sections from engine output, in the same shape and
+    coercion as EvaluationResult/EvaluationExplanation.model_dump(). Rule-authored rate
+    components and risk flags still go through their models.
+    """
+    result_body = {
+        "taxable": result["taxable"],
+        "rate": result["rate"],
+        "tax_amount": result["tax_amount"],
+        "obligations": [o.model_dump() for o in result["obligations"]],
+        "rate_components": [RateComponent(**rc).model_dump() for rc in result.get("rate_components", [])],
+        "risk_flags": [RiskFlag(**rf).model_dump() for rf in result.get("risk_flags", [])],
+        "matched_rule_id": fired[0].rule_id if fired else None,
+    }
+    explanation = {
+        "fired_rules": [{"rule_id": r.rule_id, "name": r.name, "because": r.because} for r in fired],
+        "trace": trace_out.model_dump() if trace_out is not None else None,
+        "trace_timed_out": False,
+    }
+    return result_body, explanation
+
+
+def _input_json(body: EvaluationRequest, trans_dict: dict) -> dict:
+    """Audit input_json for a request."""
+    return {
+        "idempotency_key": body.idempotency_key,
+        "effective_at": body.effective_at.isoformat(),
+        "transaction": trans_dict,
+    }
+
+
+def _response_body(
+    evaluation_id: str,
+    body: EvaluationRequest,
+    version: CachedVersion,
+    result: dict,
+    explanation: dict,
+) -> dict:
+    """EvaluationResponse as a dict; stored as the audit output_json and sent as the HTTP body."""
+    trans = body.transaction
+    return {
+        "evaluation_id": evaluation_id,
+        "ruleset": {"jurisdiction": trans.jurisdiction, "tax_type": trans.tax_type},
+        "version": {"version": version.version, "bundle_hash": version.bundle_hash},
+        "result": result,
+        "explanation": explanation,
+    }
+
+
+def _replay_body(existing: Evaluation) -> dict:
+    """Response body for an idempotent replay (normalized through the response models)."""
+    return _response_from_audit(existing).model_dump()
+
+
+def _item_result(
+    index: int,
+    idempotency_key: str | None = None,
+    response: dict | None = None,
+    error: tuple[int, str] | None = None,
+) -> dict:
+    """BatchItemResult as a dict."""
+    return {
+        "index": index,
+        "idempotency_key": idempotency_key,
+        "response": response,
+        "error": {"status_code": error[0], "detail": error[1]} if error else None,
+    }
+
+
+def _evaluation_error(e: Exception) -> tuple[int, str]:
+    """Per-item error for an evaluation that raised: 422 for values of the wrong type, else 500."""
+    if isinstance(e, (TypeError, ValueError)):
+        return status.HTTP_422_UNPROCESSABLE_ENTITY, f"Transaction could not be evaluated: {e}"
+    logger.exception("Evaluation of a batch item failed")
+    return status.HTTP_500_INTERNAL_SERVER_ERROR, "Evaluation failed"
+
+
+async def _resolve_request(
+    db: AsyncSession, api_key_hash: str, body: EvaluationRequest
+) -> tuple[AuthenticatedTenant, CachedRuleset | None, Evaluation | None]:
+    """Tenant, ruleset and idempotent replay for one evaluation request (see _resolve_routed)."""
+    trans = body.transaction
+    return await _resolve_routed(db, api_key_hash, trans.jurisdiction, trans.tax_type, body.idempotency_key)
+
+
+async def _resolve_routed(
+    db: AsyncSession,
+    api_key_hash: str,
+    jurisdiction: str,
+    tax_type: str,
+    idempotency_key: str | None,
+) -> tuple[AuthenticatedTenant, CachedRuleset | None, Evaluation | None]:
+    """
+    Tenant, ruleset (with its version timeline) and idempotent replay for one request.
+    Parts held by the tenant/ruleset caches are not fetched; whatever is left comes back
+    in a single round trip (load_request_context), which also primes the caches.
+    """
+    tenant_cached, tenant = tenant_cache.lookup(api_key_hash)
+    if tenant_cached and tenant is None:
+        raise invalid_api_key()
+    ruleset_cached, ruleset = (
+        ruleset_cache.peek(tenant.tenant_id, jurisdiction, tax_type)
+        if tenant_cached
+        else (False, None)
+    )
+    if tenant_cached and ruleset_cached and not idempotency_key:
+        return tenant, ruleset, None
+    if tenant_cached and not idempotency_key:
+        # Only the ruleset is missing: a single-flight load, shared with concurrent misses
+        return tenant, await ruleset_cache.get(db, tenant.tenant_id, jurisdiction, tax_type), None
+
+    generation = ruleset_cache.generation
+    ctx = await load_request_context(
+        db,
+        api_key_hash,
+        jurisdiction,
+        tax_type,
+        include_ruleset=not ruleset_cached,
+        idempotency_key=idempotency_key,
+    )
+    if not tenant_cached:
+        tenant = remember_tenant(api_key_hash, ctx.tenant)
+        if tenant is None:
+            raise invalid_api_key()
+    if not ruleset_cached:
+        ruleset = snapshot(ctx.ruleset, ctx.versions) if ctx.ruleset else None
+        ruleset_cache.put(tenant.tenant_id, jurisdiction, tax_type, ruleset, generation)
+    return tenant, ruleset, ctx.existing
+
 
 @router.post("/evaluations", response_model=EvaluationResponse)
 async def evaluate_transaction(
     body: EvaluationRequest,
-    tenant: TenantDep,
+    api_key_hash: ApiKeyHashDep,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
     """
@@ -49,126 +360,660 @@ async def evaluate_transaction(
     - options.explain = "full": auditable trace with steps, condition evals, evidence_paths_used,
       missing_evidence, confidence, near-miss rules, and counterfactual guidance
       ("what to change to get a different outcome" with optional outcome_preview).
+      options.trace_budget caps the rule steps returned (the winner is always kept).
+      Costly full traces run on a worker pool; one that exceeds TRACE_TIMEOUT_SECONDS is
+      answered winner-only with explanation.trace_timed_out = true.
+
+    Idempotent when idempotency_key is provided; a key already used by another request
+    type (an invoice, a fan-out or one of its targets) is a 409.
 
-    Idempotent when idempotency_key is provided.
+    Authentication, ruleset/version resolution and the idempotency lookup cost at most
+    one database round trip together (none when tenant and ruleset are cached and no
+    idempotency_key is given).
+
+    If the ruleset has a shadow candidate, the transaction is queued for evaluation
+    against it after the response is built (see engine/shadow.py); that never delays or
+    changes the response.
     """
-    trans = body.transaction
-    ruleset = await get_ruleset_by_jurisdiction_tax(
-        db, str(tenant.tenant_id), trans.jurisdiction, trans.tax_type
-    )
+    tenant, ruleset, existing = await _resolve_request(db, api_key_hash, body)
     if not ruleset:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Ruleset not found for jurisdiction and tax type",
+            detail=RULESET_NOT_FOUND,
         )
 
     # Idempotency: return cached if exists
-    if body.idempotency_key:
-        existing = await get_evaluation_by_idempotency(
-            db, str(tenant.tenant_id), body.idempotency_key
-        )
-        if existing:
-            out = existing.output_json
-            expl = out.get("explanation") or {}
-            fired_rules = [FiredRule(**r) for r in expl.get("fired_rules", [])]
-            trace_data = expl.get("trace")
-            explanation = EvaluationExplanation(
-                fired_rules=fired_rules,
-                trace=EvaluationTrace.model_validate(trace_data) if isinstance(trace_data, dict) else None,
-            )
-            return EvaluationResponse(
-                evaluation_id=str(existing.evaluation_id),
-                ruleset=RulesetInfo(
-                    jurisdiction=out["ruleset"]["jurisdiction"],
-                    tax_type=out["ruleset"]["tax_type"],
-                ),
-                version=VersionInfo(
-                    version=out["version"]["version"],
-                    bundle_hash=out["version"]["bundle_hash"],
-                ),
-                result=EvaluationResult(**out["result"]),
-                explanation=explanation,
-            )
+    if existing:
+        if _record_kind(existing) != "single":
+            raise _idempotency_conflict()
+        return ORJSONResponse(_replay_body(existing))
 
-    version = await get_version_for_effective_at(
-        db, str(ruleset.ruleset_id), body.effective_at
-    )
+    version = ruleset.version_at(body.effective_at)
     if not version:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="No published version effective at the given effective_at",
+            detail=VERSION_NOT_FOUND,
         )
 
-    trans_dict = trans.model_dump()
-    context = {"transaction": trans_dict}
-    rules = version.bundle_json.get("rules", [])
-    options = body.options
-    explain = (options.explain if options else "none") or "none"
-    trace_requested = explain == "full"
-    top_k = (options.near_miss if options else 3) if trace_requested else 0
-    max_cf = (options.counterfactuals if options else 2) if trace_requested else 0
-
-    result, fired, trace_out = evaluate_rules(
-        context,
-        rules,
-        trans.amount,
-        trace=trace_requested,
-        top_k_near_miss=top_k,
-        max_counterfactuals=max_cf,
-    )
+    trans_dict, result, explanation = await _run_engine_offloaded(body, ruleset, version, str(tenant.tenant_id))
 
-    obligations = result["obligations"]
-    rate_components = [RateComponent(**rc) for rc in result.get("rate_components", [])]
-    risk_flags = [RiskFlag(**rf) for rf in result.get("risk_flags", [])]
-    matched_rule_id = fired[0].rule_id if fired else None
-    result_obj = EvaluationResult(
-        taxable=result["taxable"],
-        rate=result["rate"],
-        tax_amount=result["tax_amount"],
-        obligations=obligations,
-        rate_components=rate_components,
-        risk_flags=risk_flags,
-        matched_rule_id=matched_rule_id,
+    row = new_evaluation_row(
+        tenant_id=str(tenant.tenant_id),
+        ruleset_id=ruleset.ruleset_id,
+        version_id=version.version_id,
+        input_json=_input_json(body, trans_dict),
+        output_json={},  # Set below
+        idempotency_key=body.idempotency_key,
+        request_hash=request_hash(body.model_dump()),
     )
-    explanation = EvaluationExplanation(
-        fired_rules=[FiredRule(rule_id=r.rule_id, name=r.name, because=r.because) for r in fired],
-        trace=trace_out,
+    out = _response_body(row["evaluation_id"], body, version, result, explanation)
+    row["output_json"] = out
+    await _persist(db, [row])
+    if ruleset.shadow_hash and ruleset.shadow_hash != version.bundle_hash:
+        shadow_runner.submit(ruleset, row["evaluation_id"], {"transaction": trans_dict}, body.transaction.amount, result)
+
+    return ORJSONResponse(out)
+
+
+async def _persist(db: AsyncSession, rows: list[dict]) -> None:
+    """
+    Write audit rows. With AUDIT_MODE=async, rows without an idempotency key go to the
+    write-behind queue; keyed rows (and anything the queue rejects) are inserted inline
+    so the (tenant_id, idempotency_key) uniqueness check still happens in the request.
+    """
+    if settings.audit_mode == "async":
+        rows = [r for r in rows if r["idempotency_key"] or not audit_writer.submit(r)]
+    await create_evaluations(db, rows)
+
+
+async def _run_invoice(
+    body: InvoiceEvaluationRequest,
+    ruleset: CachedRuleset,
+    version: CachedVersion,
+    header: dict,
+    lines: list[dict],
+    tenant_id: str,
+) -> list[dict]:
+    """
+    Per-line {"result", "explanation"} sections for an invoice, in line order. explain=full
+    traces each line as POST /v1/evaluations would, one line at a time: on the trace pool
+    when the invoice's traces together are costly enough (a line whose trace times out is
+    winner-only), else inline with a yield to the event loop between lines.
+    """
+    trace_kwargs = _trace_kwargs(body.options)
+    sections = []
+    if trace_kwargs is None:
+        compiled = get_compiled_bundle(version.bundle_hash, version.bundle_json)
+        for result, fired in evaluate_lines(compiled, version.bundle_json, header, lines):
+            result_body, explanation = _engine_bodies(result, fired, None)
+            sections.append({"result": result_body, "explanation": explanation})
+        return sections
+    for trans in line_transactions(header, lines):
+        result, explanation = await _evaluate_context_offloaded(
+            {"transaction": trans}, trans["amount"], body.options, ruleset, version, tenant_id, len(lines)
+        )
+        sections.append({"result": result, "explanation": explanation})
+        await asyncio.sleep(0)
+    return sections
+
+
+@router.post("/evaluations:invoice", response_model=InvoiceEvaluationResponse)
+async def evaluate_invoice(
+    body: InvoiceEvaluationRequest,
+    api_key_hash: ApiKeyHashDep,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """
+    Evaluate every line of an invoice against one ruleset version.
+
+    Line i is evaluated as the transaction {**header, **lines[i]} (line_id excluded), with
+    the same result and explanation POST /v1/evaluations would give it; the response adds
+    invoice totals. The header is authenticated, resolved and validated once, predicates
+    over header-only fields are evaluated once per invoice rather than once per line, and
+    the whole invoice is audited as a single record. Idempotent when idempotency_key is
+    provided; a key already used by another request type is a 409.
+    """
+    if len(body.lines) > settings.invoice_max_lines:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invoice exceeds {settings.invoice_max_lines} lines",
+        )
+    lines = [line.model_dump(exclude={"line_id"}) for line in body.lines]
+    if any("jurisdiction" in line or "tax_type" in line for line in lines):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=INVOICE_LINE_ROUTING,
+        )
+    header = body.header
+    tenant, ruleset, existing = await _resolve_routed(
+        db, api_key_hash, header.jurisdiction, header.tax_type, body.idempotency_key
     )
+    if not ruleset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=RULESET_NOT_FOUND,
+        )
+    if existing:
+        if _record_kind(existing) != "invoice":
+            raise _idempotency_conflict()
+        return ORJSONResponse(InvoiceEvaluationResponse.model_validate(existing.output_json).model_dump())
 
-    req_hash = request_hash(body.model_dump())
-    input_json = {
-        "idempotency_key": body.idempotency_key,
-        "effective_at": body.effective_at.isoformat(),
-        "transaction": trans_dict,
-    }
+    version = ruleset.version_at(body.effective_at)
+    if not version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=VERSION_NOT_FOUND,
+        )
 
-    ev = await create_evaluation(
-        db=db,
+    header_dict = header.model_dump()
+    sections = await _run_invoice(body, ruleset, version, header_dict, lines, str(tenant.tenant_id))
+    row = new_evaluation_row(
         tenant_id=str(tenant.tenant_id),
-        ruleset_id=str(ruleset.ruleset_id),
-        version_id=str(version.version_id),
-        input_json=input_json,
+        ruleset_id=ruleset.ruleset_id,
+        version_id=version.version_id,
+        input_json={
+            "idempotency_key": body.idempotency_key,
+            "effective_at": body.effective_at.isoformat(),
+            "header": header_dict,
+            "lines": [{"line_id": line.line_id, **fields} for line, fields in zip(body.lines, lines)],
+        },
         output_json={},  # Set below
         idempotency_key=body.idempotency_key,
-        request_hash=req_hash,
+        request_hash=request_hash(body.model_dump()),
     )
-    explanation_dump = explanation.model_dump()
-    # Pydantic serializes trace (EvaluationTrace) in explanation; include in output for audit
-    output_json = {
-        "evaluation_id": str(ev.evaluation_id),
-        "ruleset": {"jurisdiction": trans.jurisdiction, "tax_type": trans.tax_type},
+    out = {
+        "evaluation_id": row["evaluation_id"],
+        "ruleset": {"jurisdiction": header.jurisdiction, "tax_type": header.tax_type},
         "version": {"version": version.version, "bundle_hash": version.bundle_hash},
-        "result": result_obj.model_dump(),
-        "explanation": explanation_dump,
+        "lines": [
+            {"index": i, "line_id": line.line_id, **section}
+            for i, (line, section) in enumerate(zip(body.lines, sections))
+        ],
+        "totals": invoice_totals([line["amount"] for line in lines], [sec["result"] for sec in sections]),
     }
-    ev.output_json = output_json
+    row["output_json"] = out
+    await _persist(db, [row])
 
-    return EvaluationResponse(
-        evaluation_id=str(ev.evaluation_id),
-        ruleset=RulesetInfo(jurisdiction=trans.jurisdiction, tax_type=trans.tax_type),
-        version=VersionInfo(version=version.version, bundle_hash=version.bundle_hash),
-        result=result_obj,
-        explanation=explanation,
+    return ORJSONResponse(out)
+
+
+async def _resolve_rulesets(
+    db: AsyncSession,
+    tenant_id: str,
+    items: list[EvaluationRequest],
+    rulesets: dict[tuple[str, str], CachedRuleset | None],
+) -> None:
+    """Add rulesets (with their version timelines) for pairs not yet in `rulesets`; misses map to None."""
+    pairs = sorted(
+        {(i.transaction.jurisdiction, i.transaction.tax_type) for i in items} - rulesets.keys()
+    )
+    if pairs:
+        rulesets.update(await ruleset_cache.get_many(db, tenant_id, pairs))
+
+
+def _evaluate_items(
+    items: list[EvaluationRequest],
+    tenant_id: str,
+    rulesets: dict[tuple[str, str], CachedRuleset | None],
+    existing: dict[str, Evaluation],
+    offset: int = 0,
+) -> tuple[list[dict], list[dict]]:
+    """
+    Evaluate a group of requests with preloaded rulesets/versions/idempotent results.
+    Returns per-item result dicts (in order, index = offset + position) and audit rows to insert.
+    An item the engine fails on gets an error result (see _evaluation_error) and no audit row.
+    """
+    results: list[dict | None] = [None] * len(items)
+    groups: dict[tuple[str, str], list[int]] = {}
+    routed: dict[str, CachedRuleset] = {}
+    versions: dict[str, CachedVersion] = {}
+    first_for_key: dict[str, int] = {}
+    duplicates: list[tuple[int, int]] = []
+
+    for pos, item in enumerate(items):
+        trans = item.transaction
+        key = item.idempotency_key
+        ruleset = rulesets.get((trans.jurisdiction, trans.tax_type))
+        if not ruleset:
+            results[pos] = _item_result(
+                offset + pos, key, error=(status.HTTP_404_NOT_FOUND, RULESET_NOT_FOUND)
+            )
+            continue
+        if key and key in existing:
+            if _record_kind(existing[key]) != "single":
+                results[pos] = _item_result(
+                    offset + pos, key, error=(status.HTTP_409_CONFLICT, IDEMPOTENCY_KEY_CONFLICT)
+                )
+            else:
+                results[pos] = _item_result(offset + pos, key, response=_replay_body(existing[key]))
+            continue
+        if key and key in first_for_key:
+            duplicates.append((pos, first_for_key[key]))
+            continue
+        version = ruleset.version_at(item.effective_at)
+        if not version:
+            results[pos] = _item_result(
+                offset + pos, key, error=(status.HTTP_404_NOT_FOUND, VERSION_NOT_FOUND)
+            )
+            continue
+        if key:
+            first_for_key[key] = pos
+        routed[ruleset.ruleset_id] = ruleset
+        versions[version.version_id] = version
+        groups.setdefault((ruleset.ruleset_id, version.version_id), []).append(pos)
+
+    rows: list[dict] = []
+    for (ruleset_id, version_id), positions in groups.items():
+        version = versions[version_id]
+        for pos in positions:
+            item = items[pos]
+            try:
+                trans_dict, result, explanation = _run_engine(item, routed[ruleset_id], version)
+            except Exception as e:
+                # One item the engine cannot evaluate must not fail the others
+                results[pos] = _item_result(offset + pos, item.idempotency_key, error=_evaluation_error(e))
+                continue
+            row = new_evaluation_row(
+                tenant_id=tenant_id,
+                ruleset_id=ruleset_id,
+                version_id=version_id,
+                input_json=_input_json(item, trans_dict),
+                output_json={},
+                idempotency_key=item.idempotency_key,
+                request_hash=request_hash(item.model_dump()),
+            )
+            out = _response_body(row["evaluation_id"], item, version, result, explanation)
+            row["output_json"] = out
+            rows.append(row)
+            results[pos] = _item_result(offset + pos, item.idempotency_key, response=out)
+
+    for pos, first in duplicates:
+        results[pos] = {**results[first], "index": offset + pos}
+
+    return results, rows
+
+
+@router.post("/evaluations:batch", response_model=BatchEvaluationResponse)
+async def evaluate_batch(
+    body: BatchEvaluationRequest,
+    tenant: TenantDep,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """
+    Evaluate many transactions in one call.
+
+    Items are grouped by (jurisdiction, tax_type, resolved version): rulesets, versions and
+    idempotency keys are each resolved with at most one query for the whole batch, every group is
+    evaluated against one compiled bundle, and all audit rows are written with a single
+    multi-row INSERT. Each item gets either a response (identical to POST /v1/evaluations)
+    or an error; one failing item does not fail the batch. Repeated idempotency keys within
+    a batch resolve to the first occurrence.
+    """
+    items = body.items
+    if len(items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Batch exceeds {settings.batch_max_items} items",
+        )
+    tenant_id = str(tenant.tenant_id)
+
+    rulesets: dict[tuple[str, str], CachedRuleset | None] = {}
+    await _resolve_rulesets(db, tenant_id, items, rulesets)
+    keys = sorted({i.idempotency_key for i in items if i.idempotency_key})
+    existing = await get_evaluations_by_idempotency_keys(db, tenant_id, keys)
+
+    results, rows = _evaluate_items(items, tenant_id, rulesets, existing)
+    await _persist(db, rows)
+    return ORJSONResponse({"results": results})
+
+
+def _target_name(pair: tuple[str, str]) -> str:
+    """Fan-out results key for a (jurisdiction, tax_type) target."""
+    return f"{pair[0]}:{pair[1]}"
+
+
+def _fanout_result(
+    jurisdiction: str,
+    tax_type: str,
+    response: dict | None = None,
+    error: tuple[int, str] | None = None,
+) -> dict:
+    """FanoutTargetResult as a dict."""
+    return {
+        "jurisdiction": jurisdiction,
+        "tax_type": tax_type,
+        "response": response,
+        "error": {"status_code": error[0], "detail": error[1]} if error else None,
+    }
+
+
+@router.post("/evaluations:fanout", response_model=FanoutEvaluationResponse)
+async def evaluate_fanout(
+    body: FanoutEvaluationRequest,
+    tenant: TenantDep,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """
+    Evaluate one transaction for several (jurisdiction, tax_type) targets.
+
+    results["<jurisdiction>:<tax_type>"] holds the response POST /v1/evaluations would give
+    for the transaction routed to that target, or that call's error; one failing target
+    does not fail the others. The rulesets and version timelines of all targets are
+    resolved with at most one query, the transaction is parsed once and shared by every
+    target, and targets are evaluated concurrently (explain=full traces side by side on
+    the trace pool).
+
+    audit=per_target writes one audit record per target (idempotency key
+    "<idempotency_key>:<jurisdiction>:<tax_type>", so targets already stored are replayed
+    and only the rest are evaluated). audit=combined writes a single record holding every
+    result, filed under the first evaluated target's ruleset and version. Records carry
+    their kind, so a key (or derived key) already used by another request type is a 409:
+    for the whole request under audit=combined, per target under audit=per_target.
+    """
+    targets = list(dict.fromkeys((t.jurisdiction, t.tax_type) for t in body.targets))
+    if len(targets) > settings.fanout_max_targets:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Fan-out exceeds {settings.fanout_max_targets} targets",
+        )
+    trans_dict = body.transaction.model_dump()
+    if "jurisdiction" in trans_dict or "tax_type" in trans_dict:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=FANOUT_TRANSACTION_ROUTING,
+        )
+    tenant_id = str(tenant.tenant_id)
+    combined = body.audit == "combined"
+    key = body.idempotency_key
+    target_keys = {pair: f"{key}:{_target_name(pair)}" for pair in targets} if key and not combined else {}
+
+    rulesets = await ruleset_cache.get_many(db, tenant_id, targets)
+    existing = await get_evaluations_by_idempotency_keys(
+        db, tenant_id, [key] if key and combined else sorted(target_keys.values())
+    )
+    if combined and key in existing:
+        if _record_kind(existing[key]) != "fanout":
+            raise _idempotency_conflict()
+        return ORJSONResponse(FanoutEvaluationResponse.model_validate(existing[key].output_json).model_dump())
+
+    results: dict[str, dict | None] = {_target_name(pair): None for pair in targets}
+    pending: list[tuple[tuple[str, str], CachedRuleset, CachedVersion]] = []
+    for pair in targets:
+        ruleset = rulesets[pair]
+        if not ruleset:
+            results[_target_name(pair)] = _fanout_result(*pair, error=(status.HTTP_404_NOT_FOUND, RULESET_NOT_FOUND))
+            continue
+        if target_keys.get(pair) in existing:
+            stored = existing[target_keys[pair]]
+            if _record_kind(stored) != "fanout_target" or stored.input_json["fanout_idempotency_key"] != key:
+                results[_target_name(pair)] = _fanout_result(
+                    *pair, error=(status.HTTP_409_CONFLICT, IDEMPOTENCY_KEY_CONFLICT)
+                )
+            else:
+                results[_target_name(pair)] = _fanout_result(*pair, response=_replay_body(stored))
+            continue
+        version = ruleset.version_at(body.effective_at)
+        if not version:
+            results[_target_name(pair)] = _fanout_result(*pair, error=(status.HTTP_404_NOT_FOUND, VERSION_NOT_FOUND))
+            continue
+        pending.append((pair, ruleset, version))
+
+    # Targets share the parsed transaction; only the routing fields differ
+    contexts = [{"transaction": {**trans_dict, "jurisdiction": j, "tax_type": t}} for (j, t), _, _ in pending]
+    outcomes = await asyncio.gather(*(
+        _evaluate_context_offloaded(context, body.transaction.amount, body.options, ruleset, version, tenant_id)
+        for context, (_, ruleset, version) in zip(contexts, pending)
+    ))
+
+    hashed = request_hash(body.model_dump())
+    combined_row = None
+    if combined and pending:
+        _, ruleset, version = pending[0]
+        combined_row = new_evaluation_row(
+            tenant_id=tenant_id,
+            ruleset_id=ruleset.ruleset_id,
+            version_id=version.version_id,
+            input_json={
+                "idempotency_key": key,
+                "effective_at": body.effective_at.isoformat(),
+                "transaction": trans_dict,
+                "targets": [{"jurisdiction": j, "tax_type": t} for j, t in targets],
+            },
+            output_json={},  # Set below
+            idempotency_key=key,
+            request_hash=hashed,
+        )
+    rows: list[dict] = []
+    for context, (pair, ruleset, version), (result, explanation) in zip(contexts, pending, outcomes):
+        row = None
+        if not combined:
+            row = new_evaluation_row(
+                tenant_id=tenant_id,
+                ruleset_id=ruleset.ruleset_id,
+                version_id=version.version_id,
+                input_json={
+                    "idempotency_key": target_keys.get(pair),
+                    "fanout_idempotency_key": key,
+                    "effective_at": body.effective_at.isoformat(),
+                    "transaction": context["transaction"],
+                },
+                output_json={},  # Set below
+                idempotency_key=target_keys.get(pair),
+                request_hash=hashed,
+            )
+            rows.append(row)
+        response = {
+            "evaluation_id": (row or combined_row)["evaluation_id"],
+            "ruleset": {"jurisdiction": pair[0], "tax_type": pair[1]},
+            "version": {"version": version.version, "bundle_hash": version.bundle_hash},
+            "result": result,
+            "explanation": explanation,
+        }
+        if row is not None:
+            row["output_json"] = response
+        results[_target_name(pair)] = _fanout_result(*pair, response=response)
+
+    out = {"evaluation_id": combined_row["evaluation_id"] if combined_row else None, "results": results}
+    if combined_row is not None:
+        combined_row["output_json"] = out
+        rows.append(combined_row)
+    await _persist(db, rows)
+    return ORJSONResponse(out)
+
+
+@router.post("/evaluations:timeline", response_model=TimelineEvaluationResponse)
+async def evaluate_timeline(
+    body: TimelineEvaluationRequest,
+    tenant: TenantDep,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """
+    Evaluate a transaction for every effective_at in [effective_from, effective_to).
+
+    The range is cut at version boundaries into segments; each carries the version in
+    effect (with its own effective_from/effective_to) and the outcome POST /v1/evaluations
+    would give for any effective_at inside it. The ruleset's version timeline comes from
+    the ruleset cache (one query on a miss) and the transaction is evaluated once per
+    distinct version, not once per date. A what-if query: nothing is audited.
+    """
+    if body.effective_to <= body.effective_from:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="effective_to must be after effective_from",
+        )
+    tenant_id = str(tenant.tenant_id)
+    trans = body.transaction
+    ruleset = await ruleset_cache.get(db, tenant_id, trans.jurisdiction, trans.tax_type)
+    if not ruleset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=RULESET_NOT_FOUND,
+        )
+
+    segments = ruleset.segments(body.effective_from, body.effective_to)
+    versions = list({v.version_id: v for _, _, v in segments if v is not None}.values())
+    context = {"transaction": trans.model_dump()}
+    outcomes = await asyncio.gather(*(
+        _evaluate_context_offloaded(context, trans.amount, body.options, ruleset, version, tenant_id)
+        for version in versions
+    ))
+    by_version = {version.version_id: outcome for version, outcome in zip(versions, outcomes)}
+
+    out = []
+    for start, end, version in segments:
+        segment = {"effective_from": start, "effective_to": end, "version": None, "result": None, "explanation": None}
+        if version is not None:
+            result, explanation = by_version[version.version_id]
+            segment.update(
+                version={
+                    "version": version.version,
+                    "bundle_hash": version.bundle_hash,
+                    "effective_from": version.effective_from,
+                    "effective_to": version.effective_to,
+                },
+                result=result,
+                explanation=explanation,
+            )
+        out.append(segment)
+    return ORJSONResponse({
+        "ruleset": {"jurisdiction": trans.jurisdiction, "tax_type": trans.tax_type},
+        "segments": out,
+    })
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body iterator reads the request body itself.
+
+    Starlette's default disconnect listener would consume request body messages from
+    `receive`; here the iterator owns `receive` and sees disconnects via request.stream().
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _ndjson_lines(request: Request, max_line: int) -> AsyncIterator[bytes | None]:
+    """
+    Split the request body stream into lines without buffering the whole body. A line
+    longer than max_line bytes is skipped as it arrives and yielded as None.
+    """
+    buf = bytearray()
+    too_long = False
+    async for chunk in request.stream():
+        start = 0
+        while (end := chunk.find(b"\n", start)) >= 0:
+            if not too_long and len(buf) + end - start <= max_line:
+                buf += chunk[start:end]
+                yield bytes(buf)
+            else:
+                yield None
+            buf.clear()
+            too_long = False
+            start = end + 1
+        if not too_long:
+            buf += chunk[start:]
+            if len(buf) > max_line:
+                buf.clear()
+                too_long = True
+    if too_long:
+        yield None
+    elif buf:
+        yield bytes(buf)
+
+
+def _validation_detail(e: ValidationError) -> str:
+    """Compact one-line summary of a request validation error."""
+    parts = []
+    for err in e.errors():
+        loc = ".".join(str(p) for p in err["loc"])
+        parts.append(f"{loc}: {err['msg']}" if loc else err["msg"])
+    return "; ".join(parts)
+
+
+async def _stream_results(
+    request: Request, tenant_id: str, audit: str
+) -> AsyncIterator[bytes]:
+    """Parse, evaluate and (optionally) audit NDJSON lines chunk by chunk."""
+    rulesets: dict[tuple[str, str], CachedRuleset | None] = {}
+    chunk_size = settings.stream_chunk_size
+
+    async with async_session_maker() as db:
+
+        async def flush(pending: list[tuple[int, EvaluationRequest | dict]]) -> bytes:
+            items = [p for _, p in pending if isinstance(p, EvaluationRequest)]
+            try:
+                await _resolve_rulesets(db, tenant_id, items, rulesets)
+                keys = sorted({i.idempotency_key for i in items if i.idempotency_key})
+                existing = await get_evaluations_by_idempotency_keys(db, tenant_id, keys)
+                evaluated, rows = _evaluate_items(items, tenant_id, rulesets, existing)
+                if audit == "batched" and rows:
+                    await _persist(db, rows)
+                    await db.commit()
+            except Exception:
+                # Earlier chunks are already sent: report this one line by line and go on
+                logger.exception("Evaluation stream chunk failed")
+                await db.rollback()
+                evaluated = [
+                    _item_result(0, i.idempotency_key, error=(status.HTTP_500_INTERNAL_SERVER_ERROR, STREAM_CHUNK_FAILED))
+                    for i in items
+                ]
+            out = iter(evaluated)
+            lines = []
+            for line_no, p in pending:
+                res = p if isinstance(p, dict) else next(out)
+                lines.append(dumps({**res, "index": line_no}))
+            lines.append(b"")
+            return b"\n".join(lines)
+
+        pending: list[tuple[int, EvaluationRequest | dict]] = []
+        line_no = -1
+        async for raw in _ndjson_lines(request, settings.stream_max_line_bytes):
+            line_no += 1
+            if raw is None:
+                pending.append((line_no, _item_result(
+                    line_no, error=(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, STREAM_LINE_TOO_LONG)
+                )))
+            elif not raw.strip():
+                continue
+            else:
+                try:
+                    pending.append((line_no, EvaluationRequest.model_validate_json(raw)))
+                except ValidationError as e:
+                    pending.append((line_no, _item_result(
+                        line_no, error=(status.HTTP_422_UNPROCESSABLE_ENTITY, _validation_detail(e))
+                    )))
+            if len(pending) >= chunk_size:
+                yield await flush(pending)
+                pending = []
+        if pending:
+            yield await flush(pending)
+
+
+@router.post("/evaluations:stream")
+async def evaluate_stream(
+    request: Request,
+    tenant: TenantDep,
+    audit: Literal["batched", "none"] = "batched",
+):
+    """
+    Streaming bulk evaluation (NDJSON in, NDJSON out) for backfills.
+
+    Each request line is an EvaluationRequest; each response line is a batch item result
+    whose `index` is the 0-based input line number. The body is read incrementally and
+    processed in chunks of STREAM_CHUNK_SIZE lines, so memory stays flat regardless of
+    upload size and a slow reader throttles how fast the upload is consumed. Rulesets and
+    versions are resolved once per stream. audit=batched writes one multi-row INSERT and
+    commit per chunk; audit=none skips persistence (idempotent replays still apply).
+    A line that fails (invalid JSON or request, longer than STREAM_MAX_LINE_BYTES, no
+    ruleset/version, a value the engine cannot compare) gets an error line and the stream goes on; if a whole chunk fails
+    (e.g. its audit INSERT), each of its lines gets an error line and nothing in it is stored.
+    """
+    return _DuplexStreamingResponse(
+        _stream_results(request, str(tenant.tenant_id), audit),
+        media_type="application/x-ndjson",
     )
 
 
@@ -1,7 +1,22 @@
 """Health and metrics endpoints."""
 
+import os
+
 from fastapi import APIRouter
 
+from crms.auth.tenant_cache import tenant_cache
+from crms.engine.compiler import compiled_cache_stats
+from crms.engine.result_cache import result_cache
+from crms.engine.shadow import shadow_runner
+from crms.engine.specialize import routed_cache_stats
+from crms.engine.trace_pool import trace_pool
+from crms.prefork import launch
+from crms.storage.audit_writer import audit_writer
+from crms.storage.invalidation import invalidation_listener
+from crms.storage.prewarm import version_prewarmer
+from crms.storage.ruleset_cache import ruleset_cache
+from crms.utils.memory import memory_stats
+
 router = APIRouter()
 
 
@@ -14,4 +29,20 @@ async def health():
 @router.get("/metrics")
 async def metrics():
     """Basic metrics endpoint for observability."""
-    return {"service": "crms", "version": "0.1.0"}
+    return {
+        "service": "crms",
+        "version": "0.1.0",
+        "process": {"pid": os.getpid(), "preforked": False, **launch, **memory_stats()},
+        "audit_writer": audit_writer.stats(),
+        "trace_pool": trace_pool.stats(),
+        "shadow": shadow_runner.stats(),
+        "prewarm": version_prewarmer.stats(),
+        "invalidation": invalidation_listener.stats(),
+        "caches": {
+            "tenants": tenant_cache.stats(),
+            "rulesets": ruleset_cache.stats(),
+            "compiled_bundles": compiled_cache_stats(),
+            "routed_bundles": routed_cache_stats(),
+            "results": result_cache.stats(),
+        },
+    }
@@ -0,0 +1,21 @@
+"""JSON responses encoded with orjson from plain dicts (no response_model re-validation)."""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON (same output shape as Starlette's JSONResponse)."""
+    return orjson.dumps(content)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson. Returning a Response from an endpoint makes FastAPI
+    skip response_model validation/serialization; response_model still documents the body.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
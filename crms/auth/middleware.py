@@ -11,6 +11,7 @@ from crms.config import settings
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from crms.auth.tenant_cache import AuthenticatedTenant, tenant_cache
 from crms.database import get_db
 from crms.models.tenant import Tenant
 
@@ -25,12 +26,13 @@ def hash_api_key(api_key: str) -> str:
     ).hexdigest()
 
 
-async def get_tenant_from_bearer(
-    request: Request,
-    db: Annotated[AsyncSession, Depends(get_db)],
-    auth_header: str | None = Depends(API_KEY_HEADER),
-) -> Tenant:
-    """Extract tenant from Bearer token (API key)."""
+def invalidate_api_key(api_key: str) -> None:
+    """Drop a key from the tenant cache (key rotation/revocation, or a newly issued key)."""
+    tenant_cache.invalidate(hash_api_key(api_key))
+
+
+def get_api_key_hash(auth_header: str | None = Depends(API_KEY_HEADER)) -> str:
+    """Validate the Bearer header and return the salted API key hash (no DB access)."""
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -42,18 +44,44 @@ async def get_tenant_from_bearer(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Missing API key",
         )
-    api_key_hash = hash_api_key(api_key)
-    result = await db.execute(
-        select(Tenant).where(Tenant.api_key_hash == api_key_hash)
+    return hash_api_key(api_key)
+
+
+def invalid_api_key() -> HTTPException:
+    """403 raised for a key that matches no tenant."""
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Invalid API key",
     )
-    tenant = result.scalar_one_or_none()
-    if not tenant:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Invalid API key",
+
+
+def remember_tenant(api_key_hash: str, row: Tenant | None) -> AuthenticatedTenant | None:
+    """Snapshot a tenants lookup result into the tenant cache (None caches an invalid key)."""
+    tenant = AuthenticatedTenant(tenant_id=str(row.tenant_id), name=row.name) if row else None
+    tenant_cache.store(api_key_hash, tenant)
+    return tenant
+
+
+async def get_tenant_from_bearer(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    api_key_hash: str = Depends(get_api_key_hash),
+) -> AuthenticatedTenant:
+    """
+    Extract tenant from Bearer token (API key).
+    Lookups go through tenant_cache; the DB is only queried on a cache miss.
+    """
+    cached, tenant = tenant_cache.lookup(api_key_hash)
+    if not cached:
+        result = await db.execute(
+            select(Tenant).where(Tenant.api_key_hash == api_key_hash)
         )
+        tenant = remember_tenant(api_key_hash, result.scalar_one_or_none())
+    if not tenant:
+        raise invalid_api_key()
     return tenant
 
 
-# Type alias for dependency injection
-TenantDep = Annotated[Tenant, Depends(get_tenant_from_bearer)]
+# Type aliases for dependency injection
+ApiKeyHashDep = Annotated[str, Depends(get_api_key_hash)]
+TenantDep = Annotated[AuthenticatedTenant, Depends(get_tenant_from_bearer)]
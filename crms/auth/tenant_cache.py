@@ -0,0 +1,63 @@
+"""In-process cache from salted API-key hash to tenant.
+
+Valid keys are cached for TENANT_CACHE_TTL_SECONDS. Unknown keys are cached separately
+for a short TENANT_CACHE_NEGATIVE_TTL_SECONDS, in their own bounded LRU, so a flood of
+bad keys neither reaches the database on every request nor evicts valid tenants.
+"""
+
+from dataclasses import dataclass
+
+from crms.config import settings
+from crms.utils.lru import LRUCache
+
+
+@dataclass(slots=True, frozen=True)
+class AuthenticatedTenant:
+    """Detached snapshot of a Tenant row (safe to share across sessions)."""
+
+    tenant_id: str
+    name: str
+
+
+class TenantCache:
+    """api_key_hash -> AuthenticatedTenant, with negative entries for invalid keys."""
+
+    def __init__(self, maxsize: int, ttl: float | None, negative_maxsize: int, negative_ttl: float):
+        self._valid = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._invalid = LRUCache(maxsize=negative_maxsize, ttl=negative_ttl)
+
+    def lookup(self, api_key_hash: str) -> tuple[bool, AuthenticatedTenant | None]:
+        """(cached, tenant): tenant is None for a key cached as invalid."""
+        tenant = self._valid.get(api_key_hash)
+        if tenant is not None:
+            return True, tenant
+        if self._invalid.get(api_key_hash) is not None:
+            return True, None
+        return False, None
+
+    def store(self, api_key_hash: str, tenant: AuthenticatedTenant | None) -> None:
+        if tenant is None:
+            self._invalid.set(api_key_hash, True)
+        else:
+            self._valid.set(api_key_hash, tenant)
+            self._invalid.pop(api_key_hash)
+
+    def invalidate(self, api_key_hash: str) -> None:
+        """Forget a key (call when a key is rotated, revoked or created)."""
+        self._valid.pop(api_key_hash)
+        self._invalid.pop(api_key_hash)
+
+    def clear(self) -> None:
+        self._valid.clear()
+        self._invalid.clear()
+
+    def stats(self) -> dict:
+        return {"valid": self._valid.stats(), "invalid": self._invalid.stats()}
+
+
+tenant_cache = TenantCache(
+    maxsize=settings.tenant_cache_size,
+    ttl=settings.tenant_cache_ttl_seconds,
+    negative_maxsize=settings.tenant_cache_negative_size,
+    negative_ttl=settings.tenant_cache_negative_ttl_seconds,
+)
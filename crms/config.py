@@ -1,5 +1,7 @@
 """Application configuration."""
 
+from typing import Literal
+
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -21,5 +23,65 @@ class Settings(BaseSettings):
     api_key_hash_salt: str = "default_salt_change_in_prod"
     log_level: str = "INFO"
 
+    # Evaluation API
+    batch_max_items: int = 1000
+    invoice_max_lines: int = 1000
+    fanout_max_targets: int = 50
+    stream_chunk_size: int = 500
+    stream_max_line_bytes: int = 1024 * 1024
+
+    # Audit writes: "sync" inserts in the request transaction, "async" queues rows for a
+    # background batch writer (idempotency-keyed evaluations are always written inline)
+    audit_mode: Literal["sync", "async"] = "sync"
+    audit_queue_size: int = 10000
+    audit_batch_size: int = 500
+    audit_flush_interval_seconds: float = 0.2
+    # Failed background batches: retries with doubling backoff, then row-by-row inserts;
+    # rows that still fail are appended here as NDJSON ("" disables the spill file)
+    audit_write_retries: int = 3
+    audit_retry_backoff_seconds: float = 0.1
+    audit_spill_path: str = "audit_spill.ndjson"
+
+    # Shadow evaluation of a ruleset's candidate bundle after each POST /v1/evaluations
+    # (per process); submissions beyond SHADOW_QUEUE_SIZE queued are dropped
+    shadow_queue_size: int = 1000
+    shadow_max_samples: int = 20
+
+    # explain=full evaluations at or above TRACE_COST_THRESHOLD (rules x (1 + counterfactuals))
+    # run on a thread/process pool; a trace that has no tenant slot or does not finish within
+    # TRACE_TIMEOUT_SECONDS falls back to a winner-only explanation
+    trace_executor: Literal["inline", "thread", "process"] = "thread"
+    trace_workers: int = 4
+    trace_cost_threshold: int = 200
+    trace_tenant_concurrency: int = 2
+    trace_timeout_seconds: float = 2.0
+
+    # Non-trace results per (bundle hash, projected transaction) (per process); 0 disables
+    result_cache_size: int = 50000
+    result_cache_max_bytes: int = 64 * 1024 * 1024
+
+    # Ruleset/version cache (per process)
+    ruleset_cache_size: int = 10000
+    ruleset_cache_ttl_seconds: float = 60.0
+
+    # Cross-worker invalidation: admin writes NOTIFY, each worker LISTENs on one connection.
+    # While the listener is connected, cached entries live RULESET_CACHE_LISTEN_TTL_SECONDS;
+    # otherwise RULESET_CACHE_TTL_SECONDS
+    invalidation_listen: bool = True
+    ruleset_cache_listen_ttl_seconds: float = 86400.0
+    invalidation_reconnect_seconds: float = 5.0
+    invalidation_keepalive_seconds: float = 30.0
+
+    # Versions taking effect within PREWARM_HORIZON_SECONDS are loaded and compiled every
+    # PREWARM_INTERVAL_SECONDS (per process); 0 disables
+    prewarm_interval_seconds: float = 30.0
+    prewarm_horizon_seconds: float = 600.0
+
+    # API key -> tenant cache (per process)
+    tenant_cache_size: int = 10000
+    tenant_cache_ttl_seconds: float = 300.0
+    tenant_cache_negative_size: int = 10000
+    tenant_cache_negative_ttl_seconds: float = 5.0
+
 
 settings = Settings()
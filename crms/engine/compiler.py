@@ -0,0 +1,615 @@
+"""Bundle compiler - turns a published bundle into pre-sorted predicate closures.
+
+Semantics mirror evaluator._eval_condition exactly (same operator precedence when a
+condition dict carries several keys, same missing-path handling); the compiled form
+only removes per-request interpretation overhead.
+
+Within a bundle, identical condition nodes compile to one predicate and each path to
+one resolver. Nodes that occur more than once (e.g. the same
+`eq transaction.buyer.type CONSUMER` leaf in many rules) get a slot in a
+per-transaction memo: each is evaluated at most once per transaction, lazily, and
+later rules reuse its truth value.
+"""
+
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from crms.engine.tables import RateTable, compile_tables, rate_from
+from crms.utils.lru import LRUCache
+
+# Compiled predicates take the context and the per-transaction memo (CompiledBundle.new_memo()).
+Predicate = Callable[[dict, list], bool]
+
+# Same probe order as _eval_condition: first operator present in the dict wins.
+OP_ORDER = (
+    "eq", "neq", "gt", "gte", "lt", "lte", "in",
+    "exists", "not_exists", "path_neq", "path_eq", "all", "any",
+)
+
+
+def condition_op(cond: dict) -> str | None:
+    """Operator that _eval_condition would dispatch on for this dict, if any."""
+    for op in OP_ORDER:
+        if op in cond:
+            return op
+    return None
+
+
+def split_path(path: str) -> tuple[str, ...]:
+    """Pre-split a dotted path once at compile time."""
+    return tuple(path.split("."))
+
+
+def make_getter(path: str) -> Callable[[Any], Any]:
+    """Return a resolver for a dotted path; missing keys resolve to None (like _get_path)."""
+    parts = split_path(path)
+    if len(parts) == 2:
+        a, b = parts
+
+        def get2(obj: Any) -> Any:
+            if not isinstance(obj, dict):
+                return None
+            cur = obj.get(a)
+            return cur.get(b) if isinstance(cur, dict) else None
+
+        return get2
+    if len(parts) == 3:
+        a, b, c = parts
+
+        def get3(obj: Any) -> Any:
+            if not isinstance(obj, dict):
+                return None
+            cur = obj.get(a)
+            if not isinstance(cur, dict):
+                return None
+            cur = cur.get(b)
+            return cur.get(c) if isinstance(cur, dict) else None
+
+        return get3
+
+    def get_n(obj: Any) -> Any:
+        cur = obj
+        for p in parts:
+            if not isinstance(cur, dict):
+                return None
+            cur = cur.get(p)
+        return cur
+
+    return get_n
+
+
+_UNSET = object()  # memo slot not evaluated yet
+
+
+def _never(_: dict, _memo: list) -> bool:
+    return False
+
+
+def _always(_: dict, _memo: list) -> bool:
+    return True
+
+
+def _exists_path(arg: Any) -> str:
+    return arg[0] if isinstance(arg, list) else arg
+
+
+def _build_eq(arg: Any, c: "_Compiler") -> Predicate:
+    path, expected = arg
+    get = c.value(path)
+    return lambda tx, memo: get(tx) == expected
+
+
+def _build_neq(arg: Any, c: "_Compiler") -> Predicate:
+    path, expected = arg
+    get = c.value(path)
+    return lambda tx, memo: get(tx) != expected
+
+
+def _build_gt(arg: Any, c: "_Compiler") -> Predicate:
+    path, expected = arg
+    get = c.value(path)
+
+    def gt(tx: dict, memo: list) -> bool:
+        val = get(tx)
+        return val is not None and val > expected
+
+    return gt
+
+
+def _build_gte(arg: Any, c: "_Compiler") -> Predicate:
+    path, expected = arg
+    get = c.value(path)
+
+    def gte(tx: dict, memo: list) -> bool:
+        val = get(tx)
+        return val is not None and val >= expected
+
+    return gte
+
+
+def _build_lt(arg: Any, c: "_Compiler") -> Predicate:
+    path, expected = arg
+    get = c.value(path)
+
+    def lt(tx: dict, memo: list) -> bool:
+        val = get(tx)
+        return val is not None and val < expected
+
+    return lt
+
+
+def _build_lte(arg: Any, c: "_Compiler") -> Predicate:
+    path, expected = arg
+    get = c.value(path)
+
+    def lte(tx: dict, memo: list) -> bool:
+        val = get(tx)
+        return val is not None and val <= expected
+
+    return lte
+
+
+def _build_in(arg: Any, c: "_Compiler") -> Predicate:
+    path, allowed = arg
+    if not isinstance(allowed, (list, tuple)):
+        return _never
+    get = c.value(path)
+    seq = tuple(allowed)
+    try:
+        members = frozenset(seq)
+    except TypeError:
+        # Unhashable operands (e.g. nested lists): fall back to a linear scan
+        return lambda tx, memo: get(tx) in seq
+
+    def in_(tx: dict, memo: list) -> bool:
+        val = get(tx)
+        try:
+            return val in members
+        except TypeError:
+            return val in seq
+
+    return in_
+
+
+def _build_exists(arg: Any, c: "_Compiler") -> Predicate:
+    get = c.value(_exists_path(arg))
+
+    def exists(tx: dict, memo: list) -> bool:
+        val = get(tx)
+        return val is not None and val != ""
+
+    return exists
+
+
+def _build_not_exists(arg: Any, c: "_Compiler") -> Predicate:
+    get = c.value(_exists_path(arg))
+
+    def not_exists(tx: dict, memo: list) -> bool:
+        val = get(tx)
+        return val is None or val == ""
+
+    return not_exists
+
+
+def _build_path_neq(arg: Any, c: "_Compiler") -> Predicate:
+    path1, path2 = arg
+    get1, get2 = c.value(path1), c.value(path2)
+
+    def path_neq(tx: dict, memo: list) -> bool:
+        v1 = get1(tx)
+        v2 = get2(tx)
+        return v1 is not None and v2 is not None and v1 != v2
+
+    return path_neq
+
+
+def _build_path_eq(arg: Any, c: "_Compiler") -> Predicate:
+    path1, path2 = arg
+    get1, get2 = c.value(path1), c.value(path2)
+
+    def path_eq(tx: dict, memo: list) -> bool:
+        v1 = get1(tx)
+        v2 = get2(tx)
+        return v1 is not None and v2 is not None and v1 == v2
+
+    return path_eq
+
+
+def _build_all(arg: Any, c: "_Compiler") -> Predicate:
+    preds = tuple(c.compile(child) for child in arg)
+    if not preds:
+        return _always
+    if len(preds) == 1:
+        return preds[0]
+
+    def all_(tx: dict, memo: list) -> bool:
+        for p in preds:
+            if not p(tx, memo):
+                return False
+        return True
+
+    return all_
+
+
+def _build_any(arg: Any, c: "_Compiler") -> Predicate:
+    preds = tuple(c.compile(child) for child in arg)
+    if not preds:
+        return _never
+    if len(preds) == 1:
+        return preds[0]
+
+    def any_(tx: dict, memo: list) -> bool:
+        for p in preds:
+            if p(tx, memo):
+                return True
+        return False
+
+    return any_
+
+
+_BUILDERS: dict[str, Callable[[Any, "_Compiler"], Predicate]] = {
+    "eq": _build_eq,
+    "neq": _build_neq,
+    "gt": _build_gt,
+    "gte": _build_gte,
+    "lt": _build_lt,
+    "lte": _build_lte,
+    "in": _build_in,
+    "exists": _build_exists,
+    "not_exists": _build_not_exists,
+    "path_neq": _build_path_neq,
+    "path_eq": _build_path_eq,
+    "all": _build_all,
+    "any": _build_any,
+}
+
+
+def _node_key(op: str, arg: Any) -> tuple[str, str]:
+    """Identity of a condition node: nodes with equal keys always evaluate alike."""
+    return op, repr(arg)
+
+
+class _Compiler:
+    """
+    Compiles the conditions of one bundle. Identical nodes compile to one predicate
+    and nodes occurring more than once get a memo slot, so they are evaluated at most
+    once per transaction.
+    """
+
+    def __init__(self, conditions: list[dict]):
+        self.node_counts: Counter = Counter()
+        for cond in conditions:
+            self._count(cond)
+        self.slots = 0
+        self._values: dict[str, Callable[[Any], Any]] = {}
+        self._nodes: dict[tuple[str, str], Predicate] = {}
+
+    def _count(self, cond: dict) -> None:
+        op = condition_op(cond)
+        if not op:
+            return
+        key = _node_key(op, cond[op])
+        self.node_counts[key] += 1
+        if op in ("all", "any"):
+            for child in cond[op]:
+                self._count(child)
+
+    def _slot(self) -> int:
+        self.slots += 1
+        return self.slots - 1
+
+    def value(self, path: str) -> Callable[[Any], Any]:
+        """Resolver for a path, built once and shared by every leaf that reads it."""
+        fn = self._values.get(path)
+        if fn is None:
+            fn = self._values[path] = make_getter(path)
+        return fn
+
+    def compile(self, cond: dict) -> Predicate:
+        """Predicate for a condition node, shared with identical nodes."""
+        op = condition_op(cond)
+        if not op:
+            return _never
+        key = _node_key(op, cond[op])
+        pred = self._nodes.get(key)
+        if pred is None:
+            raw = _BUILDERS[op](cond[op], self)
+            if self.node_counts[key] > 1 and raw not in (_never, _always):
+                slot = self._slot()
+
+                def pred(tx: dict, memo: list) -> bool:
+                    val = memo[slot]
+                    if val is _UNSET:
+                        val = memo[slot] = raw(tx, memo)
+                    return val
+            else:
+                pred = raw
+            self._nodes[key] = pred
+        return pred
+
+
+def compile_condition(cond: dict) -> Callable[[dict], bool]:
+    """Compile a standalone `when` condition into a predicate over the evaluation context."""
+    c = _Compiler([cond])
+    pred = c.compile(cond)
+    size = c.slots
+    return lambda tx: pred(tx, [_UNSET] * size)
+
+
+def _hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def discriminators(cond: dict) -> dict[str, frozenset]:
+    """
+    Necessary (path -> allowed values) constraints of a condition: `eq`/`in` leaves
+    reachable from the root through `all` nodes only. A context whose value at a
+    path is outside the set can never satisfy the condition.
+    """
+    op = condition_op(cond)
+    if op == "eq":
+        path, expected = cond["eq"]
+        return {path: frozenset((expected,))} if _hashable(expected) else {}
+    if op == "in":
+        path, allowed = cond["in"]
+        if isinstance(allowed, (list, tuple)) and all(_hashable(v) for v in allowed):
+            return {path: frozenset(allowed)}
+        return {}
+    if op == "all":
+        merged: dict[str, frozenset] = {}
+        for child in cond["all"]:
+            for path, values in discriminators(child).items():
+                merged[path] = merged[path] & values if path in merged else values
+        return merged
+    return {}
+
+
+_TRUE: dict = {"all": []}
+
+
+def residual_condition(cond: dict) -> dict:
+    """
+    cond without the leaves its discriminators already enforce: for a context in
+    index.candidates(...), the residual is true exactly when cond is.
+    """
+    op = condition_op(cond)
+    if op == "all":
+        kept = [residual_condition(child) for child in cond["all"]]
+        return {"all": [child for child in kept if child != _TRUE]}
+    return _TRUE if discriminators(cond) else cond
+
+
+@dataclass(slots=True, frozen=True)
+class DiscriminationIndex:
+    """
+    Per-path hash tables from a context value to the bitmask of rules that can
+    still match (bit i = i-th rule in priority order). Rules not constrained on a
+    path are in that path's default mask.
+    """
+
+    probes: tuple[tuple[Callable[[Any], Any], dict, int], ...]
+    all_mask: int
+
+    def candidates(self, context: dict) -> int:
+        """Bitmask of rules whose discriminators accept the context's values."""
+        mask = self.all_mask
+        for get, table, default in self.probes:
+            try:
+                mask &= table.get(get(context), default)
+            except TypeError:  # unhashable value never equals a hashable constant
+                mask &= default
+            if not mask:
+                break
+        return mask
+
+
+def build_index(conditions: list[dict]) -> DiscriminationIndex:
+    """Build the discrimination index for conditions given in priority order."""
+    constraints: dict[str, list[tuple[int, frozenset]]] = {}
+    for i, cond in enumerate(conditions):
+        for path, values in discriminators(cond).items():
+            constraints.setdefault(path, []).append((i, values))
+    all_mask = (1 << len(conditions)) - 1
+    probes = []
+    for path, entries in constraints.items():
+        default = all_mask
+        for i, _ in entries:
+            default &= ~(1 << i)
+        table: dict[Any, int] = {}
+        for i, values in entries:
+            for v in values:
+                table[v] = table.get(v, default) | (1 << i)
+        probes.append((make_getter(path), table, default))
+    return DiscriminationIndex(probes=tuple(probes), all_mask=all_mask)
+
+
+def path_ops(cond: dict, out: dict[str, set[str]] | None = None) -> dict[str, set[str]]:
+    """Operators applied to each dotted path a condition reads (same dispatch as evaluation)."""
+    out = {} if out is None else out
+    op = condition_op(cond)
+    if op in ("all", "any"):
+        for child in cond[op]:
+            path_ops(child, out)
+    elif op in ("exists", "not_exists"):
+        out.setdefault(_exists_path(cond[op]), set()).add(op)
+    elif op in ("path_eq", "path_neq"):
+        for path in cond[op]:
+            out.setdefault(path, set()).add(op)
+    elif op:
+        out.setdefault(cond[op][0], set()).add(op)
+    return out
+
+
+def condition_paths(cond: dict) -> set[str]:
+    """Dotted paths a condition reads."""
+    return set(path_ops(cond))
+
+
+def _presence(get: Callable[[Any], Any]) -> Callable[[Any], bool]:
+    """Projection of a path only tested with exists/not_exists."""
+
+    def present(obj: Any) -> bool:
+        val = get(obj)
+        return val is not None and val != ""
+
+    return present
+
+
+@dataclass(slots=True, frozen=True)
+class DependencyIndex:
+    """
+    Which rules read which paths (bit i = i-th rule in priority order). `readers` maps a
+    split path to the rules reading exactly it; `under` maps a split path to the rules
+    reading it or anything nested below it.
+    """
+
+    readers: dict[tuple[str, ...], int]
+    under: dict[tuple[str, ...], int]
+
+    def affected(self, paths: list[str]) -> int:
+        """
+        Bitmask of rules whose inputs may differ once `paths` are written: rules reading
+        a written path, anything below it, or a dict above it.
+        """
+        mask = 0
+        for path in paths:
+            parts = split_path(path)
+            mask |= self.under.get(parts, 0)
+            for i in range(1, len(parts)):
+                mask |= self.readers.get(parts[:i], 0)
+        return mask
+
+
+def rule_paths(rule: dict) -> set[str]:
+    """Dotted paths a rule's outcome depends on: its condition and its rate_from key."""
+    paths = condition_paths(rule.get("when") or {})
+    lookup = rate_from(rule)
+    if lookup is not None:
+        paths.add(lookup[1])
+    return paths
+
+
+def build_dependencies(rules: list[dict]) -> DependencyIndex:
+    """Build the path -> rules dependency index for rules given in priority order."""
+    readers: dict[tuple[str, ...], int] = {}
+    under: dict[tuple[str, ...], int] = {}
+    for i, rule in enumerate(rules):
+        bit = 1 << i
+        for path in rule_paths(rule):
+            parts = split_path(path)
+            readers[parts] = readers.get(parts, 0) | bit
+            for j in range(1, len(parts) + 1):
+                under[parts[:j]] = under.get(parts[:j], 0) | bit
+    return DependencyIndex(readers=readers, under=under)
+
+
+@dataclass(slots=True, frozen=True)
+class CompiledRule:
+    """
+    One rule with its compiled predicate; `rule` is the original rule dict. `residual`
+    skips the leaves the discrimination index enforces and is only valid for rules in
+    index.candidates(context).
+    """
+
+    rule: dict
+    rule_id: str
+    predicate: Predicate
+    residual: Predicate
+
+
+@dataclass(slots=True, frozen=True)
+class CompiledBundle:
+    """
+    Rules of a bundle, pre-sorted by priority DESC (stable, like evaluate_rules).
+    `paths` are all dotted paths any rule reads (rate_from keys included) and `projection`
+    their resolvers: equal projections always select the same rule and rate. Paths only tested with exists/not_exists
+    project to presence, so e.g. a fallback on transaction.amount does not key on it.
+    Rule predicates share `memo_size` memo slots; use one new_memo() per transaction.
+    `tables` are the bundle's compiled rate tables (see tables.py).
+    `routing` is set on bundles specialized for a (jurisdiction, tax_type) (see specialize).
+    """
+
+    rules: tuple[CompiledRule, ...]
+    index: DiscriminationIndex
+    deps: DependencyIndex
+    paths: tuple[str, ...]
+    projection: tuple[Callable[[Any], Any], ...]
+    memo_size: int = 0
+    tables: dict[str, RateTable] = field(default_factory=dict)
+    bundle_hash: str | None = None
+    routing: tuple[str, ...] = ()
+
+    def new_memo(self) -> list:
+        """Empty per-transaction memo for the rule predicates."""
+        return [_UNSET] * self.memo_size
+
+    def project(self, context: dict) -> list:
+        """Projected values of `paths` in the context (missing -> None, as predicates see them)."""
+        return [get(context) for get in self.projection]
+
+
+def compile_bundle(bundle_json: dict, bundle_hash: str | None = None) -> CompiledBundle:
+    """Compile a RulesetVersion.bundle_json ({"rules": [...], "tables": {...}})."""
+    rules = bundle_json.get("rules", [])
+    sorted_rules = sorted(rules, key=lambda r: r.get("priority", 0), reverse=True)
+    conditions = [rule.get("when") or {} for rule in sorted_rules]
+    residuals = [residual_condition(cond) for cond in conditions]
+    compiler = _Compiler(residuals)
+    compiled = tuple(
+        CompiledRule(
+            rule=rule,
+            rule_id=rule.get("rule_id", ""),
+            predicate=compiler.compile(cond),
+            residual=compiler.compile(residual),
+        )
+        for rule, cond, residual in zip(sorted_rules, conditions, residuals)
+    )
+    ops: dict[str, set[str]] = {}
+    for cond in conditions:
+        path_ops(cond, ops)
+    for rule in sorted_rules:
+        lookup = rate_from(rule)
+        if lookup is not None:
+            ops.setdefault(lookup[1], set()).add("rate_from")
+    paths = tuple(sorted(ops))
+    return CompiledBundle(
+        rules=compiled,
+        index=build_index(conditions),
+        deps=build_dependencies(sorted_rules),
+        paths=paths,
+        projection=tuple(
+            _presence(make_getter(p)) if ops[p] <= {"exists", "not_exists"} else make_getter(p)
+            for p in paths
+        ),
+        memo_size=compiler.slots,
+        tables=compile_tables(bundle_json.get("tables")),
+        bundle_hash=bundle_hash,
+    )
+
+
+_BUNDLE_CACHE = LRUCache(maxsize=256)
+
+
+def get_compiled_bundle(bundle_hash: str, bundle_json: dict) -> CompiledBundle:
+    """Return the compiled bundle for bundle_hash, compiling on first use."""
+    compiled = _BUNDLE_CACHE.get(bundle_hash)
+    if compiled is None:
+        compiled = compile_bundle(bundle_json, bundle_hash)
+        _BUNDLE_CACHE.set(bundle_hash, compiled)
+    return compiled
+
+
+def peek_compiled_bundle(bundle_hash: str) -> CompiledBundle | None:
+    """Compiled bundle for bundle_hash if this process has it cached; never compiles."""
+    return _BUNDLE_CACHE.get(bundle_hash)
+
+
+def compiled_cache_stats() -> dict:
+    """Hit/miss counters of the compiled-bundle cache."""
+    return _BUNDLE_CACHE.stats()
@@ -1,8 +1,10 @@
 """Rule evaluator - evaluates rules against transaction with explainability."""
 
-from copy import deepcopy
-from typing import Any
+from collections.abc import Mapping
+from typing import Any, NamedTuple
 
+from crms.engine.compiler import CompiledBundle, compile_bundle
+from crms.engine.tables import RateTable, rate_from
 from crms.schemas.evaluation import (
     ConditionEval,
     Counterfactual,
@@ -112,6 +114,30 @@ def _actual_for_trace(val: Any) -> Any:
     return "__MISSING__" if val is MISSING else val
 
 
+class _Eval(NamedTuple):
+    """Compact record of one condition evaluation; materialized as ConditionEval on demand."""
+
+    node_type: str
+    op: str
+    path: str | None
+    path2: str | None
+    expected: Any
+    actual: Any  # raw value (may be MISSING); (v1, v2) for path_eq/path_neq
+    passed: bool
+
+
+class _Step(NamedTuple):
+    """Compact record of one rule evaluation; materialized as RuleStep on demand."""
+
+    rule: dict
+    matched: bool
+    evals: list[_Eval]
+    missing_paths: list[str]
+
+
+_LEAF_OPS = ("eq", "neq", "gte", "gt", "lt", "lte", "in")
+
+
 def _eval_condition_traced(
     context: dict,
     cond: dict,
@@ -120,234 +146,117 @@ def _eval_condition_traced(
     missing_out: list,
 ) -> bool:
     """
-    Evaluate condition and append ConditionEval(s) to evals_out, missing paths to missing_out.
-    Returns whether the condition passed.
+    Evaluate condition and append _Eval record(s) to evals_out, missing paths to missing_out.
+    Returns whether the condition passed. `all`/`any` evaluate every child so the trace
+    lists each leaf.
     """
-    if "eq" in cond:
-        path, expected = cond["eq"]
-        val = _get_path_traced(context, path, paths_read)
-        passed = val == expected
-        if val is MISSING:
-            missing_out.append(path)
-        evals_out.append(
-            ConditionEval(
-                node_type="leaf",
-                op="eq",
-                path=path,
-                expected=expected,
-                actual=_actual_for_trace(val),
-                passed=passed,
-                reason=f"{path}={_actual_for_trace(val)} {'==' if passed else '!='} {expected}",
-            )
-        )
-        return passed
-    if "neq" in cond:
-        path, expected = cond["neq"]
-        val = _get_path_traced(context, path, paths_read)
-        passed = val != expected
-        if val is MISSING:
-            missing_out.append(path)
-        evals_out.append(
-            ConditionEval(
-                node_type="leaf",
-                op="neq",
-                path=path,
-                expected=expected,
-                actual=_actual_for_trace(val),
-                passed=passed,
-            )
-        )
-        return passed
-    if "gte" in cond:
-        path, expected = cond["gte"]
-        val = _get_path_traced(context, path, paths_read)
-        passed = val is not MISSING and val >= expected
-        if val is MISSING:
-            missing_out.append(path)
-        evals_out.append(
-            ConditionEval(
-                node_type="leaf",
-                op="gte",
-                path=path,
-                expected=expected,
-                actual=_actual_for_trace(val),
-                passed=passed,
-            )
-        )
-        return passed
-    if "gt" in cond:
-        path, expected = cond["gt"]
-        val = _get_path_traced(context, path, paths_read)
-        passed = val is not MISSING and val > expected
-        if val is MISSING:
-            missing_out.append(path)
-        evals_out.append(
-            ConditionEval(node_type="leaf", op="gt", path=path, expected=expected, actual=_actual_for_trace(val), passed=passed)
-        )
-        return passed
-    if "lt" in cond:
-        path, expected = cond["lt"]
-        val = _get_path_traced(context, path, paths_read)
-        passed = val is not MISSING and val < expected
-        if val is MISSING:
-            missing_out.append(path)
-        evals_out.append(
-            ConditionEval(node_type="leaf", op="lt", path=path, expected=expected, actual=_actual_for_trace(val), passed=passed)
-        )
-        return passed
-    if "lte" in cond:
-        path, expected = cond["lte"]
-        val = _get_path_traced(context, path, paths_read)
-        passed = val is not MISSING and val <= expected
-        if val is MISSING:
-            missing_out.append(path)
-        evals_out.append(
-            ConditionEval(node_type="leaf", op="lte", path=path, expected=expected, actual=_actual_for_trace(val), passed=passed)
-        )
-        return passed
-    if "in" in cond:
-        path, allowed = cond["in"]
-        val = _get_path_traced(context, path, paths_read)
-        passed = val is not MISSING and (val in allowed if isinstance(allowed, (list, tuple)) else False)
-        if val is MISSING:
-            missing_out.append(path)
-        evals_out.append(
-            ConditionEval(
-                node_type="leaf",
-                op="in",
-                path=path,
-                expected=allowed,
-                actual=_actual_for_trace(val),
-                passed=passed,
-            )
-        )
-        return passed
-    if "exists" in cond:
-        path = cond["exists"]
+    for op in _LEAF_OPS:
+        if op in cond:
+            path, expected = cond[op]
+            val = _get_path_traced(context, path, paths_read)
+            if val is MISSING:
+                missing_out.append(path)
+                passed = op == "neq" and val != expected
+            elif op == "eq":
+                passed = val == expected
+            elif op == "neq":
+                passed = val != expected
+            elif op == "gte":
+                passed = val >= expected
+            elif op == "gt":
+                passed = val > expected
+            elif op == "lt":
+                passed = val < expected
+            elif op == "lte":
+                passed = val <= expected
+            else:
+                passed = val in expected if isinstance(expected, (list, tuple)) else False
+            evals_out.append(_Eval("leaf", op, path, None, expected, val, passed))
+            return passed
+    if "exists" in cond or "not_exists" in cond:
+        op = "exists" if "exists" in cond else "not_exists"
+        path = cond[op]
         if isinstance(path, list):
             path = path[0]
         val = _get_path_traced(context, path, paths_read)
-        passed = val is not MISSING and val is not None and val != ""
         if val is MISSING:
             missing_out.append(path)
-        evals_out.append(
-            ConditionEval(
-                node_type="leaf",
-                op="exists",
-                path=path,
-                expected=True,
-                actual=_actual_for_trace(val),
-                passed=passed,
-            )
-        )
-        return passed
-    if "not_exists" in cond:
-        path = cond["not_exists"]
-        if isinstance(path, list):
-            path = path[0]
-        val = _get_path_traced(context, path, paths_read)
-        passed = val is MISSING or val is None or val == ""
-        if val is MISSING:
-            missing_out.append(path)
-        evals_out.append(
-            ConditionEval(
-                node_type="leaf",
-                op="not_exists",
-                path=path,
-                expected=None,
-                actual=_actual_for_trace(val),
-                passed=passed,
-            )
-        )
+            passed = op == "not_exists"
+        else:
+            present = val is not None and val != ""
+            passed = present if op == "exists" else not present
+        evals_out.append(_Eval("leaf", op, path, None, op == "exists" or None, val, passed))
         return passed
-    if "path_eq" in cond:
-        path1, path2 = cond["path_eq"]
+    if "path_eq" in cond or "path_neq" in cond:
+        op = "path_eq" if "path_eq" in cond else "path_neq"
+        path1, path2 = cond[op]
         v1 = _get_path_traced(context, path1, paths_read)
         v2 = _get_path_traced(context, path2, paths_read)
-        passed = v1 is not MISSING and v2 is not MISSING and v1 == v2
+        passed = v1 is not MISSING and v2 is not MISSING and ((v1 == v2) if op == "path_eq" else (v1 != v2))
         if v1 is MISSING:
             missing_out.append(path1)
         if v2 is MISSING:
             missing_out.append(path2)
-        evals_out.append(
-            ConditionEval(
-                node_type="leaf",
-                op="path_eq",
-                path=path1,
-                path2=path2,
-                expected="equal",
-                actual=f"{_actual_for_trace(v1)} vs {_actual_for_trace(v2)}",
-                passed=passed,
-            )
-        )
-        return passed
-    if "path_neq" in cond:
-        path1, path2 = cond["path_neq"]
-        v1 = _get_path_traced(context, path1, paths_read)
-        v2 = _get_path_traced(context, path2, paths_read)
-        passed = v1 is not MISSING and v2 is not MISSING and v1 != v2
-        if v1 is MISSING:
-            missing_out.append(path1)
-        if v2 is MISSING:
-            missing_out.append(path2)
-        evals_out.append(
-            ConditionEval(
-                node_type="leaf",
-                op="path_neq",
-                path=path1,
-                path2=path2,
-                expected="not equal",
-                actual=f"{_actual_for_trace(v1)} vs {_actual_for_trace(v2)}",
-                passed=passed,
-            )
-        )
-        return passed
-    if "all" in cond:
-        evals: list[ConditionEval] = []
-        miss: list[str] = []
-        results = []
-        for c in cond["all"]:
-            results.append(_eval_condition_traced(context, c, paths_read, evals, miss))
-        passed = all(results)
-        evals_out.append(
-            ConditionEval(
-                node_type="all",
-                op="all",
-                expected=len(cond["all"]),
-                actual=sum(1 for r in results if r),
-                passed=passed,
-                reason=f"all({len(cond['all'])}) -> {passed}",
-            )
-        )
-        evals_out.extend(evals)
-        missing_out.extend(miss)
-        return passed
-    if "any" in cond:
-        evals = []
-        miss = []
-        results = []
-        for c in cond["any"]:
-            results.append(_eval_condition_traced(context, c, paths_read, evals, miss))
-        passed = any(results)
-        evals_out.append(
-            ConditionEval(
-                node_type="any",
-                op="any",
-                expected=len(cond["any"]),
-                actual=sum(1 for r in results if r),
-                passed=passed,
-                reason=f"any({len(cond['any'])}) -> {passed}",
-            )
-        )
-        evals_out.extend(evals)
-        missing_out.extend(miss)
+        expected = "equal" if op == "path_eq" else "not equal"
+        evals_out.append(_Eval("leaf", op, path1, path2, expected, (v1, v2), passed))
         return passed
+    for op in ("all", "any"):
+        if op in cond:
+            children = cond[op]
+            pos = len(evals_out)
+            evals_out.append(None)  # placeholder: the combinator precedes its children
+            hits = 0
+            for c in children:
+                hits += _eval_condition_traced(context, c, paths_read, evals_out, missing_out)
+            passed = hits == len(children) if op == "all" else hits > 0
+            evals_out[pos] = _Eval(op, op, None, None, len(children), hits, passed)
+            return passed
     return False
 
 
-def _apply_then(context: dict, rule: dict, amount: float) -> dict:
-    """Apply rule's 'then' to result dict. Mutates context['_result']-like; returns result dict."""
-    result = {
+def _condition_eval(e: _Eval) -> ConditionEval:
+    """Materialize a compact condition record."""
+    if e.node_type != "leaf":
+        reason = f"{e.op}({e.expected}) -> {e.passed}"
+        return ConditionEval(
+            node_type=e.node_type, op=e.op, expected=e.expected, actual=e.actual, passed=e.passed, reason=reason
+        )
+    if e.op in ("path_eq", "path_neq"):
+        actual = f"{_actual_for_trace(e.actual[0])} vs {_actual_for_trace(e.actual[1])}"
+    else:
+        actual = _actual_for_trace(e.actual)
+    reason = None
+    if e.op == "eq":
+        reason = f"{e.path}={actual} {'==' if e.passed else '!='} {e.expected}"
+    return ConditionEval(
+        node_type="leaf",
+        op=e.op,
+        path=e.path,
+        path2=e.path2,
+        expected=e.expected,
+        actual=actual,
+        passed=e.passed,
+        reason=reason,
+    )
+
+
+def _rule_step(step: _Step) -> RuleStep:
+    """Materialize a compact rule step."""
+    rule = step.rule
+    return RuleStep(
+        rule_id=rule.get("rule_id", ""),
+        name=rule.get("name", ""),
+        priority=rule.get("priority", 0),
+        matched=step.matched,
+        evaluated=[_condition_eval(e) for e in step.evals],
+        missing_paths=step.missing_paths,
+        reason=f"Rule {'matched' if step.matched else 'did not match'}",
+    )
+
+
+def _empty_result() -> dict:
+    """Result when no rule matches."""
+    return {
         "taxable": False,
         "rate": 0.0,
         "tax_amount": 0.0,
@@ -355,6 +264,16 @@ def _apply_then(context: dict, rule: dict, amount: float) -> dict:
         "rate_components": [],
         "risk_flags": [],
     }
+
+
+def _apply_then(
+    context: dict, rule: dict, amount: float, tables: Mapping[str, RateTable] | None = None
+) -> dict:
+    """
+    Apply rule's 'then' to result dict. Mutates context['_result']-like; returns result dict.
+    A `rate_from` lookup in `tables` overrides the rate/rate_components it finds.
+    """
+    result = _empty_result()
     then = rule.get("then") or {}
     set_vals = then.get("set") or {}
     if "taxable" in set_vals:
@@ -363,6 +282,15 @@ def _apply_then(context: dict, rule: dict, amount: float) -> dict:
         result["rate"] = float(set_vals["rate"])
     if "rate_components" in set_vals:
         result["rate_components"] = list(set_vals["rate_components"])
+    lookup = rate_from(rule)
+    if lookup is not None and tables:
+        table = tables.get(lookup[0])
+        entry = table.lookup(_get_path(context, lookup[1])) if table is not None else None
+        if entry:
+            if "rate" in entry:
+                result["rate"] = float(entry["rate"])
+            if "rate_components" in entry:
+                result["rate_components"] = list(entry["rate_components"])
     result["tax_amount"] = round(result["rate"] * amount, 2)
     for obl in then.get("emit_obligations") or []:
         result["obligations"].append(
@@ -378,6 +306,86 @@ def _apply_then(context: dict, rule: dict, amount: float) -> dict:
     return result
 
 
+def _overlay(context: dict, changes: list[CounterfactualChange]) -> tuple[dict, list[str]]:
+    """
+    Copy-on-write patch of context with the concrete counterfactual changes.
+    Only dicts along written paths are copied; the original context is never mutated.
+    Returns (patched context, written paths).
+    """
+    root = dict(context)
+    owned = {id(root)}
+    written: list[str] = []
+    for ch in changes:
+        if ch.suggested_value is None:
+            continue
+        parts = ch.path.split(".")
+        if len(parts) < 2:
+            continue
+        cur = root
+        for p in parts[:-1]:
+            if p not in cur:
+                cur[p] = {}
+                owned.add(id(cur[p]))
+            elif isinstance(cur[p], dict) and id(cur[p]) not in owned:
+                cur[p] = dict(cur[p])
+                owned.add(id(cur[p]))
+            cur = cur[p]
+        cur[parts[-1]] = ch.suggested_value
+        written.append(ch.path)
+    return root, written
+
+
+def _first_match(bundle: CompiledBundle, context: dict) -> int:
+    """Position (priority order) of the rule evaluate_compiled would fire; len(rules) if none."""
+    rules = bundle.rules
+    memo = bundle.new_memo()
+    mask = bundle.index.candidates(context)
+    while mask:
+        low = mask & -mask
+        mask ^= low
+        pos = low.bit_length() - 1
+        if rules[pos].residual(context, memo):
+            return pos
+    return len(rules)
+
+
+def _preview_outcome(
+    bundle: CompiledBundle,
+    context: dict,
+    written: list[str],
+    base_pos: int,
+    base_result: dict,
+    amount: float,
+) -> dict:
+    """
+    First-match result for a patched context, given that the unpatched context fires rule
+    `base_pos` (len(rules) for no match) with `base_result`. Rules above it are re-checked
+    only if they read a written path; it still fires unless its own inputs changed.
+    """
+    affected = bundle.deps.affected(written)
+    base_bit = 1 << base_pos
+    above = base_bit - 1
+    mask = bundle.index.candidates(context)
+    if affected & base_bit:
+        # Base rule may no longer match: it and everything after it are re-checked too
+        mask &= affected | ~above
+        known = 0
+    else:
+        mask = (mask & affected & above) | base_bit
+        known = base_bit
+    rules = bundle.rules
+    memo = bundle.new_memo()
+    while mask:
+        low = mask & -mask
+        mask ^= low
+        if low & known:
+            return base_result
+        crule = rules[low.bit_length() - 1]
+        if crule.residual(context, memo):
+            return _apply_then(context, crule.rule, amount, bundle.tables)
+    return _empty_result()
+
+
 def evaluate_rules(
     context: dict,
     rules: list[dict],
@@ -386,57 +394,52 @@ def evaluate_rules(
     trace: bool = False,
     top_k_near_miss: int = 3,
     max_counterfactuals: int = 2,
+    trace_budget: int | None = None,
+    bundle: CompiledBundle | None = None,
 ) -> tuple[dict, list[FiredRule], EvaluationTrace | None]:
     """
     Evaluate rules in priority order (DESC). First match wins.
     Returns (result_dict, fired_rules, trace_or_none).
     When trace=True, returns full auditable trace with steps, evidence paths, confidence, near-miss, counterfactuals.
+    trace_budget caps the rule steps returned in trace.steps (the winner is always kept).
+    Counterfactual previews are re-evaluated incrementally over `bundle` (the compiled form
+    of `rules`; compiled here when omitted). Rate tables are looked up in bundle.tables, so
+    bundles using `rate_from` must be passed in.
     """
     # API passes context = {"transaction": trans_dict}; rules use paths like "transaction.jurisdiction"
     transaction = context  # _eval_condition expects the same object for path lookups
+    tables = bundle.tables if bundle is not None else None
     sorted_rules = sorted(rules, key=lambda r: r.get("priority", 0), reverse=True)
 
-    result = {
-        "taxable": False,
-        "rate": 0.0,
-        "tax_amount": 0.0,
-        "obligations": [],
-        "rate_components": [],
-        "risk_flags": [],
-    }
+    result = _empty_result()
     fired: list[FiredRule] = []
     trace_out: EvaluationTrace | None = None
 
     if trace:
         paths_read: set[str] = set()
-        steps: list[RuleStep] = []
-        near_miss: list[tuple[int, RuleStep]] = []  # (distance, step)
-        winner_step: RuleStep | None = None
+        steps: list[_Step] = []
+        near_miss: list[tuple[int, int]] = []  # (distance, position in steps)
+        winner_step: _Step | None = None
         winner_rule: dict | None = None
 
         for rule in sorted_rules:
             when = rule.get("when") or {}
-            evals_list: list[ConditionEval] = []
+            evals_list: list[_Eval] = []
             missing_paths: list[str] = []
             matched = _eval_condition_traced(
                 context, when, paths_read, evals_list, missing_paths
             )
 
-            step = RuleStep(
-                rule_id=rule.get("rule_id", ""),
-                name=rule.get("name", ""),
-                priority=rule.get("priority", 0),
-                matched=matched,
-                evaluated=evals_list,
-                missing_paths=missing_paths,
-                reason=f"Rule {'matched' if matched else 'did not match'}",
-            )
+            step = _Step(rule, matched, evals_list, missing_paths)
             steps.append(step)
 
             if matched:
                 winner_step = step
                 winner_rule = rule
-                result = _apply_then(context, rule, amount)
+                result = _apply_then(context, rule, amount, tables)
+                lookup = rate_from(rule)
+                if lookup is not None:
+                    paths_read.add(lookup[1])
                 fired.append(
                     FiredRule(
                         rule_id=rule.get("rule_id", ""),
@@ -449,21 +452,35 @@ def evaluate_rules(
             # Near-miss: distance = failed leaf count + 2 * missing paths
             failed_leaves = sum(1 for e in evals_list if e.node_type == "leaf" and not e.passed)
             distance = failed_leaves + 2 * len(missing_paths)
-            near_miss.append((distance, step))
+            near_miss.append((distance, len(steps) - 1))
             near_miss.sort(key=lambda x: x[0])
             if len(near_miss) > top_k_near_miss:
                 near_miss = near_miss[:top_k_near_miss]
 
-        # Build trace
+        # Build trace; only steps that end up in the response are materialized
         evidence_paths_used = sorted(paths_read)
         missing_evidence = list(winner_step.missing_paths) if winner_step else []
         confidence = max(0.0, 1.0 - 0.15 * len(missing_evidence))
 
-        near_miss_steps = [s for _, s in near_miss]
+        materialized: dict[int, RuleStep] = {}
+
+        def rule_step(pos: int) -> RuleStep:
+            if pos not in materialized:
+                materialized[pos] = _rule_step(steps[pos])
+            return materialized[pos]
+
+        kept = list(range(len(steps)))
+        if trace_budget is not None and len(steps) > trace_budget:
+            # Earliest steps in priority order; the winner replaces the last slot
+            kept = kept[: max(trace_budget, 0)]
+            if winner_step is not None and kept:
+                kept[-1] = len(steps) - 1
+        near_miss_steps = [rule_step(pos) for _, pos in near_miss]
         counterfactuals_list: list[Counterfactual] = []
         if max_counterfactuals > 0 and near_miss_steps and winner_rule:
             current_taxable = result.get("taxable", False)
             current_rate = result.get("rate", 0.0)
+            base: tuple[int, dict] | None = None  # unpatched first match, for incremental previews
             for step in near_miss_steps[:max_counterfactuals]:
                 changes: list[CounterfactualChange] = []
                 for e in step.evaluated:
@@ -491,23 +508,19 @@ def evaluate_rules(
                 if not changes:
                     continue
                 # Outcome preview: apply changes and re-evaluate (only when we have a concrete value)
-                ctx_copy = deepcopy(context)
-                for ch in changes[:5]:
-                    if ch.suggested_value is None:
-                        continue
-                    parts = ch.path.split(".")
-                    if len(parts) < 2:
-                        continue
-                    cur = ctx_copy
-                    for p in parts[:-1]:
-                        if p not in cur:
-                            cur[p] = {}
-                        cur = cur[p]
-                    cur[parts[-1]] = ch.suggested_value
+                ctx_patched, written = _overlay(context, changes[:5])
                 try:
-                    res_preview, _, _ = evaluate_rules(
-                        ctx_copy, rules, amount, trace=False
-                    )
+                    if base is None:
+                        if bundle is None:
+                            bundle = compile_bundle({"rules": rules})
+                        base_pos = _first_match(bundle, context)
+                        base = (
+                            base_pos,
+                            _apply_then(context, bundle.rules[base_pos].rule, amount, bundle.tables)
+                            if base_pos < len(bundle.rules)
+                            else _empty_result(),
+                        )
+                    res_preview = _preview_outcome(bundle, ctx_patched, written, *base, amount)
                     outcome_preview = {
                         "taxable": res_preview["taxable"],
                         "rate": res_preview["rate"],
@@ -548,7 +561,8 @@ def evaluate_rules(
                 if winner_rule
                 else None
             ),
-            steps=steps,
+            steps=[rule_step(pos) for pos in kept],
+            steps_omitted=len(steps) - len(kept),
             evidence_paths_used=evidence_paths_used,
             missing_evidence=missing_evidence,
             confidence=round(confidence, 2),
@@ -562,7 +576,7 @@ def evaluate_rules(
         when = rule.get("when") or {}
         if not _eval_condition(transaction, when):
             continue
-        result = _apply_then(context, rule, amount)
+        result = _apply_then(context, rule, amount, tables)
         fired.append(
             FiredRule(
                 rule_id=rule.get("rule_id", ""),
@@ -573,3 +587,36 @@ def evaluate_rules(
         break
 
     return result, fired, None
+
+
+def evaluate_compiled(
+    context: dict,
+    bundle: CompiledBundle,
+    amount: float,
+) -> tuple[dict, list[FiredRule], None]:
+    """
+    Non-trace evaluation over a compiled bundle. Same contract as
+    evaluate_rules(..., trace=False): first match in priority order wins.
+    Only rules surviving the bundle's discrimination index are tested, on their residual
+    predicates; nodes shared between rules are evaluated at most once.
+    """
+    rules = bundle.rules
+    memo = bundle.new_memo()
+    mask = bundle.index.candidates(context)
+    while mask:
+        low = mask & -mask
+        mask ^= low
+        crule = rules[low.bit_length() - 1]
+        if not crule.residual(context, memo):
+            continue
+        rule = crule.rule
+        result = _apply_then(context, rule, amount, bundle.tables)
+        fired = [
+            FiredRule(
+                rule_id=crule.rule_id,
+                name=rule.get("name", ""),
+                because=rule.get("because", ""),
+            )
+        ]
+        return result, fired, None
+    return _empty_result(), [], None
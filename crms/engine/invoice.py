@@ -0,0 +1,74 @@
+"""Invoice evaluation: many lines sharing one header.
+
+Line i is evaluated as the transaction {**header, **line_i}, exactly as
+POST /v1/evaluations would evaluate it. Header fields that no line overrides are the
+same for every line, so the bundle is specialized for them once per invoice (see
+specialize.py) and header-only predicates are not re-evaluated per line. Lines whose
+remaining projection repeats (e.g. same product, different amount) reuse the outcome of
+the first such line, as the result cache does across requests.
+"""
+
+from collections.abc import Collection
+
+from crms.engine.compiler import CompiledBundle, compile_bundle, split_path
+from crms.engine.evaluator import evaluate_compiled
+from crms.engine.result_cache import projection_key, reuse
+from crms.engine.specialize import specialize_bundle
+from crms.schemas.evaluation import FiredRule
+
+
+def header_paths(paths: Collection[str], line_keys: Collection[str]) -> set[str]:
+    """Bundle paths whose value comes from the header for every line."""
+    known = set()
+    for path in paths:
+        parts = split_path(path)
+        if parts[0] == "transaction" and (len(parts) < 2 or parts[1] in line_keys):
+            continue
+        known.add(path)
+    return known
+
+
+def header_bundle(
+    bundle: CompiledBundle, bundle_json: dict, header: dict, line_keys: Collection[str]
+) -> CompiledBundle:
+    """`bundle` specialized for the header values the lines do not override."""
+    known = header_paths(bundle.paths, line_keys)
+    if not known:
+        return bundle
+    return compile_bundle(specialize_bundle(bundle_json, known, {"transaction": header}))
+
+
+def line_transactions(header: dict, lines: list[dict]) -> list[dict]:
+    """Per-line transaction dicts (line fields override header fields)."""
+    return [{**header, **line} for line in lines]
+
+
+def evaluate_lines(
+    bundle: CompiledBundle, bundle_json: dict, header: dict, lines: list[dict]
+) -> list[tuple[dict, list[FiredRule]]]:
+    """(result, fired) per line, as evaluate_compiled returns them for {**header, **line}."""
+    if len(lines) > 1:
+        line_keys = set().union(*lines)
+        bundle = header_bundle(bundle, bundle_json, header, line_keys)
+    outcomes: dict = {}
+    out = []
+    for trans in line_transactions(header, lines):
+        context = {"transaction": trans}
+        amount = trans["amount"]
+        key = projection_key(bundle.project(context))
+        seen = outcomes.get(key)
+        if seen is None:
+            result, fired, _ = evaluate_compiled(context, bundle, amount)
+            outcomes[key] = (result, fired)
+            seen = (result, fired)
+        out.append(reuse(*seen, amount))
+    return out
+
+
+def invoice_totals(amounts: list[float], results: list[dict]) -> dict:
+    """Invoice totals: gross amount, taxable amount and tax (sum of the rounded line taxes)."""
+    return {
+        "amount": round(sum(amounts), 2),
+        "taxable_amount": round(sum(a for a, r in zip(amounts, results) if r["taxable"]), 2),
+        "tax_amount": round(sum(r["tax_amount"] for r in results), 2),
+    }
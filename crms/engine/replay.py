@@ -0,0 +1,182 @@
+"""Replay of audited evaluations against another bundle (impact analysis before a publish).
+
+Audit rows arrive in partitions (stream_evaluations reads them from a server-side cursor)
+and each partition is re-evaluated on a process pool. At most `max_in_flight` partitions
+are outstanding and workers send back only the items whose outcome changed, which the
+summary folds into counters plus a few samples - memory stays bounded no matter how many
+rows are replayed.
+
+A row holds one transaction (single, batch, stream and per-target fan-out evaluations) or
+an invoice (one item per line); other shapes are counted as skipped. Each item's recorded
+result is compared with a fresh non-trace evaluation (as POST /v1/evaluations would give
+it): winner, taxable, rate and tax_amount.
+"""
+
+import asyncio
+import multiprocessing
+from collections import Counter
+from collections.abc import AsyncIterable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from crms.engine.compiler import CompiledBundle, compile_bundle
+from crms.engine.evaluator import evaluate_compiled
+
+AuditRow = tuple[str, dict, dict]  # (evaluation_id, input_json, output_json)
+
+_COMPARED = ("matched_rule_id", "taxable", "rate", "tax_amount")
+
+_bundle: CompiledBundle | None = None  # the replayed bundle, per process
+
+
+def init_worker(bundle_json: dict) -> None:
+    """Compile the bundle to replay against (pool initializer; also run in the caller)."""
+    global _bundle
+    _bundle = compile_bundle(bundle_json)
+
+
+def replay_pool(bundle_json: dict, workers: int) -> ProcessPoolExecutor:
+    """Process pool whose workers each compile `bundle_json` once."""
+    return ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(bundle_json,),
+    )
+
+
+def compared(result: dict) -> dict:
+    """The outcome fields a replay compares, from a result body (matched_rule_id included)."""
+    return {k: result.get(k) for k in _COMPARED}
+
+
+def replay_items(input_json: dict, output_json: dict) -> list[tuple[str | None, dict, dict]]:
+    """(line_id, transaction, recorded result) for each evaluation an audit row holds."""
+    trans, result = input_json.get("transaction"), output_json.get("result")
+    if isinstance(trans, dict) and isinstance(result, dict):
+        return [(None, trans, result)]
+    header, lines, outputs = input_json.get("header"), input_json.get("lines"), output_json.get("lines")
+    if isinstance(header, dict) and isinstance(lines, list) and isinstance(outputs, list) and len(lines) == len(outputs):
+        return [
+            (line.get("line_id"), {**header, **{k: v for k, v in line.items() if k != "line_id"}}, out["result"])
+            for line, out in zip(lines, outputs)
+        ]
+    return []
+
+
+def replay_rows(rows: list[AuditRow]) -> dict:
+    """Re-evaluate a partition of audit rows; counts plus the changed items only."""
+    items = skipped = 0
+    changes = []
+    for evaluation_id, input_json, output_json in rows:
+        found = replay_items(input_json or {}, output_json or {})
+        if not found:
+            skipped += 1
+        for line_id, trans, recorded in found:
+            amount = trans.get("amount")
+            if not isinstance(amount, (int, float)):
+                skipped += 1
+                continue
+            items += 1
+            result, fired, _ = evaluate_compiled({"transaction": trans}, _bundle, amount)
+            before = compared(recorded)
+            after = compared({**result, "matched_rule_id": fired[0].rule_id if fired else None})
+            if before != after:
+                changes.append({"evaluation_id": evaluation_id, "line_id": line_id, "before": before, "after": after})
+    return {"rows": len(rows), "items": items, "skipped": skipped, "changes": changes}
+
+
+@dataclass
+class ReplaySummary:
+    """Running diff summary of a replay."""
+
+    max_samples: int = 20
+    rows: int = 0
+    items: int = 0
+    skipped: int = 0
+    changed: int = 0
+    winners: Counter = field(default_factory=Counter)  # (before, after) matched_rule_id
+    rate_changed: int = 0
+    rate_delta_min: float = 0.0
+    rate_delta_max: float = 0.0
+    tax_delta: float = 0.0
+    tax_increased: int = 0
+    tax_decreased: int = 0
+    samples: list[dict] = field(default_factory=list)
+
+    def add(self, partial: dict) -> None:
+        """Fold in one replay_rows() result."""
+        self.rows += partial["rows"]
+        self.items += partial["items"]
+        self.skipped += partial["skipped"]
+        for change in partial["changes"]:
+            before, after = change["before"], change["after"]
+            self.changed += 1
+            if before["matched_rule_id"] != after["matched_rule_id"]:
+                self.winners[(before["matched_rule_id"], after["matched_rule_id"])] += 1
+            rate_delta = (after["rate"] or 0.0) - (before["rate"] or 0.0)
+            if rate_delta:
+                if not self.rate_changed:
+                    self.rate_delta_min = self.rate_delta_max = rate_delta
+                self.rate_changed += 1
+                self.rate_delta_min = min(self.rate_delta_min, rate_delta)
+                self.rate_delta_max = max(self.rate_delta_max, rate_delta)
+            tax_delta = (after["tax_amount"] or 0.0) - (before["tax_amount"] or 0.0)
+            self.tax_delta += tax_delta
+            self.tax_increased += tax_delta > 0
+            self.tax_decreased += tax_delta < 0
+            if len(self.samples) < self.max_samples:
+                self.samples.append(change)
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "items": self.items,
+            "skipped": self.skipped,
+            "changed": self.changed,
+            "changed_winners": [
+                {"before": before, "after": after, "count": count}
+                for (before, after), count in self.winners.most_common()
+            ],
+            "rate": {"changed": self.rate_changed, "delta_min": self.rate_delta_min, "delta_max": self.rate_delta_max},
+            "tax": {
+                "delta_total": round(self.tax_delta, 2),
+                "increased": self.tax_increased,
+                "decreased": self.tax_decreased,
+            },
+            "samples": self.samples,
+        }
+
+
+async def replay(
+    partitions: AsyncIterable[list[AuditRow]],
+    bundle_json: dict,
+    *,
+    executor: Executor | None = None,
+    max_in_flight: int = 8,
+    max_samples: int = 20,
+) -> ReplaySummary:
+    """
+    Replay audit row partitions against `bundle_json`. With an executor (see replay_pool),
+    partitions are evaluated there, at most `max_in_flight` at a time; otherwise inline.
+    """
+    init_worker(bundle_json)
+    summary = ReplaySummary(max_samples=max_samples)
+    if executor is None:
+        async for rows in partitions:
+            summary.add(replay_rows(rows))
+        return summary
+
+    loop = asyncio.get_running_loop()
+    in_flight: set[asyncio.Future] = set()
+    async for rows in partitions:
+        if len(in_flight) >= max_in_flight:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                summary.add(fut.result())
+        in_flight.add(loop.run_in_executor(executor, replay_rows, rows))
+    if in_flight:
+        done, _ = await asyncio.wait(in_flight)
+        for fut in done:
+            summary.add(fut.result())
+    return summary
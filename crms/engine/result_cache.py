@@ -0,0 +1,95 @@
+"""Memoized non-trace evaluation results (explain=none/winner).
+
+A bundle's outcome depends only on the values of the paths its rules read, and in
+practice that projection repeats across requests with only `amount` changing. Results
+are cached per (bundle_hash, routing, projection key): the fired rule and the
+rate/obligation payload are stored, and only tax_amount is recomputed from the amount.
+Entries are immutable per bundle hash, so they never need invalidation; the LRU is bounded
+by RESULT_CACHE_SIZE entries and RESULT_CACHE_MAX_BYTES of estimated payload.
+"""
+
+import orjson
+
+from crms.config import settings
+from crms.engine.compiler import CompiledBundle
+from crms.engine.evaluator import evaluate_compiled
+from crms.schemas.evaluation import FiredRule
+from crms.utils.canonical import request_hash
+from crms.utils.lru import LRUCache
+
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def projection_key(values: list) -> tuple | str:
+    """
+    Cache key for projected values. Scalars are keyed as a tuple: values equal under
+    Python equality (1, 1.0, True) satisfy exactly the same predicates. Projections
+    holding dicts/lists use their canonical JSON hash.
+    """
+    if all(isinstance(v, _SCALARS) for v in values):
+        return tuple(values)
+    return request_hash(values)
+
+
+def _entry_size(key: tuple, result: dict, fired: list[FiredRule]) -> int:
+    """Rough byte cost of a cache entry (serialized payload plus key)."""
+    payload = orjson.dumps([result, fired, key[2]], default=lambda o: o.model_dump())
+    return len(payload) + len(key[0])
+
+
+class ResultCache:
+    """(bundle_hash, routing, projection key) -> (result, fired) for evaluate_compiled."""
+
+    def __init__(self, maxsize: int, maxbytes: int):
+        self._entries = LRUCache(maxsize=maxsize, maxbytes=maxbytes)
+
+    @property
+    def enabled(self) -> bool:
+        return self._entries.maxsize > 0
+
+    def evaluate(
+        self, context: dict, bundle: CompiledBundle, amount: float
+    ) -> tuple[dict, list[FiredRule], None]:
+        """evaluate_compiled, answered from the cache when the projection was seen before."""
+        if not self.enabled or bundle.bundle_hash is None:
+            return evaluate_compiled(context, bundle, amount)
+        key = (bundle.bundle_hash, bundle.routing, projection_key(bundle.project(context)))
+        entry = self._entries.get(key)
+        if entry is None:
+            result, fired, _ = evaluate_compiled(context, bundle, amount)
+            self._entries.set(key, (_copy(result), list(fired)), size=_entry_size(key, result, fired))
+            return result, fired, None
+        result, fired = reuse(*entry, amount)
+        return result, fired, None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Size, byte and hit/miss counters for /metrics."""
+        return self._entries.stats()
+
+
+def reuse(result: dict, fired: list[FiredRule], amount: float) -> tuple[dict, list[FiredRule]]:
+    """A stored (result, fired) outcome re-applied to another amount with the same projection."""
+    result = _copy(result)
+    if fired:  # no-match results keep their fixed 0.0
+        result["tax_amount"] = round(result["rate"] * amount, 2)
+    return result, list(fired)
+
+
+def _copy(result: dict) -> dict:
+    """Copy of a result dict whose lists can be handed out without sharing the cached ones."""
+    return {
+        **result,
+        "obligations": list(result["obligations"]),
+        "rate_components": list(result["rate_components"]),
+        "risk_flags": list(result["risk_flags"]),
+    }
+
+
+result_cache = ResultCache(
+    maxsize=settings.result_cache_size,
+    maxbytes=settings.result_cache_max_bytes,
+)
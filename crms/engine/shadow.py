@@ -0,0 +1,139 @@
+"""Shadow evaluation of a ruleset's candidate bundle on live traffic.
+
+A ruleset can carry a candidate bundle (PUT /v1/admin/rulesets/{id}/shadow). After
+POST /v1/evaluations has answered with the published version, the transaction and the
+primary result are handed to the shadow runner: a bounded in-process queue that a
+background task drains, re-evaluating each transaction against the candidate and folding
+disagreements (winner, taxable, rate, tax_amount) into a per-ruleset summary (see
+replay.ReplaySummary). Nothing is written to the database.
+
+Shadow work is shed rather than delayed: submit() never blocks and drops the item when
+the queue is full, the task yields to the event loop after every evaluation, and shutdown
+discards whatever is still queued.
+"""
+
+import asyncio
+import logging
+
+from crms.config import settings
+from crms.engine.compiler import get_compiled_bundle
+from crms.engine.evaluator import evaluate_compiled
+from crms.engine.replay import ReplaySummary, compared
+from crms.engine.specialize import get_routed_bundle
+from crms.storage.ruleset_cache import CachedRuleset
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowRunner:
+    """Bounded queue of shadow evaluations plus per-ruleset disagreement summaries."""
+
+    def __init__(self, max_queue: int, max_samples: int):
+        self._max_queue = max_queue
+        self.max_samples = max_samples
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        # ruleset_id -> (candidate bundle hash, summary); reset when the candidate changes
+        self._summaries: dict[str, tuple[str, ReplaySummary]] = {}
+        self.evaluated = 0
+        self.disagreements = 0
+        self.shed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def submit(
+        self, ruleset: CachedRuleset, evaluation_id: str, context: dict, amount: float, result: dict
+    ) -> bool:
+        """Queue one primary outcome for shadow evaluation; False if shed."""
+        if not self.running:
+            return False
+        if self._queue.qsize() >= self._max_queue:
+            self.shed += 1
+            return False
+        self._queue.put_nowait((ruleset, evaluation_id, context, amount, result))
+        return True
+
+    def start(self) -> None:
+        """Start the background task on the running event loop."""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name="shadow-runner")
+
+    async def stop(self) -> None:
+        """Stop the task; queued shadow work is dropped."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                self.compare(*item)
+            except Exception:
+                self.failed += 1
+                logger.exception("Shadow evaluation failed")
+            await asyncio.sleep(0)
+
+    def compare(
+        self, ruleset: CachedRuleset, evaluation_id: str, context: dict, amount: float, primary: dict
+    ) -> None:
+        """Evaluate the candidate for one transaction and record any disagreement."""
+        trans = context["transaction"]
+        if trans.get("jurisdiction") == ruleset.jurisdiction and trans.get("tax_type") == ruleset.tax_type:
+            bundle = get_routed_bundle(ruleset.shadow_hash, ruleset.shadow_bundle, ruleset.jurisdiction, ruleset.tax_type)
+        else:
+            bundle = get_compiled_bundle(ruleset.shadow_hash, ruleset.shadow_bundle)
+        result, fired, _ = evaluate_compiled(context, bundle, amount)
+        before = compared(primary)
+        after = compared({**result, "matched_rule_id": fired[0].rule_id if fired else None})
+        changes = []
+        if before != after:
+            self.disagreements += 1
+            changes.append({"evaluation_id": evaluation_id, "line_id": None, "before": before, "after": after})
+        self.evaluated += 1
+        self._summary(ruleset.ruleset_id, ruleset.shadow_hash).add(
+            {"rows": 1, "items": 1, "skipped": 0, "changes": changes}
+        )
+
+    def _summary(self, ruleset_id: str, candidate_hash: str) -> ReplaySummary:
+        entry = self._summaries.get(ruleset_id)
+        if entry is None or entry[0] != candidate_hash:
+            entry = (candidate_hash, ReplaySummary(max_samples=self.max_samples))
+            self._summaries[ruleset_id] = entry
+        return entry[1]
+
+    def summary(self, ruleset_id: str) -> dict | None:
+        """This process's disagreement summary for a ruleset's current candidate."""
+        entry = self._summaries.get(ruleset_id)
+        if entry is None:
+            return None
+        return {"candidate_bundle_hash": entry[0], **entry[1].as_dict()}
+
+    def reset(self, ruleset_id: str) -> None:
+        """Forget a ruleset's summary (its candidate was replaced or removed)."""
+        self._summaries.pop(ruleset_id, None)
+
+    def stats(self) -> dict:
+        """Queue depth and counters for /metrics."""
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self.running else 0,
+            "evaluated": self.evaluated,
+            "disagreements": self.disagreements,
+            "shed": self.shed,
+            "failed": self.failed,
+            "rulesets": len(self._summaries),
+        }
+
+
+shadow_runner = ShadowRunner(max_queue=settings.shadow_queue_size, max_samples=settings.shadow_max_samples)
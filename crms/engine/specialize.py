@@ -0,0 +1,123 @@
+"""Partial evaluation of bundles for paths whose values are known in advance.
+
+Requests reach a ruleset through (jurisdiction, tax_type), so inside that ruleset
+`transaction.jurisdiction` and `transaction.tax_type` are constants; likewise the header
+fields shared by every line of an invoice. Leaves reading only known paths are folded to
+true/false, `all`/`any` nodes are simplified around them and rules whose condition folds
+to false are dropped (e.g. the `neq jurisdiction` guardrails). First-match results are
+unchanged for any context agreeing with the known values.
+
+A leaf is only folded when its value cannot depend on anything else, and an absorbing
+constant (false in `all`, true in `any`) only collapses its parent when no sibling
+evaluated before it could raise, so evaluation errors surface exactly as before.
+"""
+
+from collections.abc import Collection
+from dataclasses import replace
+from typing import Any
+
+from crms.engine.compiler import CompiledBundle, compile_bundle, compile_condition, condition_op, path_ops
+from crms.utils.lru import LRUCache
+
+ROUTING_PATHS = ("transaction.jurisdiction", "transaction.tax_type")
+
+_ORDERED = ("gt", "gte", "lt", "lte")
+
+
+def _may_raise(cond: dict) -> bool:
+    """True if evaluating cond can raise (ordering comparisons on mixed types)."""
+    op = condition_op(cond)
+    if op in ("all", "any"):
+        return any(_may_raise(child) for child in cond[op])
+    return op in _ORDERED
+
+
+def known_context(known: dict[str, Any]) -> dict:
+    """Nested context holding just the given path values."""
+    ctx: dict = {}
+    for path, value in known.items():
+        *parents, leaf = path.split(".")
+        cur = ctx
+        for p in parents:
+            cur = cur.setdefault(p, {})
+        cur[leaf] = value
+    return ctx
+
+
+def _fold_leaf(cond: dict, known: Collection[str], context: dict) -> bool | None:
+    """Constant value of a leaf reading only known paths; None if it is not constant."""
+    if not all(path in known for path in path_ops(cond)):
+        return None
+    try:
+        return bool(compile_condition(cond)(context))
+    except TypeError:
+        return None
+
+
+def specialize_condition(cond: dict, known: Collection[str], context: dict) -> dict | bool:
+    """
+    cond with leaves over `known` paths folded, using their values in `context`; True/False
+    when the whole condition is constant. The result evaluates like cond on every context
+    whose values at the known paths equal those in `context`.
+    """
+    op = condition_op(cond)
+    if op is None:
+        return False
+    if op not in ("all", "any"):
+        folded = _fold_leaf({op: cond[op]}, known, context)
+        return cond if folded is None else folded
+
+    neutral = op == "all"  # true is neutral in `all`, false in `any`
+    children: list[dict] = []
+    for child in cond[op]:
+        spec = specialize_condition(child, known, context)
+        if spec is neutral:
+            continue
+        if isinstance(spec, bool):
+            if not any(_may_raise(c) for c in children):
+                return spec
+            # Earlier siblings may still raise: keep them, then stop with the constant
+            children.append({"any": []} if neutral else {"all": []})
+            break
+        children.append(spec)
+    if not children:
+        return neutral
+    if len(children) == 1:
+        return children[0]
+    return {op: children}
+
+
+def specialize_bundle(bundle_json: dict, known: Collection[str], context: dict) -> dict:
+    """Bundle with every rule condition specialized; rules that can never fire are dropped."""
+    rules = []
+    for rule in bundle_json.get("rules", []):
+        spec = specialize_condition(rule.get("when") or {}, known, context)
+        if spec is False:
+            continue
+        rules.append({**rule, "when": {"all": []} if spec is True else spec})
+    return {**bundle_json, "rules": rules}
+
+
+_ROUTED_CACHE = LRUCache(maxsize=256)
+
+
+def get_routed_bundle(bundle_hash: str, bundle_json: dict, jurisdiction: str, tax_type: str) -> CompiledBundle:
+    """
+    Compiled bundle specialized for a ruleset's routing fields, built once per version.
+    Only valid for transactions whose jurisdiction/tax_type equal the routed values.
+    """
+    key = (bundle_hash, jurisdiction, tax_type)
+    compiled = _ROUTED_CACHE.get(key)
+    if compiled is None:
+        context = known_context(dict(zip(ROUTING_PATHS, (jurisdiction, tax_type))))
+        compiled = replace(
+            compile_bundle(specialize_bundle(bundle_json, ROUTING_PATHS, context), bundle_hash),
+            routing=(jurisdiction, tax_type),
+        )
+        _ROUTED_CACHE.set(key, compiled)
+    return compiled
+
+
+def routed_cache_stats() -> dict:
+    """Hit/miss counters of the specialized-bundle cache."""
+    return _ROUTED_CACHE.stats()
@@ -0,0 +1,133 @@
+"""Rate lookup tables carried in rule bundles.
+
+A bundle may define named tables next to its rules:
+
+    "tables": {
+      "ca_districts": {"kind": "exact", "entries": {"LA_CITY": {"rate": 0.095, ...}}},
+      "ca_postal": {"kind": "range", "entries": [{"from": "90001", "to": "90899", "rate": 0.095}]}
+    }
+
+and a rule action can take its rate from one of them:
+
+    "then": {"set": {"taxable": true, "rate": 0.0725},
+             "rate_from": {"table": "ca_districts", "key": "transaction.evidence.locality_code"}}
+
+The matched entry's `rate` / `rate_components` override `set`; a key with no entry keeps
+the `set` values. Exact tables are hash maps and range tables (inclusive `from`..`to`,
+non-overlapping) are sorted arrays searched with bisect, so a lookup costs the same no
+matter how many localities a table holds. Tables are compiled once per bundle hash,
+together with the rules.
+"""
+
+from bisect import bisect_right
+from collections.abc import Mapping
+from typing import Any
+
+_ENTRY_FIELDS = ("rate", "rate_components")
+
+
+def _entry(raw: Any) -> dict:
+    """The fields of a table entry that a lookup applies."""
+    if not isinstance(raw, dict):
+        raise ValueError("table entries must be objects")
+    if "rate" in raw and not isinstance(raw["rate"], (int, float)):
+        raise ValueError("table entry rate must be a number")
+    if "rate_components" in raw and not isinstance(raw["rate_components"], list):
+        raise ValueError("table entry rate_components must be a list")
+    return {k: raw[k] for k in _ENTRY_FIELDS if k in raw}
+
+
+class ExactTable:
+    """Key -> entry hash map."""
+
+    def __init__(self, entries: Any):
+        if not isinstance(entries, dict):
+            raise ValueError("exact table entries must be an object keyed by lookup value")
+        self._entries = {key: _entry(value) for key, value in entries.items()}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: Any) -> dict | None:
+        try:
+            return self._entries.get(key)
+        except TypeError:  # unhashable value never equals a table key
+            return None
+
+
+class RangeTable:
+    """Inclusive, non-overlapping [from, to] ranges searched with bisect."""
+
+    def __init__(self, entries: Any):
+        if not isinstance(entries, list):
+            raise ValueError("range table entries must be a list")
+        rows = []
+        for raw in entries:
+            if not isinstance(raw, dict) or "from" not in raw or "to" not in raw:
+                raise ValueError("range table entries need `from` and `to`")
+            rows.append((raw["from"], raw["to"], _entry(raw)))
+        try:
+            rows.sort(key=lambda row: row[0])
+            for (_, prev_to, _), (start, end, _) in zip(rows, rows[1:]):
+                if start <= prev_to:
+                    raise ValueError(f"range table entries overlap at {start!r}")
+            if any(end < start for start, end, _ in rows):
+                raise ValueError("range table entry has `to` before `from`")
+        except TypeError:
+            raise ValueError("range table bounds must be mutually comparable") from None
+        self._starts = [row[0] for row in rows]
+        self._ends = [row[1] for row in rows]
+        self._values = [row[2] for row in rows]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def lookup(self, key: Any) -> dict | None:
+        if key is None:
+            return None
+        try:
+            i = bisect_right(self._starts, key) - 1
+            if i >= 0 and key <= self._ends[i]:
+                return self._values[i]
+        except TypeError:  # key not comparable with the bounds (e.g. int vs str)
+            pass
+        return None
+
+
+RateTable = ExactTable | RangeTable
+
+_KINDS = {"exact": ExactTable, "range": RangeTable}
+
+
+def compile_tables(raw: Any) -> dict[str, RateTable]:
+    """Compile a bundle's `tables` section; raises ValueError for malformed tables."""
+    if raw is None:
+        return {}
+    if not isinstance(raw, dict):
+        raise ValueError("tables must be an object keyed by table name")
+    tables: dict[str, RateTable] = {}
+    for name, spec in raw.items():
+        kind = spec.get("kind") if isinstance(spec, dict) else None
+        if kind not in _KINDS:
+            raise ValueError(f"table {name!r}: kind must be one of {sorted(_KINDS)}")
+        try:
+            tables[name] = _KINDS[kind](spec.get("entries"))
+        except ValueError as e:
+            raise ValueError(f"table {name!r}: {e}") from None
+    return tables
+
+
+def rate_from(rule: dict) -> tuple[str, str] | None:
+    """(table, key path) of a rule's `then.rate_from` lookup, if it has one."""
+    spec = (rule.get("then") or {}).get("rate_from")
+    if not isinstance(spec, dict):
+        return None
+    return spec.get("table", ""), spec.get("key", "")
+
+
+def validate_lookups(rules: list[dict], tables: Mapping[str, RateTable]) -> None:
+    """Raise ValueError if a rule looks up a table the bundle does not define."""
+    for rule in rules:
+        lookup = rate_from(rule)
+        if lookup is not None and lookup[0] not in tables:
+            raise ValueError(f"rule {rule.get('rule_id', '')!r}: unknown rate table {lookup[0]!r}")
@@ -0,0 +1,169 @@
+"""Worker pool for explain=full evaluations (TRACE_EXECUTOR=thread|process).
+
+A full trace with counterfactuals over a large bundle is CPU-bound; run inline it blocks
+the event loop and every cheap request queued behind it. Evaluations whose estimated
+cost (rules x (1 + counterfactuals)) reaches TRACE_COST_THRESHOLD run on a thread or
+process pool instead. Each tenant holds at most TRACE_TENANT_CONCURRENCY pool slots, and
+a trace that cannot start and finish within TRACE_TIMEOUT_SECONDS is abandoned so the
+caller can fall back to a winner-only explanation.
+
+Process workers keep their own compiled-bundle cache: jobs are sent with the bundle
+hash only, and the bundle itself is shipped once to each worker that has not seen it.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Literal
+
+from crms.config import settings
+from crms.engine.compiler import CompiledBundle, get_compiled_bundle, peek_compiled_bundle
+from crms.engine.evaluator import evaluate_rules
+
+logger = logging.getLogger(__name__)
+
+
+def _evaluate_traced(bundle: CompiledBundle, context: dict, amount: float, trace_kwargs: dict) -> tuple:
+    """evaluate_rules(trace=True) over a compiled bundle."""
+    rules = [crule.rule for crule in bundle.rules]
+    return evaluate_rules(context, rules, amount, trace=True, bundle=bundle, **trace_kwargs)
+
+
+def _evaluate_in_worker(
+    bundle_hash: str, bundle_json: dict | None, context: dict, amount: float, trace_kwargs: dict
+) -> tuple | None:
+    """Process-pool entry point; None when bundle_json is omitted and this worker lacks the bundle."""
+    if bundle_json is None:
+        bundle = peek_compiled_bundle(bundle_hash)
+        if bundle is None:
+            return None
+    else:
+        bundle = get_compiled_bundle(bundle_hash, bundle_json)
+    return _evaluate_traced(bundle, context, amount, trace_kwargs)
+
+
+class TracePool:
+    """Executor plus per-tenant slots and the timeout for offloaded traces."""
+
+    def __init__(
+        self,
+        mode: Literal["inline", "thread", "process"],
+        workers: int,
+        cost_threshold: int,
+        tenant_limit: int,
+        timeout: float,
+    ):
+        self.mode = mode
+        self.workers = workers
+        self.cost_threshold = cost_threshold
+        self.tenant_limit = tenant_limit
+        self.timeout = timeout
+        self._executor: Executor | None = None
+        self._slots: dict[str, asyncio.Semaphore] = {}
+        self.offloaded = 0
+        self.timeouts = 0
+        self.busy = 0
+
+    def offloads(self, bundle: CompiledBundle, max_counterfactuals: int, traces: int = 1) -> bool:
+        """Whether `traces` traces over `bundle` (one per invoice line) are costly enough to leave the event loop."""
+        cost = len(bundle.rules) * (1 + max_counterfactuals) * traces
+        return self.mode != "inline" and cost >= self.cost_threshold
+
+    def start(self) -> None:
+        """Create the executor (process workers are spawned, not forked from the event loop)."""
+        if self._executor is not None or self.mode == "inline":
+            return
+        if self.mode == "thread":
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="trace")
+        else:
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def shutdown(self) -> None:
+        """Stop the executor; queued traces are cancelled, running ones are not waited for."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def evaluate(
+        self,
+        tenant_id: str,
+        bundle_hash: str,
+        bundle_json: dict,
+        bundle: CompiledBundle,
+        context: dict,
+        amount: float,
+        trace_kwargs: dict,
+    ) -> tuple | None:
+        """
+        evaluate_rules(trace=True) output from the pool, or None if the tenant had no free
+        slot or the trace did not finish within the timeout (counted as busy/timeouts).
+        An abandoned trace keeps its slot until the worker actually finishes it.
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        slots = self._slots.get(tenant_id)
+        if slots is None:
+            slots = self._slots[tenant_id] = asyncio.Semaphore(self.tenant_limit)
+        try:
+            await asyncio.wait_for(slots.acquire(), self.timeout)
+        except TimeoutError:
+            self.busy += 1
+            return None
+
+        current: list[Future] = []
+        expired = False
+
+        def submit(fn, *args) -> asyncio.Future:
+            cfut = self._executor.submit(fn, *args)
+            current[:] = [cfut]
+            return asyncio.wrap_future(cfut)
+
+        async def run() -> tuple | None:
+            if self.mode == "thread":
+                return await submit(_evaluate_traced, bundle, context, amount, trace_kwargs)
+            out = await submit(_evaluate_in_worker, bundle_hash, None, context, amount, trace_kwargs)
+            if out is None and not expired:
+                out = await submit(_evaluate_in_worker, bundle_hash, bundle_json, context, amount, trace_kwargs)
+            return out
+
+        task = loop.create_task(run())
+        task.add_done_callback(lambda _: slots.release())
+        done, _ = await asyncio.wait((task,), timeout=max(deadline - loop.time(), 0))
+        if done:
+            self.offloaded += 1
+            return task.result()
+        expired = True
+        if current:
+            current[0].cancel()  # only succeeds if the worker has not started it yet
+        else:
+            task.cancel()
+        task.add_done_callback(_log_abandoned)
+        self.timeouts += 1
+        return None
+
+    def stats(self) -> dict:
+        """Pool mode and counters for /metrics."""
+        return {
+            "mode": self.mode,
+            "workers": self.workers if self.mode != "inline" else 0,
+            "offloaded": self.offloaded,
+            "timeouts": self.timeouts,
+            "busy": self.busy,
+        }
+
+
+def _log_abandoned(task: asyncio.Task) -> None:
+    """Consume the outcome of a trace the caller stopped waiting for."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Abandoned trace evaluation failed", exc_info=task.exception())
+
+
+trace_pool = TracePool(
+    mode=settings.trace_executor,
+    workers=settings.trace_workers,
+    cost_threshold=settings.trace_cost_threshold,
+    tenant_limit=settings.trace_tenant_concurrency,
+    timeout=settings.trace_timeout_seconds,
+)
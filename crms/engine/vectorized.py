@@ -0,0 +1,280 @@
+"""Vectorized (NumPy) evaluator for re-rating large transaction batches against one bundle.
+
+Transactions are flattened into one object column per referenced path; every leaf
+becomes a boolean mask over the batch, `all`/`any` become mask AND/OR, and the winner
+per row is the argmax over the priority-ordered match matrix. Results are identical to
+evaluate_rules: rows where a comparison raises (e.g. `gt` on a string) are re-run through
+the scalar evaluator, which raises exactly when evaluate_rules would.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from crms.engine.compiler import CompiledBundle, condition_op, make_getter, split_path
+from crms.engine.evaluator import _apply_then, _empty_result
+from crms.engine.tables import rate_from
+from crms.schemas.evaluation import FiredRule
+
+_SCALARS = (str, int, float, bool, type(None))
+_SMALL_IN = 8
+
+
+class _Columns:
+    """
+    Lazily flattened columns (values + is-None mask) for one chunk of contexts.
+    Columns are built level by level and intermediate prefixes are shared, so
+    `transaction.evidence` is walked once for all `transaction.evidence.*` leaves.
+    """
+
+    def __init__(self, contexts: Sequence[dict]):
+        self.contexts = contexts
+        self.n = len(contexts)
+        self._values: dict[tuple[str, ...], list] = {(): list(contexts)}
+        self._cols: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        # Rows where some comparison raised; resolved by the scalar evaluator
+        self.fallback = np.zeros(self.n, dtype=bool)
+
+    def _level(self, parts: tuple[str, ...]) -> list:
+        values = self._values.get(parts)
+        if values is None:
+            key = parts[-1]
+            parent = self._level(parts[:-1])
+            # Same rule as _get_path: step into dicts only, anything else resolves to None
+            values = [v.get(key) if isinstance(v, dict) else None for v in parent]
+            self._values[parts] = values
+        return values
+
+    def get(self, path: str) -> tuple[np.ndarray, np.ndarray]:
+        col = self._cols.get(path)
+        if col is None:
+            values = self._level(split_path(path))
+            arr = np.fromiter(values, dtype=object, count=self.n)
+            none = np.equal(arr, None)
+            col = self._cols[path] = (arr, none)
+        return col
+
+
+def _eq_mask(arr: np.ndarray, expected: Any) -> np.ndarray:
+    if isinstance(expected, _SCALARS):
+        return np.asarray(arr == expected, dtype=bool)
+    return np.frompyfunc(lambda v: v == expected, 1, 1)(arr).astype(bool)
+
+
+def _neq_mask(arr: np.ndarray, expected: Any) -> np.ndarray:
+    if isinstance(expected, _SCALARS):
+        return np.asarray(arr != expected, dtype=bool)
+    return np.frompyfunc(lambda v: v != expected, 1, 1)(arr).astype(bool)
+
+
+_ORDER_OPS = {
+    "gt": np.greater,
+    "gte": np.greater_equal,
+    "lt": np.less,
+    "lte": np.less_equal,
+}
+
+
+def _order_mask(cols: _Columns, op: str, arg: Any) -> np.ndarray:
+    """gt/gte/lt/lte: `val is not None and val <op> expected`."""
+    path, expected = arg
+    arr, none = cols.get(path)
+    present = ~none
+    out = np.zeros(cols.n, dtype=bool)
+    if not present.any():
+        return out
+    ufunc = _ORDER_OPS[op]
+    try:
+        out[present] = np.asarray(ufunc(arr[present], expected), dtype=bool)
+    except TypeError:
+        # Mixed types: compare element-wise and hand failing rows to the scalar path
+        idx = np.flatnonzero(present)
+        for i in idx:
+            try:
+                out[i] = bool(ufunc(arr[i], expected))
+            except TypeError:
+                cols.fallback[i] = True
+    return out
+
+
+def _in_mask(cols: _Columns, arg: Any) -> np.ndarray:
+    path, allowed = arg
+    if not isinstance(allowed, (list, tuple)):
+        return np.zeros(cols.n, dtype=bool)
+    arr, _ = cols.get(path)
+    if len(allowed) <= _SMALL_IN and all(isinstance(a, _SCALARS) for a in allowed):
+        out = np.zeros(cols.n, dtype=bool)
+        for a in allowed:
+            out |= np.asarray(arr == a, dtype=bool)
+        return out
+    seq = tuple(allowed)
+    try:
+        members = frozenset(seq)
+    except TypeError:
+        return np.frompyfunc(lambda v: v in seq, 1, 1)(arr).astype(bool)
+
+    def contains(v: Any) -> bool:
+        try:
+            return v in members
+        except TypeError:
+            return v in seq
+
+    return np.frompyfunc(contains, 1, 1)(arr).astype(bool)
+
+
+def _condition_mask(cols: _Columns, cond: dict) -> np.ndarray:
+    """Boolean mask of rows satisfying cond (same semantics as _eval_condition)."""
+    op = condition_op(cond)
+    n = cols.n
+    if op is None:
+        return np.zeros(n, dtype=bool)
+    arg = cond[op]
+    if op == "eq":
+        arr, _ = cols.get(arg[0])
+        return _eq_mask(arr, arg[1])
+    if op == "neq":
+        arr, _ = cols.get(arg[0])
+        return _neq_mask(arr, arg[1])
+    if op in _ORDER_OPS:
+        return _order_mask(cols, op, arg)
+    if op == "in":
+        return _in_mask(cols, arg)
+    if op in ("exists", "not_exists"):
+        arr, none = cols.get(arg[0] if isinstance(arg, list) else arg)
+        empty = np.asarray(arr == "", dtype=bool)
+        return ~none & ~empty if op == "exists" else none | empty
+    if op in ("path_eq", "path_neq"):
+        a1, n1 = cols.get(arg[0])
+        a2, n2 = cols.get(arg[1])
+        cmp = np.asarray(a1 == a2 if op == "path_eq" else a1 != a2, dtype=bool)
+        return ~n1 & ~n2 & cmp
+    if op == "all":
+        out = np.ones(n, dtype=bool)
+        for c in arg:
+            out &= _condition_mask(cols, c)
+        return out
+    # any
+    out = np.zeros(n, dtype=bool)
+    for c in arg:
+        out |= _condition_mask(cols, c)
+    return out
+
+
+@dataclass
+class BatchResult:
+    """
+    Vector outputs of evaluate_batch. rule_index points into bundle.rules (-1 = no match);
+    taxable/rate/tax_amount match what evaluate_rules returns per row.
+    """
+
+    bundle: CompiledBundle
+    rule_index: np.ndarray
+    taxable: np.ndarray
+    rate: np.ndarray
+    tax_amount: np.ndarray
+
+    def rule_ids(self) -> list[str | None]:
+        """Winning rule_id per row (None when no rule matched)."""
+        ids = [r.rule_id for r in self.bundle.rules]
+        return [ids[i] if i >= 0 else None for i in self.rule_index.tolist()]
+
+    def result(self, i: int, context: dict, amount: float) -> tuple[dict, list[FiredRule]]:
+        """Materialize the full evaluate_rules-style (result, fired) for row i."""
+        idx = int(self.rule_index[i])
+        if idx < 0:
+            return _empty_result(), []
+        rule = self.bundle.rules[idx].rule
+        fired = [
+            FiredRule(
+                rule_id=rule.get("rule_id", ""),
+                name=rule.get("name", ""),
+                because=rule.get("because", ""),
+            )
+        ]
+        return _apply_then(context, rule, amount, self.bundle.tables), fired
+
+
+def _winners(cols: _Columns, bundle: CompiledBundle) -> np.ndarray:
+    """First matching rule per row via argmax over the priority-ordered match matrix."""
+    n = cols.n
+    masks: list[np.ndarray] = []
+    covered = np.zeros(n, dtype=bool)
+    for crule in bundle.rules:
+        mask = _condition_mask(cols, crule.rule.get("when") or {})
+        masks.append(mask)
+        covered |= mask
+        if covered.all():
+            break  # every row already has a winner; lower rules cannot change it
+    if not masks:
+        return np.full(n, -1, dtype=np.int64)
+    matrix = np.stack(masks)
+    first = matrix.argmax(axis=0).astype(np.int64)
+    first[~covered] = -1
+    return first
+
+
+def _scalar_winner(context: dict, bundle: CompiledBundle) -> int:
+    """Linear first-match scan (raises exactly where evaluate_rules would)."""
+    memo = bundle.new_memo()
+    for k, crule in enumerate(bundle.rules):
+        if crule.predicate(context, memo):
+            return k
+    return -1
+
+
+def evaluate_batch(
+    contexts: Sequence[dict],
+    bundle: CompiledBundle,
+    amounts: Sequence[float] | np.ndarray,
+    *,
+    chunk_size: int = 65536,
+) -> BatchResult:
+    """
+    Evaluate many contexts ({"transaction": {...}}) against one compiled bundle.
+    Work is done in chunks of chunk_size rows to bound the match-matrix size.
+    """
+    n = len(contexts)
+    amounts_arr = np.asarray(amounts, dtype=np.float64)
+    rule_index = np.full(n, -1, dtype=np.int64)
+    fallback_rows: list[int] = []
+    for start in range(0, n, chunk_size):
+        chunk = contexts[start:start + chunk_size]
+        cols = _Columns(chunk)
+        rule_index[start:start + len(chunk)] = _winners(cols, bundle)
+        fallback_rows.extend((np.flatnonzero(cols.fallback) + start).tolist())
+
+    for i in fallback_rows:
+        rule_index[i] = _scalar_winner(contexts[i], bundle)
+
+    # Per-rule action constants, computed only for rules that actually won somewhere
+    n_rules = len(bundle.rules)
+    rule_taxable = np.zeros(n_rules + 1, dtype=bool)  # last slot = no match
+    rule_rate = np.zeros(n_rules + 1, dtype=np.float64)
+    lookups: list[int] = []
+    for k in np.unique(rule_index[rule_index >= 0]).tolist():
+        rule = bundle.rules[k].rule
+        set_vals = (rule.get("then") or {}).get("set") or {}
+        if "taxable" in set_vals:
+            rule_taxable[k] = bool(set_vals["taxable"])
+        if "rate" in set_vals:
+            rule_rate[k] = float(set_vals["rate"])
+        if rate_from(rule) is not None:
+            lookups.append(k)
+    taxable = rule_taxable[rule_index]
+    rate = rule_rate[rule_index]
+    # Rules with a rate_from lookup: per-row rates from the table (misses keep `set`)
+    for k in lookups:
+        table_name, key = rate_from(bundle.rules[k].rule)
+        table = bundle.tables.get(table_name)
+        if table is None:
+            continue
+        get = make_getter(key)
+        for i in np.flatnonzero(rule_index == k).tolist():
+            entry = table.lookup(get(contexts[i]))
+            if entry and "rate" in entry:
+                rate[i] = float(entry["rate"])
+    # Python's round() (correctly rounded) to match _apply_then bit-for-bit
+    tax_amount = np.frompyfunc(round, 2, 1)(rate * amounts_arr, 2).astype(np.float64)
+    return BatchResult(bundle=bundle, rule_index=rule_index, taxable=taxable, rate=rate, tax_amount=tax_amount)
@@ -1,6 +1,7 @@
 """CRMS FastAPI application."""
 
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -8,6 +9,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from crms.api.admin import router as admin_router
 from crms.api.evaluations import router as evaluations_router
 from crms.api.health import router as health_router
+from crms.config import settings
+from crms.engine.shadow import shadow_runner
+from crms.engine.trace_pool import trace_pool
+from crms.storage.audit_writer import audit_writer
+from crms.storage.invalidation import invalidation_listener
+from crms.storage.prewarm import version_prewarmer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,12 +22,31 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the background components (audit writer, trace pool, shadow runner, prewarmer, cache listener); drain/stop them on shutdown."""
+    if settings.audit_mode == "async":
+        audit_writer.start()
+    trace_pool.start()
+    shadow_runner.start()
+    version_prewarmer.start()
+    invalidation_listener.start()
+    yield
+    await invalidation_listener.stop()
+    await version_prewarmer.stop()
+    await shadow_runner.stop()
+    await audit_writer.stop()
+    trace_pool.shutdown()
+
+
 app = FastAPI(
     title="CRMS - Compliance Rules Microservice",
     description="Evaluates compliance/tax rules for transactions with versioned rulesets",
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
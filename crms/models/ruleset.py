@@ -22,6 +22,9 @@ class Ruleset(Base):
     tax_type: Mapped[str] = mapped_column(Text, nullable=False)
     name: Mapped[str] = mapped_column(Text, nullable=False)
     created_at: Mapped[str] = mapped_column(String(50), nullable=False)
+    # Candidate bundle evaluated in shadow after each primary evaluation (null = off)
+    shadow_bundle_hash: Mapped[str | None] = mapped_column(Text, nullable=True)
+    shadow_bundle_json: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
 
     __table_args__ = (
         # Unique per tenant
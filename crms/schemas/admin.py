@@ -42,3 +42,12 @@ class PublishRequest(BaseModel):
 
     effective_from: datetime
     change_summary: str | None = None
+    # Rate lookup tables for rate_from actions; omitted = keep the latest version's tables
+    tables: dict[str, Any] | None = None
+
+
+class ShadowRequest(BaseModel):
+    """PUT /v1/admin/rulesets/{id}/shadow request."""
+
+    # "draft" (the current draft rules, snapshotted now) or a published version, e.g. "1.0.3"
+    candidate: str = "draft"
@@ -1,7 +1,7 @@
 """Evaluation request/response schemas."""
 
 from datetime import datetime
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import BaseModel, Field
 
@@ -23,6 +23,7 @@ class ExplainOptions(BaseModel):
     explain: str = "none"  # none | winner | full
     near_miss: int = Field(default=3, ge=0, le=10)
     counterfactuals: int = Field(default=2, ge=0, le=5)
+    trace_budget: int | None = Field(default=None, ge=1)  # max rule steps in trace.steps
 
 
 class EvaluationRequest(BaseModel):
@@ -98,6 +99,7 @@ class EvaluationTrace(BaseModel):
 
     winner: FiredRule | None = None
     steps: list[RuleStep] = Field(default_factory=list)
+    steps_omitted: int = 0  # evaluated steps left out by options.trace_budget
     evidence_paths_used: list[str] = Field(default_factory=list)
     missing_evidence: list[str] = Field(default_factory=list)
     confidence: float = 1.0
@@ -136,6 +138,7 @@ class EvaluationExplanation(BaseModel):
 
     fired_rules: list[FiredRule] = Field(default_factory=list)
     trace: EvaluationTrace | None = None
+    trace_timed_out: bool = False  # explain=full fell back to winner-only (TRACE_TIMEOUT_SECONDS)
 
 
 class VersionInfo(BaseModel):
@@ -160,3 +163,171 @@ class EvaluationResponse(BaseModel):
     version: VersionInfo
     result: EvaluationResult
     explanation: EvaluationExplanation
+
+
+class InvoiceHeader(BaseModel):
+    """Invoice header: transaction fields shared by every line (flexible, like Transaction)."""
+
+    model_config = {"extra": "allow"}
+
+    jurisdiction: str
+    tax_type: str
+    currency: str = "USD"
+
+
+class InvoiceLine(BaseModel):
+    """One invoice line; its fields override the header's in the line transaction."""
+
+    model_config = {"extra": "allow"}
+
+    line_id: str | None = None
+    amount: float
+
+
+class InvoiceEvaluationRequest(BaseModel):
+    """POST /v1/evaluations:invoice request."""
+
+    idempotency_key: str | None = None
+    effective_at: datetime
+    header: InvoiceHeader
+    lines: list[InvoiceLine] = Field(min_length=1)
+    options: ExplainOptions | None = None
+
+
+class InvoiceLineResult(BaseModel):
+    """Outcome for one line (same result/explanation as POST /v1/evaluations)."""
+
+    index: int
+    line_id: str | None = None
+    result: EvaluationResult
+    explanation: EvaluationExplanation
+
+
+class InvoiceTotals(BaseModel):
+    """Invoice totals; tax_amount is the sum of the rounded line taxes."""
+
+    amount: float
+    taxable_amount: float
+    tax_amount: float
+
+
+class InvoiceEvaluationResponse(BaseModel):
+    """POST /v1/evaluations:invoice response (stored as one audit record)."""
+
+    evaluation_id: str
+    ruleset: RulesetInfo
+    version: VersionInfo
+    lines: list[InvoiceLineResult] = Field(default_factory=list)
+    totals: InvoiceTotals
+
+
+class TimelineEvaluationRequest(BaseModel):
+    """POST /v1/evaluations:timeline request: one transaction over [effective_from, effective_to)."""
+
+    effective_from: datetime
+    effective_to: datetime
+    transaction: Transaction
+    options: ExplainOptions | None = None
+
+
+class TimelineVersion(BaseModel):
+    """Version in effect during a timeline segment, with its own effective window."""
+
+    version: str
+    bundle_hash: str
+    effective_from: datetime
+    effective_to: datetime | None = None
+
+
+class TimelineSegment(BaseModel):
+    """
+    Part of the requested range with a single version in effect (bounds clipped to the
+    range). version/result/explanation are None where no version is in effect.
+    """
+
+    effective_from: datetime
+    effective_to: datetime
+    version: TimelineVersion | None = None
+    result: EvaluationResult | None = None
+    explanation: EvaluationExplanation | None = None
+
+
+class TimelineEvaluationResponse(BaseModel):
+    """POST /v1/evaluations:timeline response, segments in date order."""
+
+    ruleset: RulesetInfo
+    segments: list[TimelineSegment] = Field(default_factory=list)
+
+
+class BatchEvaluationRequest(BaseModel):
+    """POST /v1/evaluations:batch request."""
+
+    items: list[EvaluationRequest] = Field(min_length=1)
+
+
+class BatchItemError(BaseModel):
+    """Per-item failure in a batch (same status/detail the single endpoint would return)."""
+
+    status_code: int
+    detail: str
+
+
+class BatchItemResult(BaseModel):
+    """One batch item outcome: either a response or an error."""
+
+    index: int
+    idempotency_key: str | None = None
+    response: EvaluationResponse | None = None
+    error: BatchItemError | None = None
+
+
+class BatchEvaluationResponse(BaseModel):
+    """POST /v1/evaluations:batch response, in request order."""
+
+    results: list[BatchItemResult] = Field(default_factory=list)
+
+
+class FanoutTarget(BaseModel):
+    """One (jurisdiction, tax_type) a fan-out transaction is evaluated for."""
+
+    jurisdiction: str
+    tax_type: str
+
+
+class FanoutTransaction(BaseModel):
+    """Fan-out transaction: a Transaction without routing (that comes from each target)."""
+
+    model_config = {"extra": "allow"}
+
+    currency: str = "USD"
+    amount: float
+
+
+class FanoutEvaluationRequest(BaseModel):
+    """POST /v1/evaluations:fanout request."""
+
+    idempotency_key: str | None = None
+    effective_at: datetime
+    transaction: FanoutTransaction
+    targets: list[FanoutTarget] = Field(min_length=1)
+    options: ExplainOptions | None = None
+    audit: Literal["per_target", "combined"] = "per_target"
+
+
+class FanoutTargetResult(BaseModel):
+    """One target's outcome: a response (as POST /v1/evaluations) or an error."""
+
+    jurisdiction: str
+    tax_type: str
+    response: EvaluationResponse | None = None
+    error: BatchItemError | None = None
+
+
+class FanoutEvaluationResponse(BaseModel):
+    """
+    POST /v1/evaluations:fanout response: results keyed "<jurisdiction>:<tax_type>".
+    evaluation_id is the combined audit record (audit=combined), else None.
+    """
+
+    evaluation_id: str | None = None
+    results: dict[str, FanoutTargetResult] = Field(default_factory=dict)
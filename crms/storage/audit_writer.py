@@ -0,0 +1,212 @@
+"""Write-behind audit pipeline (AUDIT_MODE=async).
+
+Evaluation rows are built up front (evaluation_id included) and pushed onto a bounded
+in-process queue; a background task drains it with multi-row INSERTs of up to
+AUDIT_BATCH_SIZE rows, flushing at least every AUDIT_FLUSH_INTERVAL_SECONDS. The app
+lifespan starts the writer and drains the queue on graceful shutdown. Callers fall back
+to a synchronous insert when the queue is full or the writer is not running.
+
+A batch whose INSERT fails is retried AUDIT_WRITE_RETRIES times with doubling backoff,
+then written row by row; rows that still fail are appended to AUDIT_SPILL_PATH as NDJSON
+(the same column values) for re-insertion, never dropped silently.
+"""
+
+import asyncio
+import logging
+
+import orjson
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from crms.config import settings
+from crms.database import async_session_maker
+from crms.storage.repositories import create_evaluations
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # queued by stop(); always the last item
+MAX_RETRY_BACKOFF = 5.0
+
+
+def _append(path: str, data: bytes) -> None:
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+class AuditWriter:
+    """Bounded queue of evaluation rows plus the task that batch-inserts them."""
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        retries: int = 0,
+        retry_backoff: float = 0.0,
+        spill_path: str | None = None,
+    ):
+        self._session_maker = session_maker
+        self._max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.spill_path = spill_path
+        # Unbounded so the stop marker always fits; submit() enforces max_queue
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._getter: asyncio.Future | None = None
+        self._closing = False
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.rejected = 0
+        self.retried = 0
+        self.spilled = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._closing
+
+    def submit(self, row: dict) -> bool:
+        """Queue one audit row; False if the writer is stopped or the queue is full."""
+        if not self.running:
+            return False
+        if self._queue.qsize() >= self._max_queue:
+            self.rejected += 1
+            return False
+        self._queue.put_nowait(row)
+        return True
+
+    def start(self) -> None:
+        """Start the background writer on the running event loop."""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._closing = False
+        self._task = asyncio.create_task(self._run(), name="audit-writer")
+
+    async def stop(self) -> None:
+        """Stop accepting rows and wait until everything queued has been written."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._queue.put_nowait(_STOP)
+        await self._task
+        self._task = None
+
+    async def _get(self, timeout: float | None = None) -> object | None:
+        """
+        Next queue item, or None after timeout. A pending get is kept for the next call
+        rather than cancelled, so an item can never be lost to a timeout race.
+        """
+        if self._getter is None:
+            try:
+                return self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                self._getter = asyncio.ensure_future(self._queue.get())
+        done, _ = await asyncio.wait((self._getter,), timeout=timeout)
+        if not done:
+            return None
+        item, self._getter = self._getter.result(), None
+        return item
+
+    async def _next_batch(self) -> tuple[list[dict], bool]:
+        """
+        (rows, stopped): up to batch_size rows, collected for at most one flush interval
+        after the first; stopped once the stop marker has been reached.
+        """
+        loop = asyncio.get_running_loop()
+        batch: list[dict] = []
+        item = await self._get()
+        deadline = loop.time() + self.flush_interval
+        while item is not _STOP:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            item = await self._get(max(deadline - loop.time(), 0))
+            if item is None:
+                return batch, False
+        return batch, True
+
+    async def _insert(self, rows: list[dict]) -> None:
+        async with self._session_maker() as db:
+            await create_evaluations(db, rows)
+            await db.commit()
+
+    async def _write(self, rows: list[dict]) -> None:
+        """Insert a batch: retried with backoff, then row by row; what still fails is spilled."""
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.retried += 1
+                await asyncio.sleep(min(self.retry_backoff * 2 ** (attempt - 1), MAX_RETRY_BACKOFF))
+            try:
+                await self._insert(rows)
+            except Exception:
+                logger.warning(
+                    "Audit write-behind batch of %d rows failed (attempt %d of %d)",
+                    len(rows), attempt + 1, self.retries + 1, exc_info=True,
+                )
+                continue
+            self.written += len(rows)
+            self.batches += 1
+            return
+        unwritten = []
+        for row in rows:
+            try:
+                await self._insert([row])
+            except Exception:
+                unwritten.append(row)
+            else:
+                self.written += 1
+        if unwritten:
+            await self._spill(unwritten)
+
+    async def _spill(self, rows: list[dict]) -> None:
+        """Append rows the database would not take to the spill file."""
+        if self.spill_path:
+            data = b"".join(orjson.dumps(row, default=str) + b"\n" for row in rows)
+            try:
+                await asyncio.to_thread(_append, self.spill_path, data)
+            except Exception:
+                logger.exception("Could not spill %d audit rows to %s", len(rows), self.spill_path)
+            else:
+                self.spilled += len(rows)
+                logger.error("Spilled %d unwritten audit rows to %s", len(rows), self.spill_path)
+                return
+        self.failed += len(rows)
+        logger.error(
+            "Lost %d audit rows: %s", len(rows), ", ".join(str(row["evaluation_id"]) for row in rows)
+        )
+
+    async def _run(self) -> None:
+        stopped = False
+        while not stopped:
+            batch, stopped = await self._next_batch()
+            if batch:
+                await self._write(batch)
+
+    def stats(self) -> dict:
+        """Queue depth and write counters for /metrics."""
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self.running else 0,
+            "written": self.written,
+            "batches": self.batches,
+            "retried": self.retried,
+            "spilled": self.spilled,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+audit_writer = AuditWriter(
+    async_session_maker,
+    max_queue=settings.audit_queue_size,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval_seconds,
+    retries=settings.audit_write_retries,
+    retry_backoff=settings.audit_retry_backoff_seconds,
+    spill_path=settings.audit_spill_path or None,
+)
@@ -0,0 +1,173 @@
+"""Cross-worker ruleset cache invalidation over Postgres LISTEN/NOTIFY.
+
+Admin writes that change what the ruleset cache holds (creating a ruleset, publishing a
+version, setting or clearing a shadow candidate) send a NOTIFY on CHANNEL from inside
+their transaction, so it is delivered only if, and right after, the write commits. The
+payload carries the tenant, ruleset_id and version_id (null when no version was
+published) plus the routing pair the cache is keyed by.
+
+Each worker keeps one dedicated LISTEN connection and evicts exactly the entries named by
+notifications. While it is connected, entries are kept for RULESET_CACHE_LISTEN_TTL_SECONDS
+(effectively unbounded); when it drops, nothing says what was missed, so the whole cache
+is cleared and entries fall back to RULESET_CACHE_TTL_SECONDS until the listener is back
+(and the cache is cleared once more).
+"""
+
+import asyncio
+import logging
+
+import asyncpg
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crms.config import settings
+from crms.database import get_engine_url_and_connect_args
+from crms.models import Ruleset
+from crms.storage.ruleset_cache import RulesetCache, ruleset_cache
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "crms_ruleset_changed"
+
+
+def change_payload(tenant_id: str, ruleset: Ruleset, version_id: str | None = None) -> str:
+    """NOTIFY payload for a change to one ruleset."""
+    return orjson.dumps({
+        "tenant_id": str(tenant_id),
+        "ruleset_id": str(ruleset.ruleset_id),
+        "version_id": str(version_id) if version_id is not None else None,
+        "jurisdiction": ruleset.jurisdiction,
+        "tax_type": ruleset.tax_type,
+    }).decode()
+
+
+async def notify_ruleset_change(
+    db: AsyncSession, tenant_id: str, ruleset: Ruleset, version_id: str | None = None
+) -> None:
+    """Queue a change notification in the current transaction (sent on commit)."""
+    await db.execute(select(func.pg_notify(CHANNEL, change_payload(tenant_id, ruleset, version_id))))
+
+
+class InvalidationListener:
+    """Background task holding the LISTEN connection and evicting notified entries."""
+
+    def __init__(
+        self,
+        cache: RulesetCache,
+        listen_ttl: float,
+        fallback_ttl: float,
+        reconnect_delay: float,
+        keepalive: float,
+        enabled: bool = True,
+    ):
+        self._cache = cache
+        self.listen_ttl = listen_ttl
+        self.fallback_ttl = fallback_ttl
+        self.reconnect_delay = reconnect_delay
+        self.keepalive = keepalive
+        self.enabled = enabled
+        self._task: asyncio.Task | None = None
+        self.connected = False
+        self.connects = 0
+        self.disconnects = 0
+        self.notifications = 0
+        self.malformed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        """Start the background task on the running event loop (no-op when disabled)."""
+        if self._task is not None or not self.enabled:
+            return
+        self._task = asyncio.create_task(self._run(), name="cache-invalidation-listener")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        url, connect_args = get_engine_url_and_connect_args()
+        dsn = url.replace("postgresql+asyncpg://", "postgresql://", 1)
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn, **connect_args)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(CHANNEL, self._on_notify)
+                self.on_connected()
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), self.keepalive)
+                    except TimeoutError:
+                        # A silently dropped connection only shows up when used
+                        await asyncio.wait_for(conn.execute("SELECT 1"), self.keepalive)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Cache invalidation listener connection failed", exc_info=True)
+            finally:
+                if self.connected:
+                    self.on_disconnected()
+                if conn is not None and not conn.is_closed():
+                    conn.terminate()
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _on_notify(self, connection, pid, channel: str, payload: str) -> None:
+        self.handle(payload)
+
+    def handle(self, payload: str) -> None:
+        """Evict the cache entry a notification names."""
+        try:
+            change = orjson.loads(payload)
+            key = (change["tenant_id"], change["jurisdiction"], change["tax_type"])
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            self.malformed += 1
+            logger.warning("Ignoring malformed cache invalidation payload: %r", payload)
+            return
+        self.notifications += 1
+        self._cache.invalidate(*key)
+
+    def on_connected(self) -> None:
+        """Listening: revalidate everything once (changes may have been missed), then trust notifications."""
+        self.connected = True
+        self.connects += 1
+        self._cache.clear()
+        self._cache.set_ttl(self.listen_ttl)
+
+    def on_disconnected(self) -> None:
+        """Not listening: revalidate everything and go back to TTL expiry."""
+        self.connected = False
+        self.disconnects += 1
+        self._cache.set_ttl(self.fallback_ttl)
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        """Connection state and notification counters for /metrics."""
+        return {
+            "running": self.running,
+            "connected": self.connected,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "notifications": self.notifications,
+            "malformed": self.malformed,
+        }
+
+
+invalidation_listener = InvalidationListener(
+    ruleset_cache,
+    listen_ttl=settings.ruleset_cache_listen_ttl_seconds,
+    fallback_ttl=settings.ruleset_cache_ttl_seconds,
+    reconnect_delay=settings.invalidation_reconnect_seconds,
+    keepalive=settings.invalidation_keepalive_seconds,
+    enabled=settings.invalidation_listen,
+)
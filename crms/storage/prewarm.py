@@ -0,0 +1,120 @@
+"""Pre-warming of versions ahead of their effective_from (per process).
+
+A version published with a future effective_from would otherwise be compiled, indexed
+and specialized by the first request after the cutover instant - in every worker at
+once, possibly together with a ruleset cache reload. Every PREWARM_INTERVAL_SECONDS the
+prewarmer asks (one query, across tenants) for versions taking effect within
+PREWARM_HORIZON_SECONDS, refreshes ruleset cache entries that do not list them yet, and
+compiles each bundle in both its full and routed forms. By the cutover, the first
+request finds everything in memory.
+"""
+
+import asyncio
+import logging
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from crms.config import settings
+from crms.database import async_session_maker
+from crms.engine.compiler import get_compiled_bundle
+from crms.engine.specialize import get_routed_bundle
+from crms.storage.repositories import get_upcoming_versions
+from crms.storage.ruleset_cache import RulesetCache, ruleset_cache
+
+logger = logging.getLogger(__name__)
+
+
+class VersionPrewarmer:
+    """Background task that warms caches for upcoming versions."""
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        cache: RulesetCache,
+        interval: float,
+        horizon: float,
+    ):
+        self._session_maker = session_maker
+        self._cache = cache
+        self.interval = interval
+        self.horizon = horizon
+        self._task: asyncio.Task | None = None
+        self._warmed: dict[str, datetime] = {}  # version id -> effective_from, compiled by this process
+        self.runs = 0
+        self.versions = 0
+        self.refreshed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        """Start the background task on the running event loop (no-op when disabled)."""
+        if self._task is not None or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run(), name="version-prewarmer")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                self.failed += 1
+                logger.exception("Version prewarm failed")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self, now: datetime | None = None) -> None:
+        """Warm every version taking effect in (now - interval, now + horizon]."""
+        now = now or datetime.now(UTC)
+        start = now - timedelta(seconds=self.interval)
+        # Versions already in effect before the window can no longer come back: forget them
+        self._warmed = {vid: at for vid, at in self._warmed.items() if at > start}
+        async with self._session_maker() as db:
+            upcoming = await get_upcoming_versions(db, start, now + timedelta(seconds=self.horizon))
+            stale: dict[str, set[tuple[str, str]]] = {}
+            for tenant_id, jurisdiction, tax_type, version in upcoming:
+                cached, entry = self._cache.peek(tenant_id, jurisdiction, tax_type)
+                if cached and (entry is None or all(v.version_id != str(version.version_id) for v in entry.versions)):
+                    stale.setdefault(tenant_id, set()).add((jurisdiction, tax_type))
+            for tenant_id, pairs in stale.items():
+                await self._cache.refresh(db, tenant_id, sorted(pairs))
+                self.refreshed += len(pairs)
+        for tenant_id, jurisdiction, tax_type, version in upcoming:
+            if str(version.version_id) in self._warmed:
+                continue
+            get_compiled_bundle(version.bundle_hash, version.bundle_json)
+            get_routed_bundle(version.bundle_hash, version.bundle_json, jurisdiction, tax_type)
+            self._warmed[str(version.version_id)] = version.effective_from
+            self.versions += 1
+            await asyncio.sleep(0)  # compile one bundle at a time between requests
+        self.runs += 1
+
+    def stats(self) -> dict:
+        """Run and warm counters for /metrics."""
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "versions": self.versions,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+        }
+
+
+version_prewarmer = VersionPrewarmer(
+    async_session_maker,
+    ruleset_cache,
+    interval=settings.prewarm_interval_seconds,
+    horizon=settings.prewarm_horizon_seconds,
+)
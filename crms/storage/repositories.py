@@ -1,60 +1,200 @@
 """Repository functions for rulesets, versions, evaluations."""
 
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
 from datetime import UTC, datetime
 from uuid import uuid4
 
-from sqlalchemy import select
+from sqlalchemy import and_, insert, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from crms.models import Evaluation, Rule, Ruleset, RulesetVersion
+from crms.models import Evaluation, Rule, Ruleset, RulesetVersion, Tenant
 
 
-async def get_ruleset_by_jurisdiction_tax(
-    db: AsyncSession, tenant_id: str, jurisdiction: str, tax_type: str
-) -> Ruleset | None:
-    """Find ruleset by tenant + jurisdiction + tax_type."""
+async def load_rulesets_with_versions(
+    db: AsyncSession, tenant_id: str, pairs: list[tuple[str, str]]
+) -> dict[tuple[str, str], tuple[Ruleset, list[RulesetVersion]]]:
+    """
+    Load rulesets for several (jurisdiction, tax_type) pairs together with all their
+    published versions (ordered by effective_from) in one query. Missing pairs are absent.
+    """
+    if not pairs:
+        return {}
     result = await db.execute(
-        select(Ruleset).where(
+        select(Ruleset, RulesetVersion)
+        .outerjoin(RulesetVersion, RulesetVersion.ruleset_id == Ruleset.ruleset_id)
+        .where(
             Ruleset.tenant_id == tenant_id,
-            Ruleset.jurisdiction == jurisdiction,
-            Ruleset.tax_type == tax_type,
+            tuple_(Ruleset.jurisdiction, Ruleset.tax_type).in_(pairs),
         )
+        .order_by(Ruleset.ruleset_id, RulesetVersion.effective_from)
     )
-    return result.scalar_one_or_none()
+    loaded: dict[tuple[str, str], tuple[Ruleset, list[RulesetVersion]]] = {}
+    for ruleset, version in result.all():
+        _, versions = loaded.setdefault((ruleset.jurisdiction, ruleset.tax_type), (ruleset, []))
+        if version is not None:
+            versions.append(version)
+    return loaded
 
 
-async def get_version_for_effective_at(
-    db: AsyncSession, ruleset_id: str, effective_at: datetime
-) -> RulesetVersion | None:
+async def get_upcoming_versions(
+    db: AsyncSession, start: datetime, end: datetime
+) -> list[tuple[str, str, str, RulesetVersion]]:
     """
-    Resolve version where effective_from <= effective_at < effective_to
-    (or effective_to is null).
+    (tenant_id, jurisdiction, tax_type, version) for every version, across tenants, whose
+    effective_from falls in (start, end].
     """
     result = await db.execute(
-        select(RulesetVersion)
-        .where(RulesetVersion.ruleset_id == ruleset_id)
-        .where(RulesetVersion.effective_from <= effective_at)
-        .where(
-            (RulesetVersion.effective_to.is_(None))
-            | (RulesetVersion.effective_to > effective_at)
-        )
+        select(Ruleset.tenant_id, Ruleset.jurisdiction, Ruleset.tax_type, RulesetVersion)
+        .join(RulesetVersion, RulesetVersion.ruleset_id == Ruleset.ruleset_id)
+        .where(RulesetVersion.effective_from > start, RulesetVersion.effective_from <= end)
+        .order_by(RulesetVersion.effective_from)
+    )
+    return [(str(tenant_id), jurisdiction, tax_type, version) for tenant_id, jurisdiction, tax_type, version in result.all()]
+
+
+async def get_live_bundles(db: AsyncSession, at: datetime) -> list[tuple[str, str, str, dict]]:
+    """
+    (jurisdiction, tax_type, bundle_hash, bundle_json) across tenants for every version
+    in effect at `at` or later, most recent effective_from first, then shadow candidates.
+    """
+    versions = await db.execute(
+        select(Ruleset.jurisdiction, Ruleset.tax_type, RulesetVersion.bundle_hash, RulesetVersion.bundle_json)
+        .join(RulesetVersion, RulesetVersion.ruleset_id == Ruleset.ruleset_id)
+        .where((RulesetVersion.effective_to.is_(None)) | (RulesetVersion.effective_to > at))
         .order_by(RulesetVersion.effective_from.desc())
-        .limit(1)
     )
-    return result.scalar_one_or_none()
+    shadows = await db.execute(
+        select(Ruleset.jurisdiction, Ruleset.tax_type, Ruleset.shadow_bundle_hash, Ruleset.shadow_bundle_json)
+        .where(Ruleset.shadow_bundle_hash.is_not(None))
+    )
+    return [tuple(row) for row in versions.all()] + [tuple(row) for row in shadows.all()]
 
 
-async def get_evaluation_by_idempotency(
-    db: AsyncSession, tenant_id: str, idempotency_key: str
-) -> Evaluation | None:
-    """Find existing evaluation for idempotency."""
+async def get_tenants(db: AsyncSession) -> list[Tenant]:
+    """All tenants (for warming the API key cache)."""
+    result = await db.execute(select(Tenant))
+    return list(result.scalars().all())
+
+
+@dataclass
+class RequestContext:
+    """Everything load_request_context found (None/empty where nothing matched or not requested)."""
+
+    tenant: Tenant | None = None
+    ruleset: Ruleset | None = None
+    versions: list[RulesetVersion] = field(default_factory=list)
+    existing: Evaluation | None = None
+
+
+async def load_request_context(
+    db: AsyncSession,
+    api_key_hash: str,
+    jurisdiction: str,
+    tax_type: str,
+    *,
+    include_ruleset: bool = True,
+    idempotency_key: str | None = None,
+) -> RequestContext:
+    """
+    Tenant (by API key hash), its ruleset for (jurisdiction, tax_type) with every published
+    version, and the evaluation already stored under idempotency_key - in one statement:
+    tenants LEFT JOIN rulesets LEFT JOIN ruleset_versions LEFT JOIN evaluations, one row
+    per version. include_ruleset=False / idempotency_key=None drop the respective joins.
+    """
+    stmt = select(Tenant).where(Tenant.api_key_hash == api_key_hash)
+    if include_ruleset:
+        stmt = (
+            stmt.add_columns(Ruleset, RulesetVersion)
+            .outerjoin(
+                Ruleset,
+                and_(
+                    Ruleset.tenant_id == Tenant.tenant_id,
+                    Ruleset.jurisdiction == jurisdiction,
+                    Ruleset.tax_type == tax_type,
+                ),
+            )
+            .outerjoin(RulesetVersion, RulesetVersion.ruleset_id == Ruleset.ruleset_id)
+        )
+    if idempotency_key:
+        stmt = stmt.add_columns(Evaluation).outerjoin(
+            Evaluation,
+            and_(
+                Evaluation.tenant_id == Tenant.tenant_id,
+                Evaluation.idempotency_key == idempotency_key,
+            ),
+        )
+    ctx = RequestContext()
+    for row in (await db.execute(stmt)).all():
+        ctx.tenant = row[0]
+        if include_ruleset:
+            ctx.ruleset = row[1]
+            if row[2] is not None:
+                ctx.versions.append(row[2])
+        if idempotency_key:
+            ctx.existing = row[-1]
+    return ctx
+
+
+async def get_evaluations_by_idempotency_keys(
+    db: AsyncSession, tenant_id: str, idempotency_keys: list[str]
+) -> dict[str, Evaluation]:
+    """Find existing evaluations for several idempotency keys in one query."""
+    if not idempotency_keys:
+        return {}
     result = await db.execute(
         select(Evaluation).where(
             Evaluation.tenant_id == tenant_id,
-            Evaluation.idempotency_key == idempotency_key,
+            Evaluation.idempotency_key.in_(idempotency_keys),
         )
     )
-    return result.scalar_one_or_none()
+    return {ev.idempotency_key: ev for ev in result.scalars().all()}
+
+
+async def stream_evaluations(
+    db: AsyncSession,
+    tenant_id: str,
+    ruleset_id: str,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    partition_size: int = 1000,
+) -> AsyncIterator[list[tuple[str, dict, dict]]]:
+    """
+    (evaluation_id, input_json, output_json) of a ruleset's audit rows created in
+    [created_from, created_to), in partitions of partition_size fetched from a
+    server-side cursor (only one partition is held at a time).
+    """
+    stmt = select(Evaluation.evaluation_id, Evaluation.input_json, Evaluation.output_json).where(
+        Evaluation.tenant_id == tenant_id,
+        Evaluation.ruleset_id == ruleset_id,
+    )
+    if created_from is not None:
+        stmt = stmt.where(Evaluation.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(Evaluation.created_at < created_to)
+    result = await db.stream(stmt.execution_options(yield_per=partition_size))
+    async for partition in result.partitions():
+        yield [(str(row[0]), row[1], row[2]) for row in partition]
+
+
+async def load_draft_bundle(db: AsyncSession, ruleset_id: str) -> dict:
+    """
+    Bundle the ruleset's draft rules would publish as: rules by priority DESC, with the
+    latest version's rate tables carried over.
+    """
+    result = await db.execute(select(Rule).where(Rule.ruleset_id == ruleset_id, Rule.state == "draft"))
+    rules = [r.rule_json for r in sorted(result.scalars().all(), key=lambda r: r.priority, reverse=True)]
+    result = await db.execute(
+        select(RulesetVersion.bundle_json)
+        .where(RulesetVersion.ruleset_id == ruleset_id)
+        .order_by(RulesetVersion.published_at.desc())
+        .limit(1)
+    )
+    latest = result.scalar_one_or_none()
+    bundle = {"rules": rules}
+    if latest and latest.get("tables"):
+        bundle["tables"] = latest["tables"]
+    return bundle
 
 
 async def get_evaluation_by_id(
@@ -70,8 +210,7 @@ async def get_evaluation_by_id(
     return result.scalar_one_or_none()
 
 
-async def create_evaluation(
-    db: AsyncSession,
+def new_evaluation_row(
     tenant_id: str,
     ruleset_id: str,
     version_id: str,
@@ -80,20 +219,25 @@ async def create_evaluation(
     idempotency_key: str | None = None,
     request_hash: str | None = None,
     trace_id: str | None = None,
-) -> Evaluation:
-    """Create evaluation audit record."""
-    ev = Evaluation(
-        evaluation_id=str(uuid4()),
-        tenant_id=tenant_id,
-        ruleset_id=ruleset_id,
-        version_id=version_id,
-        idempotency_key=idempotency_key,
-        request_hash=request_hash,
-        input_json=input_json,
-        output_json=output_json,
-        trace_id=trace_id,
-        created_at=datetime.now(UTC),
-    )
-    db.add(ev)
-    await db.flush()
-    return ev
+    evaluation_id: str | None = None,
+) -> dict:
+    """Column values for an evaluation audit row (for bulk inserts)."""
+    return {
+        "evaluation_id": evaluation_id or str(uuid4()),
+        "tenant_id": tenant_id,
+        "ruleset_id": ruleset_id,
+        "version_id": version_id,
+        "idempotency_key": idempotency_key,
+        "request_hash": request_hash,
+        "input_json": input_json,
+        "output_json": output_json,
+        "trace_id": trace_id,
+        "created_at": datetime.now(UTC),
+    }
+
+
+async def create_evaluations(db: AsyncSession, rows: list[dict]) -> None:
+    """Insert many evaluation audit rows in one multi-row INSERT."""
+    if not rows:
+        return
+    await db.execute(insert(Evaluation), rows)
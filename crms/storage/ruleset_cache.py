@@ -0,0 +1,255 @@
+"""In-process cache of rulesets and their published version timelines.
+
+Published versions never change, so a ruleset's whole timeline (ordered by
+effective_from) is loaded once and `effective_at` is resolved in memory with a bisect.
+Entries are keyed by (tenant_id, jurisdiction, tax_type); unknown pairs are cached as
+misses too. Admin writes invalidate the local entry and NOTIFY the other workers, which
+evict theirs (see invalidation.py); without a listener connection, they see a new version
+once their entry expires (RULESET_CACHE_TTL_SECONDS). The prewarmer refreshes entries
+ahead of a version's effective_from (see prewarm.py). Loads are single-flight: concurrent
+misses for the same entry share one query.
+"""
+
+import asyncio
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crms.config import settings
+from crms.models import Ruleset, RulesetVersion
+from crms.storage.repositories import load_rulesets_with_versions
+from crms.utils.lru import LRUCache
+
+_NOT_CACHED = object()
+
+
+def as_utc(dt: datetime) -> datetime:
+    """Naive datetimes are treated as UTC (as Postgres does for timestamptz params)."""
+    return dt.replace(tzinfo=UTC) if dt.tzinfo is None else dt
+
+
+@dataclass(slots=True, frozen=True)
+class CachedVersion:
+    """Detached snapshot of a published RulesetVersion (safe to share across sessions)."""
+
+    version_id: str
+    version: str
+    effective_from: datetime
+    effective_to: datetime | None
+    bundle_hash: str
+    bundle_json: dict
+
+
+@dataclass(slots=True, frozen=True)
+class CachedRuleset:
+    """A ruleset with its versions sorted by effective_from (and its shadow candidate, if any)."""
+
+    ruleset_id: str
+    jurisdiction: str
+    tax_type: str
+    versions: tuple[CachedVersion, ...]
+    starts: tuple[datetime, ...]
+    shadow_hash: str | None = None
+    shadow_bundle: dict | None = None
+
+    def version_at(self, effective_at: datetime) -> CachedVersion | None:
+        """
+        Version where effective_from <= effective_at < effective_to (or effective_to is
+        null), latest effective_from first.
+        """
+        at = as_utc(effective_at)
+        i = bisect_right(self.starts, at)
+        # Usually the first candidate; earlier ones only matter when a later publish
+        # closed a version before its own start.
+        while i:
+            i -= 1
+            v = self.versions[i]
+            if v.effective_to is None or v.effective_to > at:
+                return v
+        return None
+
+    def segments(
+        self, start: datetime, end: datetime
+    ) -> list[tuple[datetime, datetime, CachedVersion | None]]:
+        """
+        [start, end) split where version_at changes, as (from, to, version) in order;
+        version is None where nothing is in effect. version_at is constant between
+        consecutive effective_from/effective_to values, so only those are cut points.
+        """
+        start, end = as_utc(start), as_utc(end)
+        cuts = {start, end}
+        for v in self.versions:
+            for at in (v.effective_from, v.effective_to):
+                if at is not None and start < at < end:
+                    cuts.add(at)
+        bounds = sorted(cuts)
+        out: list[tuple[datetime, datetime, CachedVersion | None]] = []
+        for lo, hi in zip(bounds, bounds[1:]):
+            version = self.version_at(lo)
+            if out and out[-1][2] is version:
+                out[-1] = (out[-1][0], hi, version)
+            else:
+                out.append((lo, hi, version))
+        return out
+
+
+def snapshot(ruleset: Ruleset, versions: list[RulesetVersion]) -> CachedRuleset:
+    """Build a CachedRuleset from ORM rows."""
+    cached = sorted(
+        (
+            CachedVersion(
+                version_id=str(v.version_id),
+                version=v.version,
+                effective_from=as_utc(v.effective_from),
+                effective_to=as_utc(v.effective_to) if v.effective_to is not None else None,
+                bundle_hash=v.bundle_hash,
+                bundle_json=v.bundle_json,
+            )
+            for v in versions
+        ),
+        key=lambda v: v.effective_from,
+    )
+    return CachedRuleset(
+        ruleset_id=str(ruleset.ruleset_id),
+        jurisdiction=ruleset.jurisdiction,
+        tax_type=ruleset.tax_type,
+        versions=tuple(cached),
+        starts=tuple(v.effective_from for v in cached),
+        shadow_hash=ruleset.shadow_bundle_hash,
+        shadow_bundle=ruleset.shadow_bundle_json,
+    )
+
+
+class RulesetCache:
+    """(tenant_id, jurisdiction, tax_type) -> CachedRuleset | None, loaded on miss."""
+
+    def __init__(self, maxsize: int, ttl: float | None):
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl)
+        # Bumped on every invalidation; loads that raced with one are not stored
+        self.generation = 0
+        # (tenant_id, jurisdiction, tax_type) -> future of the load in progress
+        self._loading: dict[tuple[str, str, str], asyncio.Future] = {}
+        self.joined = 0
+
+    def peek(
+        self, tenant_id: str, jurisdiction: str, tax_type: str
+    ) -> tuple[bool, CachedRuleset | None]:
+        """(cached, ruleset) without touching the database."""
+        entry = self._entries.get((tenant_id, jurisdiction, tax_type), _NOT_CACHED)
+        if entry is _NOT_CACHED:
+            return False, None
+        return True, entry
+
+    def put(
+        self,
+        tenant_id: str,
+        jurisdiction: str,
+        tax_type: str,
+        entry: CachedRuleset | None,
+        generation: int,
+    ) -> None:
+        """
+        Store a loaded entry. `generation` is the value read before the load started;
+        if an invalidation happened since, the (possibly stale) entry is not stored.
+        """
+        if generation == self.generation:
+            self._entries.set((tenant_id, jurisdiction, tax_type), entry)
+
+    async def get(
+        self, db: AsyncSession, tenant_id: str, jurisdiction: str, tax_type: str
+    ) -> CachedRuleset | None:
+        """Cached ruleset for one pair (None if the tenant has no such ruleset)."""
+        pair = (jurisdiction, tax_type)
+        return (await self.get_many(db, tenant_id, [pair]))[pair]
+
+    async def get_many(
+        self, db: AsyncSession, tenant_id: str, pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], CachedRuleset | None]:
+        """Cached rulesets for several pairs; all misses are loaded with one query."""
+        found: dict[tuple[str, str], CachedRuleset | None] = {}
+        missing = []
+        for pair in pairs:
+            cached, entry = self.peek(tenant_id, *pair)
+            if cached:
+                found[pair] = entry
+            else:
+                missing.append(pair)
+        if missing:
+            found.update(await self._load(db, tenant_id, missing))
+        return found
+
+    async def refresh(
+        self, db: AsyncSession, tenant_id: str, pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], CachedRuleset | None]:
+        """Reload entries whether cached or not (one query; joins loads already in progress)."""
+        return await self._load(db, tenant_id, pairs)
+
+    async def _load(
+        self, db: AsyncSession, tenant_id: str, pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], CachedRuleset | None]:
+        """
+        Load and store entries with one query. Pairs another task is already loading are
+        awaited instead of queried again, so a burst of misses costs one query per entry.
+        """
+        found: dict[tuple[str, str], CachedRuleset | None] = {}
+        joining = {p: self._loading[(tenant_id, *p)] for p in pairs if (tenant_id, *p) in self._loading}
+        todo = [p for p in pairs if p not in joining]
+        if todo:
+            loop = asyncio.get_running_loop()
+            futures = {p: loop.create_future() for p in todo}
+            for pair, fut in futures.items():
+                # Retrieve a failure even when nobody joined, so it is not logged as lost
+                fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+                self._loading[(tenant_id, *pair)] = fut
+            try:
+                generation = self.generation
+                loaded = await load_rulesets_with_versions(db, tenant_id, todo)
+                for pair in todo:
+                    entry = snapshot(*loaded[pair]) if pair in loaded else None
+                    self.put(tenant_id, *pair, entry, generation)
+                    found[pair] = entry
+                    futures[pair].set_result(entry)
+            except BaseException as e:
+                for fut in futures.values():
+                    if fut.done():
+                        continue
+                    if isinstance(e, Exception):
+                        fut.set_exception(e)
+                    else:
+                        fut.cancel()
+                raise
+            finally:
+                for pair, fut in futures.items():
+                    if self._loading.get((tenant_id, *pair)) is fut:
+                        del self._loading[(tenant_id, *pair)]
+        for pair, fut in joining.items():
+            self.joined += 1
+            found[pair] = await asyncio.shield(fut)
+        return found
+
+    def invalidate(self, tenant_id: str, jurisdiction: str, tax_type: str) -> None:
+        """Drop one entry (call after publishing or creating a ruleset)."""
+        self.generation += 1
+        self._entries.pop((tenant_id, jurisdiction, tax_type))
+        # A load already in progress may predate the write; later misses must not join it
+        self._loading.pop((tenant_id, jurisdiction, tax_type), None)
+
+    def set_ttl(self, ttl: float | None) -> None:
+        """TTL for entries stored from now on (existing entries keep theirs)."""
+        self._entries.ttl = ttl
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self._loading.clear()
+
+    def stats(self) -> dict:
+        return {**self._entries.stats(), "joined": self.joined}
+
+
+ruleset_cache = RulesetCache(
+    maxsize=settings.ruleset_cache_size,
+    ttl=settings.ruleset_cache_ttl_seconds,
+)
@@ -34,7 +34,11 @@ def request_hash(obj: Any) -> str:
     return hashlib.sha256(canonical_json(obj).encode()).hexdigest()
 
 
-def bundle_hash(bundle: list[dict]) -> str:
-    """Compute SHA256 hash of canonical bundle JSON."""
+def bundle_hash(bundle: list[dict], tables: dict | None = None) -> str:
+    """
+    Compute SHA256 hash of canonical bundle JSON. Rate tables are hashed together with
+    the rules; bundles without tables hash exactly as before.
+    """
     import hashlib
-    return hashlib.sha256(canonical_json(bundle).encode()).hexdigest()
+    payload = {"rules": bundle, "tables": tables} if tables else bundle
+    return hashlib.sha256(canonical_json(payload).encode()).hexdigest()
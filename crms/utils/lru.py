@@ -0,0 +1,100 @@
+"""Small thread-safe LRU cache with optional TTL, byte budget and hit/miss counters."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+_NOT_FOUND = object()
+
+
+class LRUCache:
+    """
+    Bounded LRU mapping. Entries may carry a TTL (seconds); expired entries
+    are treated as misses and dropped on access. With maxbytes, entries also
+    carry a caller-estimated size and the total is kept under the budget.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None, maxbytes: int | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self._data: OrderedDict[Hashable, tuple[Any, float | None, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value (and mark it recently used), or default on miss/expiry."""
+        with self._lock:
+            item = self._data.get(key, _NOT_FOUND)
+            if item is _NOT_FOUND:
+                self.misses += 1
+                return default
+            value, expires_at, size = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.bytes -= size
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None, size: int = 0) -> None:
+        """Insert or replace an entry; ttl overrides the cache default, size counts toward maxbytes."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            old = self._data.get(key)
+            if old is not None:
+                self.bytes -= old[2]
+            self._data[key] = (value, expires_at, size)
+            self._data.move_to_end(key)
+            self.bytes += size
+            while len(self._data) > self.maxsize or (
+                self.maxbytes is not None and self.bytes > self.maxbytes and self._data
+            ):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        """Remove an entry; returns its value or None."""
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item:
+                self.bytes -= item[2]
+        return item[0] if item else None
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            item = self._data.get(key)
+        return item is not None and (item[1] is None or item[1] > time.monotonic())
+
+    def stats(self) -> dict:
+        """Size and hit/miss counters for /metrics."""
+        total = self.hits + self.misses
+        stats = {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+        if self.maxbytes is not None:
+            stats["bytes"] = self.bytes
+            stats["maxbytes"] = self.maxbytes
+        return stats
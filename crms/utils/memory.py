@@ -0,0 +1,31 @@
+"""Resident memory of the current process, split into shared and private pages (Linux)."""
+
+_FIELDS = {
+    "Rss": "rss_bytes",
+    "Pss": "pss_bytes",
+    "Shared_Clean": "shared_clean_bytes",
+    "Shared_Dirty": "shared_dirty_bytes",
+    "Private_Clean": "private_clean_bytes",
+    "Private_Dirty": "private_dirty_bytes",
+}
+
+
+def memory_stats() -> dict:
+    """
+    Totals from /proc/self/smaps_rollup; empty where it is not available. Pss charges each
+    shared page to its sharers equally, so it is the fair per-worker figure under prefork.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return {}
+    stats = {}
+    for line in lines:
+        name, _, rest = line.partition(":")
+        if name in _FIELDS:
+            stats[_FIELDS[name]] = int(rest.split()[0]) * 1024
+    if stats:
+        stats["private_bytes"] = stats.pop("private_clean_bytes", 0) + stats.pop("private_dirty_bytes", 0)
+        stats["shared_bytes"] = stats.pop("shared_clean_bytes", 0) + stats.pop("shared_dirty_bytes", 0)
+    return stats
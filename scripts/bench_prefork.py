@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: worker startup time and memory, preforked (crms.prefork) vs fresh interpreters
+(what `uvicorn --workers` starts). Runs in-memory on bundles derived from the compliance
+rulesets; no database required.
+
+    python scripts/bench_prefork.py [--workers 4] [--bundles 200] [--copies 8]
+
+"spawn" workers each import crms and compile every bundle; "prefork" workers are forked
+from a master that compiled them once and froze its heap. Either way, every worker then
+evaluates one transaction per bundle (as serving would) before memory is read, with all
+workers alive so Pss splits shared pages fairly.
+"""
+
+import argparse
+import copy
+import gc
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.engine.compiler import get_compiled_bundle
+from crms.engine.evaluator import evaluate_compiled
+from crms.engine.specialize import get_routed_bundle
+from crms.utils.canonical import bundle_hash
+from crms.utils.memory import memory_stats
+
+TRANSACTION = {
+    "amount": 100.0, "buyer": {"type": "CONSUMER", "country": "DE"},
+    "product": {"category": "SAAS"}, "fulfillment": {"ship_to_region": "CA"},
+}
+
+
+def make_bundles(count: int, copies: int) -> list[tuple[str, str, str, dict]]:
+    """(jurisdiction, tax_type, hash, bundle_json): distinct bundles of `copies` x a ruleset's rules."""
+    out = []
+    for i in range(count):
+        rs = COMPLIANCE_RULESETS[i % len(COMPLIANCE_RULESETS)]
+        rules = []
+        for k in range(copies):
+            for rule in copy.deepcopy(rs["rules"]):
+                rule["rule_id"] = f"{rule['rule_id']}-{i}-{k}"
+                rule["priority"] = rule.get("priority", 0) * copies + k
+                rules.append(rule)
+        out.append((rs["jurisdiction"], rs["tax_type"], bundle_hash(rules), {"rules": rules}))
+    return out
+
+
+def compile_all(bundles) -> None:
+    for jurisdiction, tax_type, h, bundle_json in bundles:
+        get_compiled_bundle(h, bundle_json)
+        get_routed_bundle(h, bundle_json, jurisdiction, tax_type)
+
+
+def serve(bundles) -> None:
+    for jurisdiction, tax_type, h, bundle_json in bundles:
+        trans = {**TRANSACTION, "jurisdiction": jurisdiction, "tax_type": tax_type}
+        evaluate_compiled({"transaction": trans}, get_routed_bundle(h, bundle_json, jurisdiction, tax_type), 100.0)
+
+
+def worker(bundles, started: float, preloaded: bool, barrier, reports, done) -> None:
+    if preloaded:
+        gc.enable()
+    else:
+        compile_all(bundles)
+    ready = time.time() - started
+    serve(bundles)
+    barrier.wait()
+    reports.put({"pid": os.getpid(), "ready_seconds": ready, **memory_stats()})
+    done.wait()
+
+
+def run(mode: str, bundles, workers: int) -> list[dict]:
+    ctx = multiprocessing.get_context("fork" if mode == "prefork" else "spawn")
+    started = time.time()
+    if mode == "prefork":
+        gc.disable()
+        compile_all(bundles)
+        gc.collect()
+        gc.freeze()
+    barrier, reports, done = ctx.Barrier(workers), ctx.SimpleQueue(), ctx.Event()
+    procs = [
+        ctx.Process(target=worker, args=(bundles, started, mode == "prefork", barrier, reports, done))
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    out = [reports.get() for _ in procs]
+    done.set()
+    for p in procs:
+        p.join()
+    if mode == "prefork":
+        gc.unfreeze()
+        gc.enable()
+    return out
+
+
+def mib(n: float) -> str:
+    return f"{n / 2**20:8.1f}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--bundles", type=int, default=200, help="distinct bundles (at most the compiled cache size)")
+    parser.add_argument("--copies", type=int, default=8, help="copies of a ruleset's rules per bundle")
+    args = parser.parse_args()
+    bundles = make_bundles(args.bundles, args.copies)
+    rules = sum(len(b["rules"]) for _, _, _, b in bundles)
+    print(f"{args.workers} workers, {len(bundles)} bundles, {rules} rules")
+    print(f"{'mode':<8} {'ready s (max)':>14} {'rss MiB':>8} {'pss MiB':>8} {'private MiB':>11} {'shared MiB':>10}")
+    # spawn first: prefork compiles in this process, which spawn workers would not inherit anyway
+    for mode in ("spawn", "prefork"):
+        reports = run(mode, bundles, args.workers)
+        avg = {k: sum(r.get(k, 0) for r in reports) / len(reports) for k in ("rss_bytes", "pss_bytes", "private_bytes", "shared_bytes")}
+        ready = max(r["ready_seconds"] for r in reports)
+        print(
+            f"{mode:<8} {ready:>14.2f} {mib(avg['rss_bytes'])} {mib(avg['pss_bytes'])}"
+            f" {mib(avg['private_bytes']):>11} {mib(avg['shared_bytes']):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: response building + JSON encoding for POST /v1/evaluations (requests/sec).
+
+Compares the previous path (nested Pydantic response models, model_dump() for the audit
+row, then FastAPI's response_model round trip: dump -> validate -> dump -> json.dumps)
+with the current one (one dict reused for output_json and the body, encoded by orjson).
+Engine output is computed once per payload, so only serialization is timed.
+
+    python scripts/bench_serialization.py [--iterations 5000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import UTC, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.api.evaluations import _engine_bodies, _response_body
+from crms.api.responses import dumps
+from crms.engine.evaluator import evaluate_rules
+from crms.schemas.evaluation import (
+    EvaluationExplanation,
+    EvaluationRequest,
+    EvaluationResponse,
+    EvaluationResult,
+    FiredRule,
+    RateComponent,
+    RiskFlag,
+    RulesetInfo,
+    VersionInfo,
+)
+from crms.storage.ruleset_cache import CachedVersion
+
+TRANSACTION = {
+    "jurisdiction": "US-CA",
+    "tax_type": "SALES",
+    "amount": 100,
+    "product": {"category": "SAAS"},
+    "buyer": {"type": "CONSUMER"},
+    "evidence": {"resolved_country": "US", "resolved_region": "CA", "resolved_confidence": 0.9},
+}
+
+
+def previous_path(body, version, result, fired, trace_out) -> bytes:
+    """Response building as it was before: models, audit model_dump, response_model round trip."""
+    trans = body.transaction
+    result_obj = EvaluationResult(
+        taxable=result["taxable"],
+        rate=result["rate"],
+        tax_amount=result["tax_amount"],
+        obligations=result["obligations"],
+        rate_components=[RateComponent(**rc) for rc in result.get("rate_components", [])],
+        risk_flags=[RiskFlag(**rf) for rf in result.get("risk_flags", [])],
+        matched_rule_id=fired[0].rule_id if fired else None,
+    )
+    explanation = EvaluationExplanation(
+        fired_rules=[FiredRule(rule_id=r.rule_id, name=r.name, because=r.because) for r in fired],
+        trace=trace_out,
+    )
+    output_json = {  # audit row
+        "evaluation_id": "e",
+        "ruleset": {"jurisdiction": trans.jurisdiction, "tax_type": trans.tax_type},
+        "version": {"version": version.version, "bundle_hash": version.bundle_hash},
+        "result": result_obj.model_dump(),
+        "explanation": explanation.model_dump(),
+    }
+    response = EvaluationResponse(
+        evaluation_id="e",
+        ruleset=RulesetInfo(jurisdiction=trans.jurisdiction, tax_type=trans.tax_type),
+        version=VersionInfo(version=version.version, bundle_hash=version.bundle_hash),
+        result=result_obj,
+        explanation=explanation,
+    )
+    # FastAPI response_model handling: dump the returned model, validate, serialize
+    validated = EvaluationResponse.model_validate(response.model_dump())
+    content = validated.model_dump(mode="json")
+    assert output_json
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def current_path(body, version, result, fired, trace_out) -> bytes:
+    result_body, explanation = _engine_bodies(result, fired, trace_out)
+    out = _response_body("e", body, version, result_body, explanation)  # also the audit row
+    return dumps(out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    rules = next(r for r in COMPLIANCE_RULESETS if r["jurisdiction"] == "US-CA")["rules"]
+    version = CachedVersion(
+        version_id="v", version="1.0.0", effective_from=datetime(2025, 1, 1, tzinfo=UTC),
+        effective_to=None, bundle_hash="h", bundle_json={"rules": rules},
+    )
+    for explain in ("none", "full"):
+        body = EvaluationRequest.model_validate({
+            "effective_at": "2026-02-20T00:00:00Z",
+            "transaction": TRANSACTION,
+            "options": {"explain": explain},
+        })
+        engine_out = evaluate_rules(
+            {"transaction": body.transaction.model_dump()}, rules, body.transaction.amount,
+            trace=explain == "full",
+        )
+        old_bytes = previous_path(body, version, *engine_out)
+        new_bytes = current_path(body, version, *engine_out)
+        assert json.loads(old_bytes) == json.loads(new_bytes), "payloads differ"
+
+        print(f"explain={explain} ({len(new_bytes):,} bytes)")
+        for name, fn in (("previous", previous_path), ("current ", current_path)):
+            t0 = time.perf_counter()
+            for _ in range(args.iterations):
+                fn(body, version, *engine_out)
+            elapsed = time.perf_counter() - t0
+            print(f"  {name} {args.iterations / elapsed:>10,.0f} req/s  ({elapsed * 1e6 / args.iterations:,.1f} us/req)")
+
+
+if __name__ == "__main__":
+    main()
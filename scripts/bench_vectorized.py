@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: vectorized batch evaluation vs the scalar evaluators (rows/sec).
+Runs in-memory against the compliance rulesets; no database required.
+
+    python scripts/bench_vectorized.py [--rows 200000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.engine.compiler import compile_bundle
+from crms.engine.evaluator import evaluate_compiled, evaluate_rules
+from crms.engine.vectorized import evaluate_batch
+
+# Field values drawn per transaction (None = field omitted)
+FIELDS = {
+    "buyer.type": ["CONSUMER", "BUSINESS", None],
+    "buyer.vat_id": ["DE123", None],
+    "buyer.vat_id_confidence": [0.5, 0.95, None],
+    "product.category": ["SAAS", "DIGITAL_GOODS", "PHYSICAL_GOODS", "SERVICES", "OTHER"],
+    "evidence.resolved_country": ["US", "DE", "FR", "CA", None],
+    "evidence.resolved_region": ["CA", "ON", None],
+    "evidence.resolved_confidence": [0.5, 0.9, None],
+    "evidence.locality_code": ["LA_CITY", "SF_CITY", None],
+    "marketplace.is_facilitated": [True, False, None],
+    "fulfillment.ship_to_region": ["CA", "ON", None],
+    "doc.resale_cert_valid": [True, False, None],
+    "event.type": ["SALE", "SALE", "SALE", "REFUND"],
+}
+
+
+def make_transactions(n: int, jurisdiction: str, tax_type: str, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        trans: dict = {"jurisdiction": jurisdiction, "tax_type": tax_type, "amount": round(rng.uniform(1, 5000), 2)}
+        for path, values in FIELDS.items():
+            val = rng.choice(values)
+            if val is None:
+                continue
+            head, leaf = path.split(".")
+            trans.setdefault(head, {})[leaf] = val
+        out.append({"transaction": trans})
+    return out
+
+
+def rate(rows: int, seconds: float) -> str:
+    return f"{rows / seconds:>12,.0f} rows/s  ({seconds:.3f}s)"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--scalar-rows", type=int, default=20_000, help="rows for the (slow) scalar baselines")
+    args = parser.parse_args()
+
+    for rs in COMPLIANCE_RULESETS:
+        rules = rs["rules"]
+        bundle = compile_bundle({"rules": rules})
+        contexts = make_transactions(args.rows, rs["jurisdiction"], rs["tax_type"])
+        amounts = [c["transaction"]["amount"] for c in contexts]
+        sample = contexts[: args.scalar_rows]
+
+        t0 = time.perf_counter()
+        for ctx in sample:
+            evaluate_rules(ctx, rules, ctx["transaction"]["amount"])
+        t_interp = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for ctx in sample:
+            evaluate_compiled(ctx, bundle, ctx["transaction"]["amount"])
+        t_compiled = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        batch = evaluate_batch(contexts, bundle, amounts)
+        t_vec = time.perf_counter() - t0
+
+        # Spot-check equality on the scalar sample
+        ids = batch.rule_ids()
+        for i, ctx in enumerate(sample[:2000]):
+            _, fired, _ = evaluate_rules(ctx, rules, amounts[i])
+            assert ids[i] == (fired[0].rule_id if fired else None)
+
+        print(f"{rs['jurisdiction']}/{rs['tax_type']} ({len(rules)} rules)")
+        print(f"  evaluate_rules    {rate(len(sample), t_interp)}")
+        print(f"  evaluate_compiled {rate(len(sample), t_compiled)}")
+        print(f"  evaluate_batch    {rate(len(contexts), t_vec)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,115 @@
 """Pytest fixtures."""
 
+import asyncio
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
 import pytest
 
+from crms.api import evaluations
+from crms.auth.tenant_cache import tenant_cache
+from crms.storage import ruleset_cache as ruleset_cache_module
+from crms.storage.repositories import RequestContext
+from crms.storage.ruleset_cache import ruleset_cache
+from crms.utils.canonical import bundle_hash
+
 # Unit tests (evaluator, canonical) don't need DB.
 # Integration/API tests require Postgres - run with: docker-compose up -d postgres && pytest
+
+
+def make_ruleset(
+    jurisdiction: str, tax_type: str, ruleset_id: str | None = None, shadow_rules: list[dict] | None = None
+) -> SimpleNamespace:
+    """Stand-in for a Ruleset row."""
+    return SimpleNamespace(
+        ruleset_id=ruleset_id or f"rs-{jurisdiction}-{tax_type}",
+        tenant_id=None,
+        jurisdiction=jurisdiction,
+        tax_type=tax_type,
+        shadow_bundle_hash=bundle_hash(shadow_rules) if shadow_rules else None,
+        shadow_bundle_json={"rules": shadow_rules} if shadow_rules else None,
+    )
+
+
+def make_version(
+    version: str = "1.0.0",
+    rules: list[dict] | None = None,
+    effective_from: datetime = datetime(2026, 1, 1, tzinfo=UTC),
+    effective_to: datetime | None = None,
+    version_id: str | None = None,
+    hash_: str | None = None,
+) -> SimpleNamespace:
+    """Stand-in for a RulesetVersion row (bundle hash from the rules unless given)."""
+    rules = rules or []
+    return SimpleNamespace(
+        version_id=version_id or f"v-{version}",
+        version=version,
+        effective_from=effective_from,
+        effective_to=effective_to,
+        bundle_hash=hash_ or bundle_hash(rules),
+        bundle_json={"rules": rules},
+    )
+
+
+class FakeStore:
+    """
+    In-memory stand-in for the tables the evaluation paths read and write: tenants by API
+    key hash, rulesets with their versions, and audit rows by idempotency key.
+    """
+
+    def __init__(self):
+        self.tenants: dict[str, SimpleNamespace] = {}
+        self.rulesets: dict[tuple[str, str], tuple[SimpleNamespace, list[SimpleNamespace]]] = {}
+        self.rows: list[dict] = []
+        self.stored: dict[str, SimpleNamespace] = {}
+        self.loads: list[tuple[str, list[tuple[str, str]]]] = []  # load_rulesets_with_versions calls
+        self.contexts: list[tuple[str, bool, str | None]] = []  # load_request_context calls
+        self.gate: asyncio.Event | None = None  # when set, ruleset loads wait for it
+
+    def add_tenant(self, api_key_hash: str, tenant_id: str) -> SimpleNamespace:
+        tenant = SimpleNamespace(tenant_id=tenant_id, name="Demo")
+        self.tenants[api_key_hash] = tenant
+        return tenant
+
+    def add_ruleset(self, ruleset: SimpleNamespace, versions: list[SimpleNamespace]) -> None:
+        self.rulesets[(ruleset.jurisdiction, ruleset.tax_type)] = (ruleset, list(versions))
+
+    async def load_rulesets_with_versions(self, db, tenant_id, pairs):
+        self.loads.append((tenant_id, sorted(pairs)))
+        if self.gate is not None:
+            await self.gate.wait()
+        return {pair: self.rulesets[pair] for pair in pairs if pair in self.rulesets}
+
+    async def load_request_context(self, db, api_key_hash, jurisdiction, tax_type, *, include_ruleset, idempotency_key):
+        self.contexts.append((api_key_hash, include_ruleset, idempotency_key))
+        tenant = self.tenants.get(api_key_hash)
+        if tenant is None:
+            return RequestContext()
+        ctx = RequestContext(tenant=tenant, existing=self.stored.get(idempotency_key) if idempotency_key else None)
+        if include_ruleset and (jurisdiction, tax_type) in self.rulesets:
+            ctx.ruleset, ctx.versions = self.rulesets[(jurisdiction, tax_type)]
+        return ctx
+
+    async def get_evaluations_by_idempotency_keys(self, db, tenant_id, keys):
+        return {k: self.stored[k] for k in keys if k in self.stored}
+
+    async def persist(self, db, rows):
+        self.rows.extend(rows)
+        for row in rows:
+            if row["idempotency_key"]:
+                self.stored[row["idempotency_key"]] = SimpleNamespace(**row)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """A FakeStore behind the ruleset cache loader and the evaluation endpoints' queries/audit writes."""
+    fake = FakeStore()
+    monkeypatch.setattr(ruleset_cache_module, "load_rulesets_with_versions", fake.load_rulesets_with_versions)
+    monkeypatch.setattr(evaluations, "load_request_context", fake.load_request_context)
+    monkeypatch.setattr(evaluations, "get_evaluations_by_idempotency_keys", fake.get_evaluations_by_idempotency_keys)
+    monkeypatch.setattr(evaluations, "_persist", fake.persist)
+    tenant_cache.clear()
+    ruleset_cache.clear()
+    yield fake
+    tenant_cache.clear()
+    ruleset_cache.clear()
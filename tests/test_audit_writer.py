@@ -0,0 +1,80 @@
+"""Unit tests for the write-behind audit writer (fake session, no database)."""
+
+import orjson
+
+from crms.storage.audit_writer import AuditWriter
+
+
+class _FakeSession:
+    def __init__(self, batches: list[list[dict]], reject=lambda rows: False):
+        self.batches = batches
+        self.reject = reject
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, rows):
+        if self.reject(rows):
+            raise RuntimeError("insert failed")
+        self.batches.append(list(rows))
+
+    async def commit(self):
+        pass
+
+
+def _writer(batches, reject=lambda rows: False, **kwargs) -> AuditWriter:
+    opts = {"max_queue": 100, "batch_size": 3, "flush_interval": 0.01, **kwargs}
+    return AuditWriter(lambda: _FakeSession(batches, reject), **opts)
+
+
+async def test_rows_are_batched_and_drained_on_stop():
+    batches: list[list[dict]] = []
+    writer = _writer(batches)
+    assert not writer.submit({"n": -1})  # not started: caller writes inline
+    writer.start()
+    for n in range(7):
+        assert writer.submit({"n": n})
+    await writer.stop()
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert [r["n"] for b in batches for r in b] == list(range(7))
+    assert writer.stats()["written"] == 7
+    assert not writer.submit({"n": 8})
+
+
+async def test_full_queue_rejects_instead_of_blocking():
+    batches: list[list[dict]] = []
+    writer = _writer(batches, max_queue=2)
+    writer.start()
+    accepted = [writer.submit({"n": n}) for n in range(4)]
+    assert accepted == [True, True, False, False]
+    await writer.stop()
+    assert writer.stats()["rejected"] == 2
+    assert sum(len(b) for b in batches) == 2
+
+
+async def test_a_batch_that_fails_transiently_is_retried():
+    batches: list[list[dict]] = []
+    attempts = []
+    writer = _writer(batches, reject=lambda rows: attempts.append(rows) or len(attempts) < 3, retries=3)
+    await writer._write([{"n": 0}, {"n": 1}])
+    assert batches == [[{"n": 0}, {"n": 1}]]
+    assert writer.stats()["retried"] == 2 and writer.stats()["written"] == 2
+
+
+async def test_rows_the_database_rejects_are_spilled_not_dropped(tmp_path):
+    batches: list[list[dict]] = []
+    spill = tmp_path / "spill.ndjson"
+    bad = {"evaluation_id": "e1", "n": 1}
+    writer = _writer(batches, reject=lambda rows: bad in rows, retries=1, spill_path=str(spill))
+    await writer._write([{"evaluation_id": "e0", "n": 0}, bad, {"evaluation_id": "e2", "n": 2}])
+    assert [r["n"] for b in batches for r in b] == [0, 2]  # the rest go in row by row
+    assert [orjson.loads(line) for line in spill.read_bytes().splitlines()] == [bad]
+    stats = writer.stats()
+    assert (stats["written"], stats["spilled"], stats["failed"]) == (2, 1, 0)
+
+    writer.spill_path = None
+    await writer._write([bad])
+    assert writer.stats()["failed"] == 1
@@ -0,0 +1,105 @@
+"""Unit tests for batch evaluation (queries and audit writes replaced, no database)."""
+
+import copy
+import os
+import sys
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.api import evaluations
+from crms.schemas.evaluation import BatchEvaluationRequest, EvaluationRequest
+from tests.conftest import make_ruleset, make_version
+
+RULES = {(r["jurisdiction"], r["tax_type"]): r["rules"] for r in COMPLIANCE_RULESETS}
+US_CA_V2 = copy.deepcopy(RULES[("US-CA", "SALES")])
+for _rule in US_CA_V2:
+    if _rule["then"].get("set", {}).get("rate"):
+        _rule["then"]["set"]["rate"] = round(_rule["then"]["set"]["rate"] + 0.01, 4)
+CUTOVER = datetime(2026, 3, 1, tzinfo=UTC)
+
+US_CA = {"jurisdiction": "US-CA", "tax_type": "SALES", "amount": 100, "buyer": {"type": "CONSUMER"},
+         "product": {"category": "PHYSICAL_GOODS"}, "fulfillment": {"ship_to_region": "CA"}}
+EU = {"jurisdiction": "EU", "tax_type": "VAT", "amount": 100, "product": {"category": "SAAS"},
+      "buyer": {"type": "BUSINESS", "country": "DE", "vat_id": "DE123", "vat_id_confidence": 0.95}}
+
+
+@pytest.fixture
+def rulesets(store):
+    store.add_ruleset(make_ruleset("US-CA", "SALES"), [
+        make_version("1.0.0", RULES[("US-CA", "SALES")], effective_to=CUTOVER, version_id="v-US-CA-1.0.0"),
+        make_version("1.0.1", US_CA_V2, effective_from=CUTOVER, version_id="v-US-CA-1.0.1"),
+    ])
+    store.add_ruleset(make_ruleset("EU", "VAT"), [make_version("1.0.0", RULES[("EU", "VAT")], version_id="v-EU-1.0.0")])
+    return store
+
+
+def _item(trans: dict, effective_at: str = "2026-02-20T00:00:00Z", key: str | None = None) -> dict:
+    return {"idempotency_key": key, "effective_at": effective_at, "transaction": trans}
+
+
+async def _batch(items: list[dict]) -> list[dict]:
+    body = BatchEvaluationRequest.model_validate({"items": items})
+    out = await evaluations.evaluate_batch(body, SimpleNamespace(tenant_id="t-batch"), None)
+    return orjson.loads(out.body)["results"]
+
+
+async def test_items_are_grouped_by_ruleset_and_version(rulesets):
+    results = await _batch([
+        _item(US_CA), _item(EU), _item(US_CA, "2026-04-01T00:00:00Z"), _item(US_CA),
+    ])
+    assert rulesets.loads == [("t-batch", [("EU", "VAT"), ("US-CA", "SALES")])]  # one query for the batch
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert [r["response"]["version"]["version"] for r in results] == ["1.0.0", "1.0.0", "1.0.1", "1.0.0"]
+    # Audit rows come out group by group
+    assert [(row["ruleset_id"], row["version_id"]) for row in rulesets.rows] == [
+        ("rs-US-CA-SALES", "v-US-CA-1.0.0"), ("rs-US-CA-SALES", "v-US-CA-1.0.0"),
+        ("rs-EU-VAT", "v-EU-1.0.0"), ("rs-US-CA-SALES", "v-US-CA-1.0.1"),
+    ]
+    # Each response is what POST /v1/evaluations gives for the item
+    single = EvaluationRequest.model_validate(_item(US_CA))
+    ruleset, versions = rulesets.rulesets[("US-CA", "SALES")]
+    _, result, _ = evaluations._run_engine(single, ruleset, versions[0])
+    assert results[0]["response"]["result"] == orjson.loads(orjson.dumps(result))
+
+
+async def test_unknown_rulesets_and_versions_are_per_item_404s(rulesets):
+    results = await _batch([
+        _item({**US_CA, "jurisdiction": "XX"}), _item(US_CA, "2025-01-01T00:00:00Z"), _item(US_CA),
+    ])
+    assert [r["error"] and r["error"]["detail"] for r in results] == [
+        evaluations.RULESET_NOT_FOUND, evaluations.VERSION_NOT_FOUND, None,
+    ]
+    assert results[0]["error"]["status_code"] == results[1]["error"]["status_code"] == 404
+    assert len(rulesets.rows) == 1
+
+
+async def test_repeated_and_replayed_idempotency_keys(rulesets):
+    first = await _batch([_item(US_CA, key="k1"), _item(EU, key="k1"), _item(EU, key="k2")])
+    assert first[1]["response"] == first[0]["response"] and first[1]["index"] == 1  # first occurrence wins
+    assert [row["idempotency_key"] for row in rulesets.rows] == ["k1", "k2"]
+
+    again = await _batch([_item(EU, key="k2"), _item(US_CA, key="k3")])
+    assert again[0]["response"] == first[2]["response"]  # stored result, not re-evaluated
+    assert [row["idempotency_key"] for row in rulesets.rows] == ["k1", "k2", "k3"]
+
+
+async def test_an_item_the_engine_rejects_does_not_fail_the_batch(rulesets):
+    bad = {**EU, "buyer": {**EU["buyer"], "vat_id_confidence": "high"}}
+    results = await _batch([_item(US_CA), _item(bad, key="bad"), _item(EU)])
+    assert results[1]["error"]["status_code"] == 422
+    assert results[1]["idempotency_key"] == "bad" and results[1]["response"] is None
+    assert results[0]["response"] and results[2]["response"]
+    assert "bad" not in rulesets.stored and len(rulesets.rows) == 2
+
+
+async def test_a_key_stored_by_another_request_type_is_a_per_item_409(rulesets):
+    rulesets.stored["inv-1"] = SimpleNamespace(input_json={}, output_json={"evaluation_id": "e", "lines": [], "totals": {}})
+    results = await _batch([_item(US_CA, key="inv-1"), _item(US_CA, key="k1")])
+    assert results[0]["error"] == {"status_code": 409, "detail": evaluations.IDEMPOTENCY_KEY_CONFLICT}
+    assert results[1]["response"] and [row["idempotency_key"] for row in rulesets.rows] == ["k1"]
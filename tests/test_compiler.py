@@ -0,0 +1,160 @@
+"""Unit tests for the bundle compiler (compiled evaluation must match evaluate_rules)."""
+
+import itertools
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.engine.compiler import compile_bundle, get_compiled_bundle
+from crms.engine.evaluator import evaluate_compiled, evaluate_rules
+
+ALL_RULESETS = [(r["jurisdiction"], r["tax_type"], r["rules"]) for r in COMPLIANCE_RULESETS]
+
+_CHOICES = {
+    "jurisdiction": ["US-CA", "EU", "CA-ON", "US-TX"],
+    "tax_type": ["SALES", "VAT", "HST"],
+    "buyer.type": ["CONSUMER", "BUSINESS", None],
+    "buyer.vat_id": ["DE123", "", None],
+    "buyer.vat_id_confidence": [0.5, 0.95, None],
+    "product.category": ["SAAS", "DIGITAL_GOODS", "PHYSICAL_GOODS", "SERVICES", "TANGIBLE", "OTHER", None],
+    "evidence.resolved_country": ["US", "DE", "FR", "CA", None],
+    "evidence.resolved_region": ["CA", "ON", "NY", None],
+    "evidence.resolved_confidence": [0.3, 0.8, 0.99, None],
+    "evidence.billing_country": ["US", "DE", None],
+    "evidence.ip_country": ["US", "CA", None],
+    "evidence.locality_code": ["LA_CITY", "SF_CITY", "OTHER", None],
+    "marketplace.is_facilitated": [True, False, None],
+    "fulfillment.ship_to_region": ["CA", "ON", "NY", None],
+    "metrics.ca_revenue_t12m": [0, 600000, None],
+    "metrics.eu_b2c_revenue_t12m": [0, 20000, None],
+    "doc.resale_cert_valid": [True, False, None],
+    "event.type": ["SALE", "REFUND", "CHARGEBACK", None],
+}
+
+
+def _random_transaction(rng: random.Random) -> dict:
+    trans: dict = {"currency": "USD", "amount": rng.choice([0, 10, 99.99, 100, 2500])}
+    for path, values in _CHOICES.items():
+        val = rng.choice(values)
+        if val is None:
+            continue
+        parts = path.split(".")
+        cur = trans
+        for p in parts[:-1]:
+            cur = cur.setdefault(p, {})
+        cur[parts[-1]] = val
+    return trans
+
+
+def _corpus(n: int = 400) -> list[dict]:
+    rng = random.Random(1234)
+    return [{"transaction": _random_transaction(rng)} for _ in range(n)]
+
+
+def _assert_same(a, b):
+    res_a, fired_a, _ = a
+    res_b, fired_b, _ = b
+    assert [f.rule_id for f in fired_a] == [f.rule_id for f in fired_b]
+    assert res_a["taxable"] == res_b["taxable"]
+    assert res_a["rate"] == res_b["rate"]
+    assert res_a["tax_amount"] == res_b["tax_amount"]
+    assert res_a["rate_components"] == res_b["rate_components"]
+    assert res_a["risk_flags"] == res_b["risk_flags"]
+    assert [o.model_dump() for o in res_a["obligations"]] == [o.model_dump() for o in res_b["obligations"]]
+
+
+@pytest.mark.parametrize("jurisdiction,tax_type,rules", ALL_RULESETS, ids=[r[0] for r in ALL_RULESETS])
+def test_compiled_matches_interpreter(jurisdiction, tax_type, rules):
+    bundle = compile_bundle({"rules": rules})
+    for ctx in _corpus():
+        amount = ctx["transaction"]["amount"]
+        _assert_same(evaluate_compiled(ctx, bundle, amount), evaluate_rules(ctx, rules, amount))
+
+
+def test_rules_sorted_by_priority_stable():
+    rules = [
+        {"rule_id": "A", "priority": 1, "when": {"exists": "transaction.amount"}},
+        {"rule_id": "B", "priority": 5, "when": {"exists": "transaction.amount"}},
+        {"rule_id": "C", "priority": 5, "when": {"exists": "transaction.amount"}},
+    ]
+    bundle = compile_bundle({"rules": rules})
+    assert [r.rule_id for r in bundle.rules] == ["B", "C", "A"]
+
+
+def test_operator_precedence_and_edge_cases():
+    conds = [
+        {"eq": ["transaction.a", 1], "neq": ["transaction.a", 1]},
+        {"in": ["transaction.a", "not-a-list"]},
+        {"in": ["transaction.a", [[1, 2], 3]]},
+        {"in": ["transaction.a", [1, 2]]},
+        {"all": []},
+        {"any": []},
+        {},
+        {"unknown": ["transaction.a", 1]},
+        {"exists": ["transaction.a.b"]},
+        {"not_exists": "transaction.missing"},
+        {"path_eq": ["transaction.a", "transaction.b"]},
+    ]
+    values = [None, 1, 1.0, True, "", [1, 2], {"b": ""}, "x"]
+    for cond, a, b in itertools.product(conds, values, values):
+        rules = [{"rule_id": "R", "priority": 1, "when": cond, "then": {"set": {"taxable": True, "rate": 0.1}}}]
+        ctx = {"transaction": {"a": a, "b": b}}
+        _assert_same(
+            evaluate_compiled(ctx, compile_bundle({"rules": rules}), 10),
+            evaluate_rules(ctx, rules, 10),
+        )
+
+
+def test_compiled_bundle_cached_by_hash():
+    rules = ALL_RULESETS[0][2]
+    first = get_compiled_bundle("hash-under-test", {"rules": rules})
+    again = get_compiled_bundle("hash-under-test", {"rules": []})
+    assert first is again
+    assert first.bundle_hash == "hash-under-test"
+
+
+def test_index_prunes_candidates_without_changing_winner():
+    rules = next(r for r in COMPLIANCE_RULESETS if r["jurisdiction"] == "US-CA")["rules"]
+    bundle = compile_bundle({"rules": rules})
+    ctx = {"transaction": {"jurisdiction": "US-CA", "tax_type": "SALES", "amount": 100,
+                           "buyer": {"type": "BUSINESS"}, "product": {"category": "OTHER"}}}
+    mask = bundle.index.candidates(ctx)
+    assert 0 < bin(mask).count("1") < len(bundle.rules)
+    _assert_same(evaluate_compiled(ctx, bundle, 100), evaluate_rules(ctx, rules, 100))
+
+
+def test_index_handles_unhashable_and_mixed_values():
+    rules = [
+        {"rule_id": "EQ", "priority": 3, "when": {"all": [{"eq": ["transaction.a", 1]}, {"in": ["transaction.a", [1, 2]]}]}},
+        {"rule_id": "IN", "priority": 2, "when": {"in": ["transaction.a", ["x", True]]}},
+        {"rule_id": "ANY", "priority": 1, "when": {"any": [{"eq": ["transaction.a", "y"]}]}},
+    ]
+    bundle = compile_bundle({"rules": rules})
+    for a in [1, 1.0, True, 2, "x", "y", None, [1], {"k": 1}]:
+        ctx = {"transaction": {"a": a}}
+        _assert_same(evaluate_compiled(ctx, bundle, 1), evaluate_rules(ctx, rules, 1))
+
+
+def test_shared_nodes_memoized_and_residuals_drop_indexed_leaves():
+    consumer = {"eq": ["transaction.buyer.type", "CONSUMER"]}
+    region = {"any": [{"exists": "transaction.evidence.resolved_region"}, {"gt": ["transaction.amount", 50]}]}
+    rules = [
+        {"rule_id": f"R{i}", "priority": 10 - i, "when": {"all": [consumer, region, {"eq": ["transaction.n", i]}]},
+         "then": {"set": {"taxable": True, "rate": i / 100}}}
+        for i in range(3)
+    ] + [{"rule_id": "ANY", "priority": 0, "when": {"any": [consumer, {"gt": ["transaction.amount", 50]}]}}]
+    bundle = compile_bundle({"rules": rules})
+    # `region` repeats in every residual; the indexed `eq` leaves are gone from them
+    assert bundle.memo_size >= 1
+    assert bundle.rules[0].predicate is not bundle.rules[0].residual
+    for n, typ, amount, region_val in itertools.product(
+        [0, 1, 2, 3, None], ["CONSUMER", "BUSINESS", None], [10, 100, None], ["CA", "", None]
+    ):
+        ctx = {"transaction": {"n": n, "buyer": {"type": typ}, "amount": amount,
+                               "evidence": {"resolved_region": region_val}}}
+        _assert_same(evaluate_compiled(ctx, bundle, 1), evaluate_rules(ctx, rules, 1))
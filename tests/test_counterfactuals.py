@@ -0,0 +1,80 @@
+"""Unit tests for incremental counterfactual previews (must match a full re-evaluation)."""
+
+import os
+import random
+import sys
+from copy import deepcopy
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.engine.compiler import compile_bundle
+from crms.engine.evaluator import evaluate_rules
+from tests.test_compiler import _corpus
+
+ALL_RULESETS = [(r["jurisdiction"], r["tax_type"], r["rules"]) for r in COMPLIANCE_RULESETS]
+
+
+def _full_preview(context: dict, rules: list[dict], changes, amount: float) -> dict | None:
+    """Reference preview: patch a deep copy and re-run evaluate_rules over every rule."""
+    ctx_copy = deepcopy(context)
+    for ch in changes:
+        if ch.suggested_value is None:
+            continue
+        parts = ch.path.split(".")
+        if len(parts) < 2:
+            continue
+        cur = ctx_copy
+        for p in parts[:-1]:
+            if p not in cur:
+                cur[p] = {}
+            cur = cur[p]
+        cur[parts[-1]] = ch.suggested_value
+    try:
+        res, _, _ = evaluate_rules(ctx_copy, rules, amount)
+    except Exception:
+        return None
+    return {"taxable": res["taxable"], "rate": res["rate"], "tax_amount": res["tax_amount"]}
+
+
+@pytest.mark.parametrize("jurisdiction,tax_type,rules", ALL_RULESETS, ids=[r[0] for r in ALL_RULESETS])
+def test_previews_match_full_reevaluation(jurisdiction, tax_type, rules):
+    bundle = compile_bundle({"rules": rules})
+    rng = random.Random(99)
+    seen = 0
+    for ctx in _corpus(200):
+        trans = ctx["transaction"]
+        trans["jurisdiction"] = jurisdiction if rng.random() < 0.8 else trans.get("jurisdiction")
+        trans["tax_type"] = tax_type if rng.random() < 0.8 else trans.get("tax_type")
+        before = deepcopy(ctx)
+        _, _, trace = evaluate_rules(
+            ctx, rules, trans["amount"], trace=True, top_k_near_miss=10, max_counterfactuals=5,
+            bundle=bundle if rng.random() < 0.5 else None,
+        )
+        assert ctx == before
+        for cf in trace.counterfactuals:
+            seen += 1
+            assert cf.outcome_preview == _full_preview(ctx, rules, cf.changes, trans["amount"])
+    assert seen
+
+
+def test_preview_rechecks_rules_reading_parent_paths():
+    rules = [
+        {"rule_id": "PARENT", "priority": 30, "when": {"eq": ["transaction.doc", {"cert": "X"}]},
+         "then": {"set": {"taxable": False, "rate": 0.0}}},
+        {"rule_id": "NEAR", "priority": 15, "when": {"eq": ["transaction.doc.cert", "X"]},
+         "then": {"set": {"taxable": True, "rate": 0.05}}},
+        {"rule_id": "DEFAULT", "priority": 1, "when": {"exists": "transaction.amount"},
+         "then": {"set": {"taxable": True, "rate": 0.1}}},
+    ]
+    ctx = {"transaction": {"amount": 10, "doc": {"cert": "Y"}}}
+    result, _, trace = evaluate_rules(ctx, rules, 10, trace=True, top_k_near_miss=5, max_counterfactuals=5)
+    assert result["rate"] == 0.1
+    previews = {cf.based_on_rule_id: cf.outcome_preview for cf in trace.counterfactuals}
+    # Setting transaction.doc.cert changes transaction.doc too, so PARENT now fires
+    assert previews["NEAR"] == {"taxable": False, "rate": 0.0, "tax_amount": 0.0}
+    assert ctx["transaction"]["doc"] == {"cert": "Y"}
+    for cf in trace.counterfactuals:
+        assert cf.outcome_preview == _full_preview(ctx, rules, cf.changes, 10)
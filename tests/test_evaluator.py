@@ -218,3 +218,21 @@ def test_trace_full():
     assert trace.confidence >= 0.0 and trace.confidence <= 1.0
     assert result["taxable"] is True
     assert len(fired) == 1
+
+
+def test_trace_budget_caps_steps_and_keeps_winner():
+    """trace_budget limits trace.steps; the winner stays and near-misses are unaffected."""
+    rules = [
+        {"rule_id": f"R{i}", "name": f"R{i}", "priority": 100 - i, "when": {"eq": ["transaction.code", i]}}
+        for i in range(10)
+    ]
+    rules.append({"rule_id": "WIN", "name": "Win", "priority": 1, "when": {"exists": "transaction.amount"},
+                  "then": {"set": {"taxable": True, "rate": 0.1}}})
+    context = {"transaction": {"amount": 100, "code": -1}}
+    _, _, full = evaluate_rules(context, rules, 100, trace=True)
+    _, _, capped = evaluate_rules(context, rules, 100, trace=True, trace_budget=3)
+    assert len(full.steps) == 11 and full.steps_omitted == 0
+    assert [s.rule_id for s in capped.steps] == ["R0", "R1", "WIN"]
+    assert capped.steps_omitted == 8
+    assert capped.near_miss_rules == full.near_miss_rules
+    assert capped.evidence_paths_used == full.evidence_paths_used
@@ -0,0 +1,107 @@
+"""Unit tests for fan-out evaluation (loader and audit writes replaced, no database)."""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.api import evaluations
+from crms.schemas.evaluation import BatchEvaluationRequest, EvaluationRequest, FanoutEvaluationRequest
+from tests.conftest import make_ruleset, make_version
+
+RULESETS = {(r["jurisdiction"], r["tax_type"]): r["rules"] for r in COMPLIANCE_RULESETS}
+TARGETS = [("US-CA", "SALES"), ("EU", "VAT"), ("CA-ON", "HST")]
+
+
+@pytest.fixture
+def targets(store):
+    for pair in TARGETS:
+        store.add_ruleset(make_ruleset(*pair), [make_version(rules=RULESETS[pair])])
+    return store
+
+
+def _body(audit: str, key: str | None = None, targets=TARGETS) -> FanoutEvaluationRequest:
+    return FanoutEvaluationRequest.model_validate({
+        "idempotency_key": key,
+        "effective_at": "2026-02-20T00:00:00Z",
+        "transaction": {
+            "amount": 250, "buyer": {"type": "CONSUMER", "country": "DE"},
+            "product": {"category": "SAAS"}, "fulfillment": {"ship_to_region": "CA"},
+        },
+        "targets": [{"jurisdiction": j, "tax_type": t} for j, t in targets],
+        "audit": audit,
+    })
+
+
+async def _fanout(body: FanoutEvaluationRequest) -> dict:
+    tenant = SimpleNamespace(tenant_id="t-fan")
+    return orjson.loads((await evaluations.evaluate_fanout(body, tenant, None)).body)
+
+
+async def test_targets_match_single_evaluations(targets):
+    body = _body("per_target", targets=TARGETS + [("XX", "NONE")])
+    out = await _fanout(body)
+    assert targets.loads == [("t-fan", sorted(TARGETS + [("XX", "NONE")]))]  # one query for every target
+    assert list(out["results"]) == ["US-CA:SALES", "EU:VAT", "CA-ON:HST", "XX:NONE"]
+    assert out["results"]["XX:NONE"]["error"]["status_code"] == 404
+    for jurisdiction, tax_type in TARGETS:
+        single = EvaluationRequest.model_validate({
+            "effective_at": body.effective_at,
+            "transaction": {**body.transaction.model_dump(), "jurisdiction": jurisdiction, "tax_type": tax_type},
+        })
+        _, versions = targets.rulesets[(jurisdiction, tax_type)]
+        ruleset = make_ruleset(jurisdiction, tax_type)
+        _, result, explanation = evaluations._run_engine(single, ruleset, versions[0])
+        response = out["results"][f"{jurisdiction}:{tax_type}"]["response"]
+        assert response["result"] == orjson.loads(orjson.dumps(result))
+        assert response["explanation"] == orjson.loads(orjson.dumps(explanation))
+    assert out["evaluation_id"] is None
+    assert [row["ruleset_id"] for row in targets.rows] == ["rs-US-CA-SALES", "rs-EU-VAT", "rs-CA-ON-HST"]
+
+
+async def test_combined_audit_is_one_record_and_replays(targets):
+    out = await _fanout(_body("combined", key="order-1"))
+    assert len(targets.rows) == 1
+    assert targets.rows[0]["idempotency_key"] == "order-1"
+    assert {r["response"]["evaluation_id"] for r in out["results"].values()} == {out["evaluation_id"]}
+    assert await _fanout(_body("combined", key="order-1")) == out
+    assert len(targets.rows) == 1
+
+
+async def test_per_target_keys_replay_stored_targets(targets):
+    first = await _fanout(_body("per_target", key="order-2", targets=TARGETS[:1]))
+    assert targets.rows[0]["idempotency_key"] == "order-2:US-CA:SALES"
+    out = await _fanout(_body("per_target", key="order-2"))
+    assert out["results"]["US-CA:SALES"] == first["results"]["US-CA:SALES"]
+    assert [row["idempotency_key"] for row in targets.rows] == [
+        "order-2:US-CA:SALES", "order-2:EU:VAT", "order-2:CA-ON:HST",
+    ]
+
+
+async def test_keys_used_by_other_request_types_are_409s(targets):
+    async def batch(key: str) -> dict:
+        trans = {**_body("per_target").transaction.model_dump(), "jurisdiction": "US-CA", "tax_type": "SALES"}
+        body = BatchEvaluationRequest.model_validate({
+            "items": [{"idempotency_key": key, "effective_at": "2026-02-20T00:00:00Z", "transaction": trans}],
+        })
+        out = await evaluations.evaluate_batch(body, SimpleNamespace(tenant_id="t-fan"), None)
+        return orjson.loads(out.body)["results"][0]
+
+    assert (await batch("order-3:US-CA:SALES"))["response"]  # a single key that looks derived
+    out = await _fanout(_body("per_target", key="order-3"))
+    assert out["results"]["US-CA:SALES"]["error"]["status_code"] == 409
+    assert out["results"]["EU:VAT"]["response"]
+    assert (await batch("order-3:EU:VAT"))["error"]["status_code"] == 409  # a derived key is not replayed as a single
+
+    assert (await batch("order-4"))["response"]
+    with pytest.raises(HTTPException) as exc:
+        await _fanout(_body("combined", key="order-4"))
+    assert exc.value.status_code == 409
+    await _fanout(_body("combined", key="order-5"))
+    assert (await batch("order-5"))["error"] == {"status_code": 409, "detail": evaluations.IDEMPOTENCY_KEY_CONFLICT}
@@ -0,0 +1,66 @@
+"""Unit tests for NOTIFY-driven ruleset cache invalidation (no database connection)."""
+
+import orjson
+import pytest
+
+from crms.storage.invalidation import CHANNEL, InvalidationListener, change_payload, notify_ruleset_change
+from crms.storage.ruleset_cache import RulesetCache
+from tests.conftest import make_ruleset, make_version
+
+RULESETS = {pair: make_ruleset(*pair, ruleset_id=f"rs-{pair[0]}") for pair in [("US-CA", "SALES"), ("EU", "VAT")]}
+
+
+@pytest.fixture
+async def cache(store) -> RulesetCache:
+    for ruleset in RULESETS.values():
+        store.add_ruleset(ruleset, [make_version()])
+    cache = RulesetCache(maxsize=10, ttl=60)
+    for tenant_id in ("t1", "t2"):
+        await cache.get_many(None, tenant_id, list(RULESETS))
+    return cache
+
+
+def _listener(cache: RulesetCache) -> InvalidationListener:
+    return InvalidationListener(cache, listen_ttl=86400, fallback_ttl=60, reconnect_delay=1, keepalive=1)
+
+
+async def test_notification_evicts_exactly_the_named_entry(cache, store):
+    listener = _listener(cache)
+    listener.handle(change_payload("t1", RULESETS[("EU", "VAT")], "v-2"))
+    assert not cache.peek("t1", "EU", "VAT")[0]
+    assert cache.peek("t1", "US-CA", "SALES")[0] and cache.peek("t2", "EU", "VAT")[0]
+
+    listener.handle("not json")
+    listener.handle('{"tenant_id": "t1"}')
+    assert listener.stats()["notifications"] == 1 and listener.stats()["malformed"] == 2
+    assert len(store.loads) == 2
+
+
+async def test_connect_and_drop_revalidate_everything(cache):
+    listener = _listener(cache)
+    listener.on_connected()
+    assert not cache.peek("t1", "US-CA", "SALES")[0]  # may have missed changes before listening
+    assert cache._entries.ttl == 86400
+    await cache.get(None, "t1", "US-CA", "SALES")
+
+    listener.on_disconnected()
+    assert not cache.peek("t1", "US-CA", "SALES")[0]
+    assert cache._entries.ttl == 60
+    assert listener.stats() == {
+        "running": False, "connected": False, "connects": 1, "disconnects": 1, "notifications": 0, "malformed": 0,
+    }
+
+
+async def test_notify_is_sent_in_the_write_transaction():
+    statements = []
+
+    class FakeSession:
+        async def execute(self, stmt):
+            statements.append(stmt.compile(compile_kwargs={"literal_binds": True}))
+
+    await notify_ruleset_change(FakeSession(), "t1", RULESETS[("US-CA", "SALES")], "v-9")
+    sql = str(statements[0])
+    assert "pg_notify" in sql and CHANNEL in sql
+    assert orjson.loads(change_payload("t1", RULESETS[("US-CA", "SALES")], "v-9")) == {
+        "tenant_id": "t1", "ruleset_id": "rs-US-CA", "version_id": "v-9", "jurisdiction": "US-CA", "tax_type": "SALES",
+    }
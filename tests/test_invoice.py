@@ -0,0 +1,171 @@
+"""Unit tests for invoice evaluation (each line must match evaluate_rules on header + line)."""
+
+import os
+import random
+import sys
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.api import evaluations
+from crms.engine.compiler import compile_bundle
+from crms.engine.evaluator import evaluate_rules
+from crms.engine.invoice import header_bundle, evaluate_lines, invoice_totals, line_transactions
+from crms.engine.trace_pool import TracePool
+from crms.schemas.evaluation import EvaluationRequest, InvoiceEvaluationRequest
+from tests.conftest import make_ruleset, make_version
+from tests.test_compiler import _CHOICES, _assert_same, _random_transaction
+
+ALL_RULESETS = [(r["jurisdiction"], r["tax_type"], r["rules"]) for r in COMPLIANCE_RULESETS]
+US_CA = next(r for r in COMPLIANCE_RULESETS if r["jurisdiction"] == "US-CA")["rules"]
+
+
+def _invoice(rng: random.Random, jurisdiction: str, tax_type: str, n_lines: int) -> tuple[dict, list[dict]]:
+    header = _random_transaction(rng)
+    header.pop("amount")
+    header.pop("product", None)
+    header.update(jurisdiction=jurisdiction, tax_type=tax_type)
+    lines = []
+    for _ in range(n_lines):
+        line: dict = {"amount": rng.choice([0, 10, 99.99, 100, 2500])}
+        category = rng.choice(_CHOICES["product.category"])
+        if category is not None:
+            line["product"] = {"category": category}
+        if rng.random() < 0.2:
+            line["event"] = {"type": rng.choice(["SALE", "REFUND"])}
+        lines.append(line)
+    return header, lines
+
+
+@pytest.mark.parametrize("jurisdiction,tax_type,rules", ALL_RULESETS, ids=[r[0] for r in ALL_RULESETS])
+def test_lines_match_interpreter(jurisdiction, tax_type, rules):
+    rng = random.Random(11)
+    bundle_json = {"rules": rules}
+    bundle = compile_bundle(bundle_json)
+    for _ in range(40):
+        header, lines = _invoice(rng, jurisdiction, tax_type, rng.choice([1, 2, 30]))
+        outcomes = evaluate_lines(bundle, bundle_json, header, lines)
+        for trans, (result, fired) in zip(line_transactions(header, lines), outcomes):
+            expected = evaluate_rules({"transaction": trans}, rules, trans["amount"])
+            _assert_same((result, fired, None), expected)
+
+
+def test_header_only_paths_are_folded():
+    rules = next(r for r in COMPLIANCE_RULESETS if r["jurisdiction"] == "US-CA")["rules"]
+    bundle_json = {"rules": rules}
+    bundle = compile_bundle(bundle_json)
+    header = {"jurisdiction": "US-CA", "tax_type": "SALES", "buyer": {"type": "CONSUMER"}}
+    specialized = header_bundle(bundle, bundle_json, header, {"amount", "product"})
+    assert "transaction.buyer.type" in bundle.paths
+    assert "transaction.buyer.type" not in specialized.paths
+    assert "transaction.product.category" in specialized.paths
+    assert len(specialized.rules) < len(bundle.rules)  # BUSINESS-only rules can never fire
+
+
+def test_invoice_totals():
+    results = [
+        {"taxable": True, "tax_amount": 7.25},
+        {"taxable": False, "tax_amount": 0.0},
+        {"taxable": True, "tax_amount": 0.73},
+    ]
+    assert invoice_totals([100, 50, 10.05], results) == {
+        "amount": 160.05,
+        "taxable_amount": 110.05,
+        "tax_amount": 7.98,
+    }
+
+
+@pytest.fixture
+def audit_rows(store):
+    store.add_tenant("inv-hash", "t-inv")
+    store.add_ruleset(make_ruleset("US-CA", "SALES", ruleset_id="rs-inv"), [make_version(rules=US_CA)])
+    return store.rows
+
+
+async def test_invoice_endpoint_matches_single_evaluations(audit_rows):
+    body = InvoiceEvaluationRequest.model_validate({
+        "effective_at": "2026-02-20T00:00:00Z",
+        "header": {"jurisdiction": "US-CA", "tax_type": "SALES", "buyer": {"type": "CONSUMER"},
+                   "fulfillment": {"ship_to_region": "CA"}},
+        "lines": [
+            {"line_id": "a", "amount": 100, "product": {"category": "PHYSICAL_GOODS"}},
+            {"line_id": "b", "amount": 40, "product": {"category": "SAAS"}},
+            {"line_id": "c", "amount": 12.5, "product": {"category": "PHYSICAL_GOODS"}},
+        ],
+    })
+    out = orjson.loads((await evaluations.evaluate_invoice(body, "inv-hash", None)).body)
+    assert [line["line_id"] for line in out["lines"]] == ["a", "b", "c"]
+    ruleset = make_ruleset("US-CA", "SALES")
+    version = make_version(rules=US_CA)
+    for line, item in zip(body.lines, out["lines"]):
+        single = EvaluationRequest.model_validate({
+            "effective_at": body.effective_at,
+            "transaction": {**body.header.model_dump(), **line.model_dump(exclude={"line_id"})},
+        })
+        _, result, explanation = evaluations._run_engine(single, ruleset, version)
+        assert item["result"] == orjson.loads(orjson.dumps(result))
+        assert item["explanation"] == orjson.loads(orjson.dumps(explanation))
+    assert out["totals"]["tax_amount"] == round(sum(i["result"]["tax_amount"] for i in out["lines"]), 2)
+    assert len(audit_rows) == 1
+
+
+async def test_idempotency_keys_are_not_replayed_across_request_types(audit_rows):
+    invoice = InvoiceEvaluationRequest.model_validate({
+        "idempotency_key": "inv-1",
+        "effective_at": "2026-02-20T00:00:00Z",
+        "header": {"jurisdiction": "US-CA", "tax_type": "SALES", "buyer": {"type": "CONSUMER"},
+                   "fulfillment": {"ship_to_region": "CA"}},
+        "lines": [{"line_id": "a", "amount": 100, "product": {"category": "PHYSICAL_GOODS"}}],
+    })
+    single = EvaluationRequest.model_validate({
+        "idempotency_key": "single-1",
+        "effective_at": "2026-02-20T00:00:00Z",
+        "transaction": {**invoice.header.model_dump(), "amount": 100, "product": {"category": "PHYSICAL_GOODS"}},
+    })
+    await evaluations.evaluate_invoice(invoice, "inv-hash", None)
+    await evaluations.evaluate_transaction(single, "inv-hash", None)
+
+    with pytest.raises(HTTPException) as exc:
+        await evaluations.evaluate_transaction(single.model_copy(update={"idempotency_key": "inv-1"}), "inv-hash", None)
+    assert exc.value.status_code == 409 and exc.value.detail == evaluations.IDEMPOTENCY_KEY_CONFLICT
+    with pytest.raises(HTTPException) as exc:
+        await evaluations.evaluate_invoice(invoice.model_copy(update={"idempotency_key": "single-1"}), "inv-hash", None)
+    assert exc.value.status_code == 409
+    assert len(audit_rows) == 2
+
+
+async def test_traced_lines_run_on_the_trace_pool(audit_rows, monkeypatch):
+    # One line's trace is below the threshold; the invoice's three together reach it
+    pool = TracePool("thread", workers=2, cost_threshold=len(US_CA) * 3 * 3, tenant_limit=1, timeout=5.0)
+    monkeypatch.setattr(evaluations, "trace_pool", pool)
+    body = InvoiceEvaluationRequest.model_validate({
+        "effective_at": "2026-02-20T00:00:00Z",
+        "header": {"jurisdiction": "US-CA", "tax_type": "SALES", "buyer": {"type": "CONSUMER"},
+                   "fulfillment": {"ship_to_region": "CA"}},
+        "lines": [
+            {"line_id": "a", "amount": 100, "product": {"category": "PHYSICAL_GOODS"}},
+            {"line_id": "b", "amount": 40, "product": {"category": "SAAS"}},
+            {"line_id": "c", "amount": 12.5, "product": {"category": "PHYSICAL_GOODS"}},
+        ],
+        "options": {"explain": "full", "counterfactuals": 2},
+    })
+    try:
+        out = orjson.loads((await evaluations.evaluate_invoice(body, "inv-hash", None)).body)
+    finally:
+        pool.shutdown()
+    assert pool.stats()["offloaded"] == 3
+    ruleset, version = make_ruleset("US-CA", "SALES"), make_version(rules=US_CA)
+    for line, item in zip(body.lines, out["lines"]):
+        single = EvaluationRequest.model_validate({
+            "effective_at": body.effective_at,
+            "transaction": {**body.header.model_dump(), **line.model_dump(exclude={"line_id"})},
+            "options": body.options.model_dump(),
+        })
+        _, result, explanation = evaluations._run_engine(single, ruleset, version)
+        assert item["result"] == orjson.loads(orjson.dumps(result))
+        assert item["explanation"] == orjson.loads(orjson.dumps(explanation))
+        assert item["explanation"]["trace"]
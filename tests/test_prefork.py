@@ -0,0 +1,73 @@
+"""Unit tests for the prefork launcher's preload (queries replaced, no database)."""
+
+import os
+import sys
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms import prefork
+from crms.auth.tenant_cache import tenant_cache
+from crms.engine.compiler import peek_compiled_bundle
+from crms.engine.specialize import _ROUTED_CACHE
+from crms.utils.memory import memory_stats
+
+
+@asynccontextmanager
+async def _session():
+    yield None
+
+
+async def test_preload_compiles_live_bundles_and_warms_tenants(monkeypatch):
+    bundles = [
+        (r["jurisdiction"], r["tax_type"], f"hash-prefork-{r['jurisdiction']}", {"rules": r["rules"]})
+        for r in COMPLIANCE_RULESETS
+    ]
+    disposed = []
+
+    async def fake_bundles(db, at):
+        return bundles + bundles[:1]  # a shadow candidate equal to a published bundle
+
+    async def fake_tenants(db):
+        return [SimpleNamespace(tenant_id="t-pf", name="Prefork", api_key_hash="key-hash-pf")]
+
+    async def dispose():
+        disposed.append(True)
+
+    monkeypatch.setattr(prefork, "get_live_bundles", fake_bundles)
+    monkeypatch.setattr(prefork, "get_tenants", fake_tenants)
+    monkeypatch.setattr(prefork, "async_session_maker", _session)
+    monkeypatch.setattr(prefork, "engine", SimpleNamespace(dispose=dispose))
+
+    summary = await prefork.preload()
+    assert (summary["tenants"], summary["bundles"], summary["skipped"]) == (1, len(bundles), 0)
+    assert disposed == [True]
+    for jurisdiction, tax_type, h, _ in bundles:
+        assert peek_compiled_bundle(h) is not None
+        assert _ROUTED_CACHE.get((h, jurisdiction, tax_type)) is not None
+    assert tenant_cache.lookup("key-hash-pf")[1].tenant_id == "t-pf"
+    tenant_cache.invalidate("key-hash-pf")
+
+
+def test_failed_preload_forks_workers_cold(monkeypatch):
+    disposed = []
+
+    async def unreachable(db, at):
+        raise OSError("connection refused")
+
+    async def dispose():
+        disposed.append(True)
+
+    monkeypatch.setattr(prefork, "get_live_bundles", unreachable)
+    monkeypatch.setattr(prefork, "async_session_maker", _session)
+    monkeypatch.setattr(prefork, "engine", SimpleNamespace(dispose=dispose))
+    assert prefork._try_preload() is None
+    assert disposed == [True]
+
+
+def test_memory_stats_splits_shared_and_private():
+    stats = memory_stats()
+    if stats:  # Linux only
+        assert stats["rss_bytes"] == stats["shared_bytes"] + stats["private_bytes"]
@@ -0,0 +1,86 @@
+"""Unit tests for the version prewarmer (queries replaced, no database)."""
+
+import os
+import sys
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.engine.compiler import _BUNDLE_CACHE
+from crms.engine.specialize import _ROUTED_CACHE
+from crms.storage import prewarm
+from crms.storage.prewarm import VersionPrewarmer
+from crms.storage.ruleset_cache import RulesetCache
+from tests.conftest import make_ruleset, make_version
+
+RULES = next(r for r in COMPLIANCE_RULESETS if r["jurisdiction"] == "US-CA")["rules"]
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=UTC)
+RULESET = make_ruleset("US-CA", "SALES", ruleset_id="rs-pw")
+
+
+def _version(version: str, start: datetime):
+    return make_version(version, RULES, effective_from=start, hash_=f"hash-prewarm-{version}")
+
+
+@asynccontextmanager
+async def _session():
+    yield None
+
+
+async def test_run_once_refreshes_stale_entries_and_compiles(store, monkeypatch):
+    current = _version("1.0.0", NOW - timedelta(days=30))
+    upcoming = _version("1.1.0", NOW + timedelta(minutes=5))
+    store.add_ruleset(RULESET, [current])
+    published = store.rulesets[("US-CA", "SALES")][1]
+    loads, windows = store.loads, []
+
+    async def fake_upcoming(db, start, end):
+        windows.append((start, end))
+        return [("t1", "US-CA", "SALES", v) for v in published if start < v.effective_from <= end]
+
+    monkeypatch.setattr(prewarm, "get_upcoming_versions", fake_upcoming)
+    cache = RulesetCache(maxsize=10, ttl=None)
+    warmer = VersionPrewarmer(_session, cache, interval=30, horizon=600)
+
+    await cache.get(None, "t1", "US-CA", "SALES")
+    published.append(upcoming)
+    await warmer.run_once(NOW)
+    assert windows == [(NOW - timedelta(seconds=30), NOW + timedelta(seconds=600))]
+    assert loads[-1] == ("t1", [("US-CA", "SALES")])
+    _, entry = cache.peek("t1", "US-CA", "SALES")
+    assert [v.version for v in entry.versions] == ["1.0.0", "1.1.0"]
+    assert _BUNDLE_CACHE.get(upcoming.bundle_hash) is not None
+    assert _ROUTED_CACHE.get((upcoming.bundle_hash, "US-CA", "SALES")) is not None
+
+    # Up to date: no reload, no recompile
+    await warmer.run_once(NOW + timedelta(seconds=30))
+    assert len(loads) == 2
+    assert warmer.stats() == {"running": False, "runs": 2, "versions": 1, "refreshed": 1, "failed": 0}
+
+
+async def test_entries_not_cached_are_left_to_the_first_request(store, monkeypatch):
+    async def fake_upcoming(db, start, end):
+        return [("t2", "US-CA", "SALES", _version("2.0.0", NOW + timedelta(minutes=1)))]
+
+    monkeypatch.setattr(prewarm, "get_upcoming_versions", fake_upcoming)
+    warmer = VersionPrewarmer(_session, RulesetCache(maxsize=10, ttl=None), interval=30, horizon=600)
+    await warmer.run_once(NOW)
+    assert warmer.stats()["versions"] == 1 and warmer.stats()["refreshed"] == 0
+    assert store.loads == []  # not cached here, nothing to refresh
+
+
+async def test_versions_past_the_window_are_forgotten(store, monkeypatch):
+    versions = [_version(f"3.0.{i}", NOW + timedelta(minutes=i)) for i in range(1, 4)]
+
+    async def fake_upcoming(db, start, end):
+        return [("t3", "US-CA", "SALES", v) for v in versions if start < v.effective_from <= end]
+
+    monkeypatch.setattr(prewarm, "get_upcoming_versions", fake_upcoming)
+    warmer = VersionPrewarmer(_session, RulesetCache(maxsize=10, ttl=None), interval=30, horizon=600)
+    await warmer.run_once(NOW)
+    assert sorted(warmer._warmed) == ["v-3.0.1", "v-3.0.2", "v-3.0.3"]
+    await warmer.run_once(NOW + timedelta(minutes=2, seconds=30))  # 3.0.1 and 3.0.2 are in effect
+    assert sorted(warmer._warmed) == ["v-3.0.3"]
+    assert warmer.stats()["versions"] == 3  # nothing in the window was compiled twice
@@ -0,0 +1,85 @@
+"""Unit tests for audit replay (partitions built in memory, no database)."""
+
+import copy
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.engine.compiler import compile_bundle
+from crms.engine.evaluator import evaluate_compiled
+from crms.engine.replay import replay, replay_pool
+
+RULES = next(r for r in COMPLIANCE_RULESETS if r["jurisdiction"] == "US-CA")["rules"]
+CATEGORIES = ["SAAS", "PHYSICAL_GOODS", "DIGITAL_GOODS", "SERVICES"]
+
+
+def _recorded(bundle, trans: dict) -> dict:
+    result, fired, _ = evaluate_compiled({"transaction": trans}, bundle, trans["amount"])
+    return {**result, "matched_rule_id": fired[0].rule_id if fired else None}
+
+
+def _rows(n: int) -> list[tuple[str, dict, dict]]:
+    """Audit rows as POST /v1/evaluations (and one invoice) would have stored them."""
+    bundle = compile_bundle({"rules": RULES})
+    rows = []
+    for i in range(n):
+        trans = {
+            "jurisdiction": "US-CA", "tax_type": "SALES", "amount": 10.0 + i,
+            "buyer": {"type": "CONSUMER"}, "product": {"category": CATEGORIES[i % len(CATEGORIES)]},
+            "fulfillment": {"ship_to_region": "CA"},
+        }
+        rows.append((f"e{i}", {"transaction": trans}, {"result": _recorded(bundle, trans)}))
+    header = {"jurisdiction": "US-CA", "tax_type": "SALES", "buyer": {"type": "CONSUMER"},
+              "fulfillment": {"ship_to_region": "CA"}}
+    lines = [{"line_id": "a", "amount": 5.0, "product": {"category": "PHYSICAL_GOODS"}},
+             {"line_id": "b", "amount": 7.0, "product": {"category": "SAAS"}}]
+    outputs = [{"result": _recorded(bundle, {**header, **{k: v for k, v in line.items() if k != "line_id"}})}
+               for line in lines]
+    rows.append(("inv", {"header": header, "lines": lines}, {"lines": outputs}))
+    rows.append(("combined", {"transaction": {"amount": 1}}, {"results": {}}))  # not replayable
+    return rows
+
+
+async def _partitions(rows, size: int):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+async def test_replay_against_the_same_rules_changes_nothing():
+    summary = (await replay(_partitions(_rows(40), 7), {"rules": RULES})).as_dict()
+    assert (summary["rows"], summary["items"], summary["skipped"], summary["changed"]) == (42, 42, 1, 0)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+async def test_replay_reports_rate_and_winner_changes(workers):
+    draft = copy.deepcopy(RULES)
+    physical = _recorded(compile_bundle({"rules": RULES}), {
+        "jurisdiction": "US-CA", "tax_type": "SALES", "amount": 1.0, "buyer": {"type": "CONSUMER"},
+        "product": {"category": "PHYSICAL_GOODS"}, "fulfillment": {"ship_to_region": "CA"},
+    })["matched_rule_id"]
+    for rule in draft:
+        if rule["rule_id"] == physical:
+            rule["then"]["set"]["rate"] += 0.01
+    rows = _rows(40)
+    executor = replay_pool({"rules": draft}, workers) if workers else None
+    try:
+        summary = (await replay(_partitions(rows, 5), {"rules": draft}, executor=executor, max_samples=3)).as_dict()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    changed_rows = sum(1 for _, inp, _ in rows[:40] if inp["transaction"]["product"]["category"] == "PHYSICAL_GOODS")
+    assert summary["changed"] == changed_rows + 1  # + invoice line "a"
+    assert summary["changed_winners"] == []
+    assert summary["rate"]["changed"] == summary["changed"]
+    assert summary["rate"]["delta_min"] == pytest.approx(0.01)
+    assert summary["tax"]["increased"] == summary["changed"] and summary["tax"]["decreased"] == 0
+    assert len(summary["samples"]) == 3
+
+    without = [r for r in RULES if r["rule_id"] != physical]
+    summary = (await replay(_partitions(rows, 5), {"rules": without})).as_dict()
+    assert sum(w["count"] for w in summary["changed_winners"]) == changed_rows + 1
+    assert {w["before"] for w in summary["changed_winners"]} == {physical}
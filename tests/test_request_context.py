@@ -0,0 +1,45 @@
+"""Unit tests for single-round-trip request resolution (loader replaced, no database)."""
+
+from datetime import UTC, datetime
+
+import pytest
+from fastapi import HTTPException
+
+from crms.api import evaluations
+from crms.schemas.evaluation import EvaluationRequest
+from tests.conftest import make_ruleset, make_version
+
+
+def _body(jurisdiction: str, key: str | None = None) -> EvaluationRequest:
+    return EvaluationRequest.model_validate({
+        "idempotency_key": key,
+        "effective_at": "2026-02-20T00:00:00Z",
+        "transaction": {"jurisdiction": jurisdiction, "tax_type": "SALES", "amount": 10},
+    })
+
+
+@pytest.fixture
+def loader(store):
+    store.add_tenant("good-hash", "t-rc")
+    store.add_ruleset(make_ruleset("RC", "SALES", ruleset_id="rs-rc"), [make_version(version_id="v1")])
+    return store.contexts
+
+
+async def test_cold_request_resolves_in_one_call_then_hits_caches(loader):
+    tenant, ruleset, existing = await evaluations._resolve_request(None, "good-hash", _body("RC"))
+    assert (tenant.tenant_id, ruleset.ruleset_id, existing) == ("t-rc", "rs-rc", None)
+    assert ruleset.version_at(datetime(2026, 2, 1, tzinfo=UTC)).version_id == "v1"
+    assert loader == [("good-hash", True, None)]
+
+    await evaluations._resolve_request(None, "good-hash", _body("RC"))
+    assert len(loader) == 1  # fully cached
+    await evaluations._resolve_request(None, "good-hash", _body("RC", key="k1"))
+    assert loader[-1] == ("good-hash", False, "k1")  # only the idempotency lookup
+
+
+async def test_invalid_key_is_rejected_and_negatively_cached(loader):
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            await evaluations._resolve_request(None, "bad-hash", _body("RC"))
+        assert exc.value.status_code == 403
+    assert len(loader) == 1
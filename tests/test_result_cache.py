@@ -0,0 +1,69 @@
+"""Unit tests for memoized non-trace results (must match evaluate_rules for every amount)."""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.engine.compiler import compile_bundle
+from crms.engine.evaluator import evaluate_rules
+from crms.engine.result_cache import ResultCache
+from crms.utils.lru import LRUCache
+from tests.test_compiler import _assert_same, _corpus
+
+ALL_RULESETS = [(r["jurisdiction"], r["tax_type"], r["rules"]) for r in COMPLIANCE_RULESETS]
+
+
+@pytest.mark.parametrize("jurisdiction,tax_type,rules", ALL_RULESETS, ids=[r[0] for r in ALL_RULESETS])
+def test_cached_results_match_interpreter(jurisdiction, tax_type, rules):
+    cache = ResultCache(maxsize=1000, maxbytes=10_000_000)
+    bundle = compile_bundle({"rules": rules}, f"hash-{jurisdiction}")
+    rng = random.Random(7)
+    corpus = _corpus(100)
+    for ctx in corpus + corpus:
+        amount = rng.choice([0, 1, 19.99, 100, 2500, -5])
+        ctx["transaction"]["amount"] = amount
+        _assert_same(cache.evaluate(ctx, bundle, amount), evaluate_rules(ctx, rules, amount))
+    stats = cache.stats()
+    assert stats["hits"] >= 100
+    assert stats["size"] <= 100
+
+
+def test_fallback_on_amount_presence_shares_entries():
+    rules = next(r for r in COMPLIANCE_RULESETS if r["jurisdiction"] == "EU")["rules"]
+    cache = ResultCache(maxsize=10, maxbytes=10_000_000)
+    bundle = compile_bundle({"rules": rules}, "hash-eu")
+    ctx = {"transaction": {"jurisdiction": "EU", "tax_type": "VAT", "amount": 10}}
+    first, _, _ = cache.evaluate(ctx, bundle, 10)
+    ctx["transaction"]["amount"] = 30
+    second, _, _ = cache.evaluate(ctx, bundle, 30)
+    assert cache.stats()["hits"] == 1
+    assert second["tax_amount"] == round(second["rate"] * 30, 2)
+    assert first["obligations"] is not second["obligations"]
+
+
+def test_unhashed_bundles_and_disabled_cache_bypass():
+    rules = ALL_RULESETS[0][2]
+    ctx = _corpus(1)[0]
+    cache = ResultCache(maxsize=10, maxbytes=10_000)
+    cache.evaluate(ctx, compile_bundle({"rules": rules}), 1)
+    disabled = ResultCache(maxsize=0, maxbytes=10_000)
+    disabled.evaluate(ctx, compile_bundle({"rules": rules}, "h"), 1)
+    assert cache.stats()["size"] == disabled.stats()["size"] == 0
+
+
+def test_lru_byte_budget():
+    cache = LRUCache(maxsize=10, maxbytes=100)
+    cache.set("a", 1, size=40)
+    cache.set("b", 2, size=40)
+    cache.set("a", 3, size=50)  # replacing an entry updates its size
+    assert cache.bytes == 90
+    cache.set("c", 4, size=30)
+    assert "b" not in cache and cache.get("a") == 3 and cache.get("c") == 4
+    assert cache.stats()["bytes"] == 80 and cache.stats()["evictions"] == 1
+    cache.set("d", 5, size=500)  # larger than the budget: evicted immediately
+    assert "d" not in cache and cache.bytes == 0
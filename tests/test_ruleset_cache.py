@@ -0,0 +1,99 @@
+"""Unit tests for the ruleset/version cache (no database: the loader is replaced)."""
+
+import asyncio
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+from crms.storage.ruleset_cache import RulesetCache, snapshot
+from tests.conftest import make_ruleset, make_version
+
+
+def _dt(month: int) -> datetime:
+    return datetime(2025, month, 1, tzinfo=UTC)
+
+
+def _version(version: str, start: int, end: int | None) -> SimpleNamespace:
+    return make_version(version, effective_from=_dt(start), effective_to=_dt(end) if end else None)
+
+
+RULESET = make_ruleset("US-CA", "SALES", ruleset_id="rs-1")
+
+
+def test_version_at_matches_effective_window():
+    cached = snapshot(RULESET, [_version("1.0.1", 3, None), _version("1.0.0", 1, 3)])
+    assert cached.version_at(datetime(2024, 12, 31, tzinfo=UTC)) is None
+    assert cached.version_at(_dt(1)).version == "1.0.0"
+    assert cached.version_at(_dt(3)).version == "1.0.1"  # effective_to is exclusive
+    assert cached.version_at(datetime(2025, 2, 1)).version == "1.0.0"  # naive = UTC
+
+
+def test_version_at_skips_versions_closed_before_their_start():
+    # Publishing 1.0.2 from Feb closed both 1.0.0 and 1.0.1 (which started in Mar) at Feb
+    cached = snapshot(
+        RULESET,
+        [_version("1.0.0", 1, 2), _version("1.0.1", 3, 2), _version("1.0.2", 2, None)],
+    )
+    assert cached.version_at(_dt(4)).version == "1.0.2"
+    assert cached.version_at(_dt(1)).version == "1.0.0"
+
+
+async def test_get_many_caches_hits_and_misses(store):
+    store.add_ruleset(RULESET, [_version("1.0.0", 1, None)])
+    calls = store.loads
+    cache = RulesetCache(maxsize=10, ttl=None)
+    pairs = [("US-CA", "SALES"), ("EU", "VAT")]
+
+    first = await cache.get_many(None, "t1", pairs)
+    again = await cache.get_many(None, "t1", pairs)
+    assert first == again
+    assert first[("EU", "VAT")] is None
+    assert len(calls) == 1
+
+    cache.invalidate("t1", "US-CA", "SALES")
+    assert (await cache.get(None, "t1", "US-CA", "SALES")).ruleset_id == "rs-1"
+    assert calls[-1] == ("t1", [("US-CA", "SALES")])
+    assert cache.stats()["hits"] == 2
+
+
+def test_segments_cut_at_version_boundaries():
+    cached = snapshot(
+        RULESET,
+        [_version("1.0.0", 2, 4), _version("1.0.1", 4, 6), _version("1.0.2", 6, None)],
+    )
+    segments = cached.segments(_dt(1), _dt(7))
+    assert [(lo.month, hi.month, v and v.version) for lo, hi, v in segments] == [
+        (1, 2, None), (2, 4, "1.0.0"), (4, 6, "1.0.1"), (6, 7, "1.0.2"),
+    ]
+    # Inside one version: a single segment clipped to the range
+    assert [(lo, hi, v.version) for lo, hi, v in cached.segments(_dt(2), _dt(3))] == [(_dt(2), _dt(3), "1.0.0")]
+    # Each segment holds whatever version_at says for every instant in it
+    for lo, hi, v in segments:
+        assert cached.version_at(lo) is v
+        assert cached.version_at(hi - (hi - lo) / 2) is v
+
+
+async def test_concurrent_misses_share_one_load(store):
+    store.add_ruleset(RULESET, [_version("1.0.0", 1, None)])
+    calls = store.loads
+    release = store.gate = asyncio.Event()
+    cache = RulesetCache(maxsize=10, ttl=None)
+    tasks = [asyncio.create_task(cache.get(None, "t1", "US-CA", "SALES")) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+    assert len(calls) == 1
+    assert {r.ruleset_id for r in results} == {"rs-1"}
+    assert cache.stats()["joined"] == 4
+
+    # A miss after an invalidation does not join the load that predates it
+    release.clear()
+    cache.invalidate("t1", "US-CA", "SALES")
+    first = asyncio.create_task(cache.refresh(None, "t1", [("US-CA", "SALES")]))
+    await asyncio.sleep(0)
+    cache.invalidate("t1", "US-CA", "SALES")
+    second = asyncio.create_task(cache.get(None, "t1", "US-CA", "SALES"))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(first, second)
+    assert len(calls) == 3
+    assert cache.peek("t1", "US-CA", "SALES")[0]  # stored by the load that started last
@@ -0,0 +1,76 @@
+"""Unit tests for dict-based response building (must match the Pydantic response models)."""
+
+import json
+import os
+import sys
+from datetime import UTC, datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.api.evaluations import _engine_bodies, _response_body
+from crms.api.responses import dumps
+from crms.engine.evaluator import evaluate_rules
+from crms.schemas.evaluation import (
+    EvaluationExplanation,
+    EvaluationRequest,
+    EvaluationResponse,
+    EvaluationResult,
+    RateComponent,
+    RiskFlag,
+)
+from crms.storage.ruleset_cache import CachedVersion
+
+TRANSACTIONS = [
+    {"jurisdiction": "US-CA", "tax_type": "SALES", "amount": 100,
+     "product": {"category": "SAAS"}, "buyer": {"type": "CONSUMER"},
+     "evidence": {"resolved_country": "US", "resolved_region": "CA", "resolved_confidence": 0.9}},
+    {"jurisdiction": "EU", "tax_type": "VAT", "amount": 250,
+     "product": {"category": "DIGITAL_GOODS"}, "buyer": {"type": "BUSINESS", "vat_id": "DE123"},
+     "evidence": {"resolved_country": "DE"}},
+    {"jurisdiction": "CA-ON", "tax_type": "HST", "amount": 40},
+]
+
+
+def _rules(jurisdiction: str) -> list[dict]:
+    return next(r for r in COMPLIANCE_RULESETS if r["jurisdiction"] == jurisdiction)["rules"]
+
+
+@pytest.mark.parametrize("explain", ["none", "full"])
+@pytest.mark.parametrize("transaction", TRANSACTIONS)
+def test_bodies_match_models(transaction, explain):
+    body = EvaluationRequest.model_validate({
+        "effective_at": "2026-02-20T00:00:00Z",
+        "transaction": transaction,
+        "options": {"explain": explain},
+    })
+    result, fired, trace_out = evaluate_rules(
+        {"transaction": body.transaction.model_dump()},
+        _rules(transaction["jurisdiction"]),
+        body.transaction.amount,
+        trace=explain == "full",
+    )
+    result_body, explanation = _engine_bodies(result, fired, trace_out)
+
+    expected_result = EvaluationResult(
+        taxable=result["taxable"],
+        rate=result["rate"],
+        tax_amount=result["tax_amount"],
+        obligations=result["obligations"],
+        rate_components=[RateComponent(**rc) for rc in result.get("rate_components", [])],
+        risk_flags=[RiskFlag(**rf) for rf in result.get("risk_flags", [])],
+        matched_rule_id=fired[0].rule_id if fired else None,
+    ).model_dump()
+    expected_explanation = EvaluationExplanation(fired_rules=fired, trace=trace_out).model_dump()
+    assert result_body == expected_result
+    assert explanation == expected_explanation
+
+    version = CachedVersion(
+        version_id="v", version="1.0.0", effective_from=datetime(2025, 1, 1, tzinfo=UTC),
+        effective_to=None, bundle_hash="h", bundle_json={},
+    )
+    out = _response_body("e-1", body, version, result_body, explanation)
+    encoded = dumps(out)
+    assert json.loads(encoded) == EvaluationResponse.model_validate(out).model_dump(mode="json")
@@ -0,0 +1,96 @@
+"""Unit tests for shadow evaluation (in-process runner, loader and audit writes replaced)."""
+
+import asyncio
+import copy
+import os
+import sys
+
+import orjson
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.api import evaluations
+from crms.engine.shadow import ShadowRunner
+from crms.schemas.evaluation import EvaluationRequest
+from crms.storage.ruleset_cache import snapshot
+from crms.utils.canonical import bundle_hash
+from tests.conftest import make_ruleset, make_version
+
+RULES = next(r for r in COMPLIANCE_RULESETS if r["jurisdiction"] == "US-CA")["rules"]
+CANDIDATE = copy.deepcopy(RULES)
+for _rule in CANDIDATE:
+    if _rule["then"].get("set", {}).get("rate"):
+        _rule["then"]["set"]["rate"] = round(_rule["then"]["set"]["rate"] + 0.01, 4)
+
+TRANSACTION = {
+    "jurisdiction": "US-CA", "tax_type": "SALES", "amount": 100.0,
+    "buyer": {"type": "CONSUMER"}, "product": {"category": "PHYSICAL_GOODS"},
+    "fulfillment": {"ship_to_region": "CA"},
+}
+
+
+def _ruleset(shadow_rules: list[dict] | None):
+    return make_ruleset("US-CA", "SALES", ruleset_id="rs-sh", shadow_rules=shadow_rules), make_version(rules=RULES)
+
+
+def _cached(shadow_rules: list[dict] | None):
+    ruleset, version = _ruleset(shadow_rules)
+    return snapshot(ruleset, [version])
+
+
+def _primary(trans: dict) -> dict:
+    body = EvaluationRequest.model_validate({"effective_at": "2026-02-20T00:00:00Z", "transaction": trans})
+    cached = _cached(None)
+    return evaluations._run_engine(body, cached, cached.versions[0])[1]
+
+
+def test_compare_records_only_disagreements():
+    runner = ShadowRunner(max_queue=10, max_samples=5)
+    same, changed = _cached(RULES), _cached(CANDIDATE)
+    primary = _primary(TRANSACTION)
+    runner.compare(same, "e1", {"transaction": TRANSACTION}, 100.0, primary)
+    assert runner.summary("rs-sh")["changed"] == 0
+    runner.compare(changed, "e2", {"transaction": TRANSACTION}, 100.0, primary)
+    summary = runner.summary("rs-sh")
+    assert summary["candidate_bundle_hash"] == changed.shadow_hash  # reset for the new candidate
+    assert (summary["items"], summary["changed"], summary["rate"]["changed"]) == (1, 1, 1)
+    assert summary["samples"][0]["evaluation_id"] == "e2"
+    assert summary["tax"]["delta_total"] == 1.0
+    assert runner.stats()["disagreements"] == 1
+
+
+async def test_submissions_are_shed_not_queued_without_bound():
+    runner = ShadowRunner(max_queue=2, max_samples=5)
+    ruleset = _cached(CANDIDATE)
+    primary = _primary(TRANSACTION)
+    assert not runner.submit(ruleset, "e0", {"transaction": TRANSACTION}, 100.0, primary)  # not running
+    runner.start()
+    accepted = [runner.submit(ruleset, f"e{i}", {"transaction": TRANSACTION}, 100.0, primary) for i in range(5)]
+    assert accepted == [True, True, False, False, False]
+    while runner.stats()["queued"]:
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    await runner.stop()
+    assert runner.stats()["evaluated"] == 2 and runner.stats()["shed"] == 3
+
+
+@pytest.fixture
+def submitted(store, monkeypatch):
+    calls = []
+    ruleset, version = _ruleset(CANDIDATE)
+    store.add_tenant("sh-hash", "t-sh")
+    store.add_ruleset(ruleset, [version])
+    monkeypatch.setattr(evaluations.shadow_runner, "submit", lambda *args: calls.append(args) or True)
+    return calls
+
+
+async def test_evaluate_transaction_answers_from_the_published_version(submitted):
+    body = EvaluationRequest.model_validate({"effective_at": "2026-02-20T00:00:00Z", "transaction": TRANSACTION})
+    out = orjson.loads((await evaluations.evaluate_transaction(body, "sh-hash", None)).body)
+    assert out["result"] == orjson.loads(orjson.dumps(_primary(TRANSACTION)))
+    (ruleset, evaluation_id, context, amount, result), = submitted
+    assert evaluation_id == out["evaluation_id"]
+    assert ruleset.shadow_hash == bundle_hash(CANDIDATE)
+    assert context["transaction"]["amount"] == amount == 100.0
@@ -0,0 +1,86 @@
+"""Unit tests for routed-field specialization (must match evaluate_rules on routed contexts)."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.engine.compiler import compile_bundle
+from crms.engine.evaluator import evaluate_compiled, evaluate_rules
+from crms.engine.result_cache import ResultCache
+from crms.engine.specialize import (
+    ROUTING_PATHS,
+    get_routed_bundle,
+    known_context,
+    specialize_bundle,
+    specialize_condition,
+)
+from tests.test_compiler import _assert_same, _corpus
+
+ALL_RULESETS = [(r["jurisdiction"], r["tax_type"], r["rules"]) for r in COMPLIANCE_RULESETS]
+TX = known_context({"transaction.jurisdiction": "US-TX", "transaction.tax_type": "SALES"})
+
+TX_RULES = [
+    {"rule_id": "TX-001", "priority": 100, "when": {"all": [
+        {"eq": ["transaction.jurisdiction", "US-TX"]},
+        {"in": ["transaction.product.category", ["SAAS", "DIGITAL_GOODS"]]},
+        {"eq": ["transaction.buyer.type", "CONSUMER"]},
+    ]}, "then": {"set": {"taxable": True, "rate": 0.0625}}},
+    {"rule_id": "TX-DEFAULT", "priority": 0, "when": {"eq": ["transaction.jurisdiction", "US-TX"]},
+     "then": {"set": {"taxable": False, "rate": 0}}},
+]
+
+
+@pytest.mark.parametrize("jurisdiction,tax_type,rules", ALL_RULESETS, ids=[r[0] for r in ALL_RULESETS])
+def test_routed_bundle_matches_interpreter(jurisdiction, tax_type, rules):
+    bundle = get_routed_bundle(f"hash-{jurisdiction}", {"rules": rules}, jurisdiction, tax_type)
+    assert bundle.routing == (jurisdiction, tax_type)
+    assert "transaction.jurisdiction" not in bundle.paths
+    guardrails = [r for r in rules if "transaction.jurisdiction" in str(r.get("when"))]
+    assert len(bundle.rules) == len(rules) - len(guardrails)
+    for ctx in _corpus():
+        ctx["transaction"].update(jurisdiction=jurisdiction, tax_type=tax_type)
+        amount = ctx["transaction"]["amount"]
+        _assert_same(evaluate_compiled(ctx, bundle, amount), evaluate_rules(ctx, rules, amount))
+
+
+def test_routed_leaves_fold_and_parents_simplify():
+    spec = specialize_bundle({"rules": TX_RULES}, ROUTING_PATHS, TX)["rules"]
+    assert spec[0]["when"] == {"all": TX_RULES[0]["when"]["all"][1:]}
+    assert spec[1]["when"] == {"all": []}
+    assert specialize_condition({"any": [{"neq": ["transaction.tax_type", "SALES"]},
+                                         {"eq": ["transaction.buyer.type", "X"]}]}, ROUTING_PATHS, TX) == {
+        "eq": ["transaction.buyer.type", "X"]
+    }
+    assert specialize_condition({"all": [{"eq": ["transaction.jurisdiction", "US-CA"]},
+                                         {"gt": ["transaction.amount", 5]}]}, ROUTING_PATHS, TX) is False
+
+
+def test_constant_after_raising_sibling_keeps_the_error():
+    rules = [{"rule_id": "R", "priority": 1, "when": {"all": [
+        {"gt": ["transaction.amount", 5]},
+        {"eq": ["transaction.jurisdiction", "US-CA"]},
+    ]}}]
+    bundle = compile_bundle(specialize_bundle({"rules": rules}, ROUTING_PATHS, TX))
+    assert len(bundle.rules) == 1
+    ctx = {"transaction": {"jurisdiction": "US-TX", "tax_type": "SALES", "amount": "x"}}
+    with pytest.raises(TypeError):
+        evaluate_rules(ctx, rules, 1)
+    with pytest.raises(TypeError):
+        evaluate_compiled(ctx, bundle, 1)
+    ctx["transaction"]["amount"] = 10
+    _assert_same(evaluate_compiled(ctx, bundle, 10), evaluate_rules(ctx, rules, 10))
+
+
+def test_result_cache_keeps_routed_and_full_bundles_apart():
+    cache = ResultCache(maxsize=100, maxbytes=1_000_000)
+    full = compile_bundle({"rules": TX_RULES}, "hash-tx")
+    routed = get_routed_bundle("hash-tx", {"rules": TX_RULES}, "US-TX", "SALES")
+    ctx = {"transaction": {"jurisdiction": "US-TX", "tax_type": "SALES", "amount": 10,
+                           "product": {"category": "SAAS"}, "buyer": {"type": "CONSUMER"}}}
+    for bundle in (full, routed, full, routed):
+        _assert_same(cache.evaluate(ctx, bundle, 10), evaluate_rules(ctx, TX_RULES, 10))
+    assert cache.stats()["size"] == 2
@@ -0,0 +1,141 @@
+"""Unit tests for NDJSON stream evaluation (request body, session and audit writes replaced)."""
+
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import orjson
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.api import evaluations
+from crms.config import settings
+from tests.conftest import make_ruleset, make_version
+
+RULES = {(r["jurisdiction"], r["tax_type"]): r["rules"] for r in COMPLIANCE_RULESETS}
+TRANSACTION = {"jurisdiction": "US-CA", "tax_type": "SALES", "amount": 100, "buyer": {"type": "CONSUMER"},
+               "product": {"category": "PHYSICAL_GOODS"}, "fulfillment": {"ship_to_region": "CA"}}
+
+
+class FakeRequest:
+    """Request whose body arrives in the given byte chunks."""
+
+    def __init__(self, chunks: list[bytes]):
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def session(store, monkeypatch):
+    for pair in [("US-CA", "SALES"), ("EU", "VAT")]:
+        store.add_ruleset(make_ruleset(*pair), [make_version(rules=RULES[pair], version_id=f"v-{pair[0]}")])
+    db = FakeSession()
+
+    @asynccontextmanager
+    async def session_maker():
+        yield db
+
+    monkeypatch.setattr(evaluations, "async_session_maker", session_maker)
+    return db
+
+
+def _line(key: str | None = None, **trans) -> bytes:
+    return orjson.dumps({"idempotency_key": key, "effective_at": "2026-02-20T00:00:00Z",
+                         "transaction": {**TRANSACTION, **trans}})
+
+
+async def _stream(chunks: list[bytes], audit: str = "batched") -> tuple[list[bytes], list[dict]]:
+    """(output chunks, parsed output lines)."""
+    out = [c async for c in evaluations._stream_results(FakeRequest(chunks), "t-stream", audit)]
+    return out, [orjson.loads(line) for line in b"".join(out).splitlines()]
+
+
+def _split(body: bytes, size: int) -> list[bytes]:
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+async def test_lines_split_across_body_chunks(store, session):
+    body = b"\n".join([_line("a"), b"", _line("b", amount=50), b"  ", _line("c")])  # no trailing newline
+    _, lines = await _stream(_split(body, 7))
+    assert [(line["index"], line["idempotency_key"]) for line in lines] == [(0, "a"), (2, "b"), (4, "c")]
+    assert [line["response"]["result"]["tax_amount"] for line in lines] == [7.25, 3.62, 7.25]
+    assert store.loads == [("t-stream", [("US-CA", "SALES")])]  # resolved once per stream
+
+
+async def test_chunks_are_flushed_and_committed_separately(store, session, monkeypatch):
+    monkeypatch.setattr(settings, "stream_chunk_size", 2)
+    out, lines = await _stream([b"\n".join(_line(f"k{i}") for i in range(5)) + b"\n"])
+    assert len(out) == 3 and len(lines) == 5
+    assert session.commits == 3
+    assert [row["idempotency_key"] for row in store.rows] == [f"k{i}" for i in range(5)]
+
+
+async def test_audit_none_stores_nothing(store, session):
+    _, lines = await _stream([_line("n1") + b"\n" + _line("n2")], audit="none")
+    assert all(line["response"] for line in lines)
+    assert store.rows == [] and session.commits == 0
+
+
+async def test_bad_lines_get_error_lines_and_the_stream_goes_on(store, session, monkeypatch):
+    monkeypatch.setattr(settings, "stream_chunk_size", 2)
+    body = b"\n".join([
+        _line("ok1"),
+        b"{not json",
+        _line("engine", jurisdiction="EU", tax_type="VAT", product={"category": "SAAS"},
+              buyer={"type": "BUSINESS", "country": "DE", "vat_id": "DE123", "vat_id_confidence": "high"}),
+        _line("missing", jurisdiction="XX"),
+        _line("ok2"),
+    ])
+    _, lines = await _stream([body])
+    assert [line["index"] for line in lines] == [0, 1, 2, 3, 4]
+    assert [line["error"] and line["error"]["status_code"] for line in lines] == [None, 422, 422, 404, None]
+    assert lines[4]["response"]["result"]["tax_amount"] == 7.25
+
+
+async def test_a_failed_chunk_is_reported_line_by_line(store, session, monkeypatch):
+    monkeypatch.setattr(settings, "stream_chunk_size", 2)
+    persist = store.persist
+    calls = []
+
+    async def failing_once(db, rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise RuntimeError("insert failed")
+        await persist(db, rows)
+
+    monkeypatch.setattr(evaluations, "_persist", failing_once)
+    _, lines = await _stream([b"\n".join(_line(f"f{i}") for i in range(4))])
+    assert [line["error"] and line["error"]["detail"] for line in lines[:2]] == [evaluations.STREAM_CHUNK_FAILED] * 2
+    assert [line["idempotency_key"] for line in lines] == ["f0", "f1", "f2", "f3"]
+    assert lines[2]["response"] and lines[3]["response"]
+    assert session.rollbacks == 1 and [row["idempotency_key"] for row in store.rows] == ["f2", "f3"]
+
+
+async def test_over_long_lines_get_413_lines_and_the_stream_goes_on(store, session, monkeypatch):
+    ok = _line("ok")
+    monkeypatch.setattr(settings, "stream_max_line_bytes", len(ok))
+    long = _line("long", product={"category": "PHYSICAL_GOODS", "sku": "x" * 100})
+    body = b"\n".join([ok, long, ok.replace(b'"ok"', b'"o2"'), long])  # the last line has no newline
+    for size in (1, 7, len(body)):
+        _, lines = await _stream(_split(body, size), audit="none")
+        assert [line["index"] for line in lines] == [0, 1, 2, 3]
+        assert [line["error"] and line["error"]["status_code"] for line in lines] == [None, 413, None, 413]
+        assert lines[1]["error"]["detail"] == evaluations.STREAM_LINE_TOO_LONG
+        assert lines[2]["response"]["result"]["tax_amount"] == 7.25
@@ -0,0 +1,98 @@
+"""Unit tests for rate lookup tables (rate_from actions)."""
+
+import pytest
+
+from crms.engine.compiler import compile_bundle
+from crms.engine.evaluator import evaluate_compiled, evaluate_rules
+from crms.engine.result_cache import ResultCache
+from crms.engine.tables import compile_tables, validate_lookups
+from crms.engine.vectorized import evaluate_batch
+from crms.utils.canonical import bundle_hash
+
+TABLES = {
+    "districts": {"kind": "exact", "entries": {
+        f"LOC_{i}": {"rate": round(0.07 + i / 10000, 4), "rate_components": [{"name": f"district_{i}", "rate": i / 10000}]}
+        for i in range(500)
+    }},
+    "postal": {"kind": "range", "entries": [
+        {"from": "90001", "to": "90099", "rate": 0.095},
+        {"from": "94100", "to": "94199", "rate": 0.08625},
+    ]},
+}
+
+RULES = [
+    {"rule_id": "ZIP", "priority": 20, "when": {"exists": "transaction.fulfillment.postal_code"},
+     "then": {"set": {"taxable": True, "rate": 0.0725},
+              "rate_from": {"table": "postal", "key": "transaction.fulfillment.postal_code"}}},
+    {"rule_id": "LOCAL", "priority": 10, "when": {"exists": "transaction.evidence.locality_code"},
+     "then": {"set": {"taxable": True, "rate": 0.0725},
+              "rate_from": {"table": "districts", "key": "transaction.evidence.locality_code"}}},
+    {"rule_id": "STATE", "priority": 1, "when": {"exists": "transaction.amount"},
+     "then": {"set": {"taxable": True, "rate": 0.0725}}},
+]
+
+
+def _contexts() -> list[dict]:
+    out = []
+    for postal in ["90001", "90050", "90099", "90100", "94150", "00000", 94150, None]:
+        for locality in ["LOC_0", "LOC_499", "LOC_500", 7, None]:
+            trans: dict = {"amount": 100.0, "evidence": {"locality_code": locality}}
+            if postal is not None:
+                trans["fulfillment"] = {"postal_code": postal}
+            out.append({"transaction": trans})
+    return out
+
+
+def test_exact_and_range_lookups():
+    tables = compile_tables(TABLES)
+    assert tables["districts"].lookup("LOC_3")["rate"] == 0.0703
+    assert tables["districts"].lookup("LOC_500") is None
+    assert tables["districts"].lookup(["unhashable"]) is None
+    assert tables["postal"].lookup("90001")["rate"] == 0.095
+    assert tables["postal"].lookup("90099")["rate"] == 0.095
+    assert tables["postal"].lookup("90100") is None
+    assert tables["postal"].lookup(94150) is None  # not comparable with string bounds
+    assert tables["postal"].lookup(None) is None
+
+
+@pytest.mark.parametrize("tables", [
+    {"t": {"kind": "nope", "entries": {}}},
+    {"t": {"kind": "range", "entries": [{"from": "1", "to": "5"}, {"from": "5", "to": "9"}]}},
+    {"t": {"kind": "range", "entries": [{"from": "5", "to": "1"}]}},
+    {"t": {"kind": "range", "entries": [{"from": 1, "to": 2}, {"from": "3", "to": "4"}]}},
+    {"t": {"kind": "exact", "entries": {"A": {"rate": "high"}}}},
+])
+def test_malformed_tables_rejected(tables):
+    with pytest.raises(ValueError):
+        compile_tables(tables)
+
+
+def test_unknown_table_rejected():
+    with pytest.raises(ValueError, match="unknown rate table"):
+        validate_lookups(RULES, compile_tables({"postal": TABLES["postal"]}))
+
+
+def test_rate_from_matches_across_evaluators():
+    bundle = compile_bundle({"rules": RULES, "tables": TABLES}, "hash-tables")
+    cache = ResultCache(maxsize=100, maxbytes=1_000_000)
+    contexts = _contexts()
+    batch = evaluate_batch(contexts, bundle, [100.0] * len(contexts))
+    for i, ctx in enumerate(contexts):
+        expected, fired, _ = evaluate_rules(ctx, RULES, 100.0, bundle=bundle)
+        for got in (evaluate_compiled(ctx, bundle, 100.0), cache.evaluate(ctx, bundle, 100.0)):
+            assert got[0] == expected
+            assert [f.rule_id for f in got[1]] == [f.rule_id for f in fired]
+        assert batch.rate[i] == expected["rate"]
+        assert batch.tax_amount[i] == expected["tax_amount"]
+        assert batch.result(i, ctx, 100.0)[0] == expected
+    local = {"transaction": {"amount": 100.0, "evidence": {"locality_code": "LOC_42"}}}
+    result, _, _ = evaluate_compiled(local, bundle, 100.0)
+    assert result["rate"] == 0.0742
+    assert result["rate_components"] == [{"name": "district_42", "rate": 0.0042}]
+
+
+def test_tables_are_hashed_with_the_rules():
+    assert bundle_hash(RULES) == bundle_hash(RULES, None) == bundle_hash(RULES, {})
+    assert bundle_hash(RULES, TABLES) != bundle_hash(RULES)
+    changed = {**TABLES, "postal": {"kind": "range", "entries": [{"from": "90001", "to": "90099", "rate": 0.1}]}}
+    assert bundle_hash(RULES, changed) != bundle_hash(RULES, TABLES)
@@ -0,0 +1,29 @@
+"""Unit tests for the API key -> tenant cache."""
+
+import time
+
+from crms.auth.tenant_cache import AuthenticatedTenant, TenantCache
+
+TENANT = AuthenticatedTenant(tenant_id="t-1", name="Demo")
+
+
+def test_valid_and_invalid_keys_are_cached_separately():
+    cache = TenantCache(maxsize=10, ttl=None, negative_maxsize=1, negative_ttl=60)
+    assert cache.lookup("good") == (False, None)
+    cache.store("good", TENANT)
+    cache.store("bad-1", None)
+    cache.store("bad-2", None)  # evicts bad-1 from the negative LRU only
+    assert cache.lookup("good") == (True, TENANT)
+    assert cache.lookup("bad-2") == (True, None)
+    assert cache.lookup("bad-1") == (False, None)
+
+
+def test_negative_entries_expire_and_invalidate_drops_both():
+    cache = TenantCache(maxsize=10, ttl=None, negative_maxsize=10, negative_ttl=0.01)
+    cache.store("new-key", None)
+    time.sleep(0.02)
+    assert cache.lookup("new-key") == (False, None)
+
+    cache.store("rotated", TENANT)
+    cache.invalidate("rotated")
+    assert cache.lookup("rotated") == (False, None)
@@ -0,0 +1,53 @@
+"""Unit tests for timeline evaluation (loader replaced, no database)."""
+
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+from crms.api import evaluations
+from crms.schemas.evaluation import TimelineEvaluationRequest
+from tests.conftest import make_ruleset, make_version
+
+def _version(version: str, rate: float, start: int, end: int | None) -> SimpleNamespace:
+    rules = [{"rule_id": "R", "name": "R", "priority": 1, "when": {"exists": "transaction.amount"},
+              "then": {"set": {"taxable": True, "rate": rate}}}]
+    return make_version(
+        version, rules,
+        effective_from=datetime(2026, start, 1, tzinfo=UTC),
+        effective_to=datetime(2026, end, 1, tzinfo=UTC) if end else None,
+    )
+
+
+@pytest.fixture
+def loads(store):
+    store.add_ruleset(make_ruleset("TL", "SALES"), [_version("1", 0.05, 1, 3), _version("2", 0.06, 3, None)])
+    return store.loads
+
+
+async def test_one_evaluation_per_version_segment(loads, monkeypatch):
+    evaluated = []
+    real = evaluations._evaluate_context
+
+    def counting(context, amount, options, ruleset, version):
+        evaluated.append(version.version)
+        return real(context, amount, options, ruleset, version)
+
+    monkeypatch.setattr(evaluations, "_evaluate_context", counting)
+    body = TimelineEvaluationRequest.model_validate({
+        "effective_from": "2025-12-01T00:00:00Z",
+        "effective_to": "2026-06-30T00:00:00Z",
+        "transaction": {"jurisdiction": "TL", "tax_type": "SALES", "amount": 100},
+    })
+    out = orjson.loads((await evaluations.evaluate_timeline(body, SimpleNamespace(tenant_id="t-tl"), None)).body)
+    segments = out["segments"]
+    assert [(s["effective_from"][:10], s["effective_to"][:10]) for s in segments] == [
+        ("2025-12-01", "2026-01-01"), ("2026-01-01", "2026-03-01"), ("2026-03-01", "2026-06-30"),
+    ]
+    assert segments[0]["version"] is None and segments[0]["result"] is None
+    assert [s["result"]["tax_amount"] for s in segments[1:]] == [5.0, 6.0]
+    assert segments[1]["version"]["effective_to"][:10] == "2026-03-01"
+    assert segments[2]["version"]["effective_to"] is None
+    assert sorted(evaluated) == ["1", "2"]
+    assert len(loads) == 1
@@ -0,0 +1,82 @@
+"""Unit tests for the explain=full worker pool (thread and process executors)."""
+
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from compliance_rulesets import COMPLIANCE_RULESETS
+from crms.engine import trace_pool as trace_pool_module
+from crms.engine.compiler import compile_bundle
+from crms.engine.evaluator import evaluate_rules
+from crms.engine.trace_pool import TracePool
+
+RULES = next(r for r in COMPLIANCE_RULESETS if r["jurisdiction"] == "US-CA")["rules"]
+BUNDLE_JSON = {"rules": RULES}
+CONTEXT = {"transaction": {"jurisdiction": "US-CA", "tax_type": "SALES", "amount": 100,
+                           "product": {"category": "SAAS"}, "buyer": {"type": "CONSUMER"}}}
+TRACE_KWARGS = {"top_k_near_miss": 3, "max_counterfactuals": 2, "trace_budget": None}
+
+
+def _pool(mode: str = "thread", **kwargs) -> TracePool:
+    opts = {"workers": 2, "cost_threshold": 1, "tenant_limit": 1, "timeout": 5.0, **kwargs}
+    return TracePool(mode, **opts)
+
+
+def _expected():
+    return evaluate_rules(CONTEXT, RULES, 100, trace=True, **TRACE_KWARGS)
+
+
+def test_offload_threshold():
+    bundle = compile_bundle(BUNDLE_JSON)
+    assert not _pool("inline").offloads(bundle, 5)
+    assert _pool(cost_threshold=len(bundle.rules) * 3).offloads(bundle, 2)
+    assert not _pool(cost_threshold=len(bundle.rules) * 3 + 1).offloads(bundle, 2)
+    assert _pool(cost_threshold=len(bundle.rules) * 3 * 4).offloads(bundle, 2, traces=4)  # an invoice's lines
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+async def test_offloaded_trace_matches_inline(mode):
+    pool = _pool(mode)
+    bundle = compile_bundle(BUNDLE_JSON, "h-pool")
+    try:
+        for _ in range(3):  # process workers receive the bundle once, then only its hash
+            result, fired, trace = await pool.evaluate(
+                "t1", "h-pool", BUNDLE_JSON, bundle, CONTEXT, 100, TRACE_KWARGS
+            )
+            exp_result, exp_fired, exp_trace = _expected()
+            assert fired == exp_fired
+            assert result["rate"] == exp_result["rate"]
+            assert trace.model_dump() == exp_trace.model_dump()
+    finally:
+        pool.shutdown()
+    assert pool.stats()["offloaded"] == 3
+
+
+async def test_timeout_and_tenant_slots(monkeypatch):
+    release = threading.Event()
+
+    def slow(*args):
+        release.wait(5)
+        return "done"
+
+    monkeypatch.setattr(trace_pool_module, "_evaluate_traced", slow)
+    pool = _pool(timeout=0.05)
+    bundle = compile_bundle(BUNDLE_JSON)
+    try:
+        assert await pool.evaluate("t1", "h", BUNDLE_JSON, bundle, CONTEXT, 100, TRACE_KWARGS) is None
+        # The abandoned trace still holds t1's only slot; other tenants are unaffected
+        assert await pool.evaluate("t1", "h", BUNDLE_JSON, bundle, CONTEXT, 100, TRACE_KWARGS) is None
+        assert pool.stats()["busy"] == 1
+        release.set()
+        assert await pool.evaluate("t2", "h", BUNDLE_JSON, bundle, CONTEXT, 100, TRACE_KWARGS) == "done"
+        await asyncio.sleep(0.05)
+        assert await pool.evaluate("t1", "h", BUNDLE_JSON, bundle, CONTEXT, 100, TRACE_KWARGS) == "done"
+    finally:
+        release.set()
+        pool.shutdown()
+    assert pool.stats()["timeouts"] == 1